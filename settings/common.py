@@ -204,6 +204,18 @@ EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 # collapsed during that interval
 CHANGE_NOTIFICATIONS_MIN_INTERVAL = 0  # seconds
 SEND_BULK_EMAILS_WITH_CELERY = True
+# Threads sending the pending change notifications in batches (each one uses its own database connection)
+NOTIFICATIONS_SEND_WORKERS = 1
+
+# 0 project totals (fans and activity) are refreshed after every like or timeline entry
+# >0 they are refreshed in batch by a celery periodic task every interval (requires celery)
+PROJECT_TOTALS_REFRESH_INTERVAL = 0  # seconds
+
+# 0 user stories moved in the kanban, backlog or sprints get consecutive orders (all the
+#   following stories of the column are renumbered)
+# >0 orders are spaced by this gap and a move only updates the moved stories (the column
+#   is renumbered only when there is no room left between the neighbours)
+USERSTORIES_ORDER_GAP = 0
 
 DJMAIL_REAL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 DJMAIL_SEND_ASYNC = True
@@ -215,6 +227,11 @@ EVENTS_PUSH_BACKEND = "taiga.events.backends.postgresql.EventsPushBackend"
 # EVENTS_PUSH_BACKEND = "taiga.events.backends.rabbitmq.EventsPushBackend"
 # EVENTS_PUSH_BACKEND_OPTIONS = {"url": "//guest:guest@127.0.0.1/"}
 
+# Throttling storage (used by taiga.base.throttling.CommonThrottle)
+THROTTLE_BACKEND = "taiga.base.throttling_backends.CacheThrottleBackend"
+# THROTTLE_BACKEND = "taiga.base.throttling_backends.RedisThrottleBackend"
+# THROTTLE_BACKEND_OPTIONS = {"url": "redis://127.0.0.1:6379/0"}
+
 # Message System
 MESSAGE_STORAGE = "django.contrib.messages.storage.session.SessionStorage"
 
@@ -601,6 +618,7 @@ BITBUCKET_VALID_ORIGIN_IPS = [
 GITLAB_VALID_ORIGIN_IPS = []
 
 EXPORTS_TTL = 60 * 60 * 24  # 24 hours
+EXPORTS_ATTACHMENTS_WORKERS = 4  # Threads reading and encoding attachments
 
 WEBHOOKS_ENABLED = False
 WEBHOOKS_BLOCK_PRIVATE_ADDRESS = False
@@ -661,6 +679,12 @@ IMPORTERS = {
     }
 }
 
+# Concurrent requests done by the importers to prefetch the data of the
+# next elements and times a request is retried when the service answers
+# with a rate limit or a temporary error.
+IMPORTERS_HTTP_WORKERS = 8
+IMPORTERS_HTTP_MAX_RETRIES = 5
+
 # Configuration for sending notifications
 NOTIFICATIONS_CUSTOM_FILTER = False
 
@@ -668,6 +692,19 @@ NOTIFICATIONS_CUSTOM_FILTER = False
 MDRENDER_CACHE_ENABLE = True
 MDRENDER_CACHE_MIN_SIZE = 40
 MDRENDER_CACHE_TIMEOUT = 86400
+MDRENDER_LOCAL_CACHE_SIZE = 1000
+MDRENDER_ENGINE_POOL_SIZE = 100
+
+# CSV EXPORTS
+# Elements loaded (with their related objects) at a time while streaming a
+# CSV file and whether it is compressed for the clients accepting gzip.
+CSV_EXPORT_CHUNK_SIZE = 500
+CSV_EXPORT_GZIP = True
+
+# PROJECTS CONFIGURATION DOCUMENT
+# Seconds a version of the configuration document of a project (statuses,
+# custom attributes, roles, members...) is kept in the cache.
+PROJECT_CONFIG_CACHE_TIMEOUT = 86400
 
 # TELEMETRY
 
@@ -653,14 +653,9 @@ class QFilter(FilterBackend):
     def filter_queryset(self, request, queryset, view):
         q = request.QUERY_PARAMS.get('q', None)
         if q:
+            # NOTE: See migration projects/0070_search_vectors
             table = queryset.model._meta.db_table
-            where_clause = ("""
-                to_tsvector('simple',
-                            coalesce({table}.subject, '') || ' ' ||
-                            coalesce(array_to_string({table}.tags, ' '), '') || ' ' ||
-                            coalesce({table}.ref) || ' ' ||
-                            coalesce({table}.description, '')) @@ to_tsquery('simple', %s)
-            """.format(table=table))
+            where_clause = "{table}.search_vector @@ to_tsquery('simple', %s)".format(table=table)
 
             queryset = queryset.extra(where=[where_clause], params=[to_tsquery(q)])
 
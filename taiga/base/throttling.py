@@ -13,6 +13,8 @@ from ipware.ip import get_ip
 from netaddr import all_matching_cidrs
 from netaddr.core import AddrFormatError
 
+from .throttling_backends import get_throttle_backend
+
 
 class GlobalThrottlingMixin:
     """
@@ -53,7 +55,12 @@ class UserRateThrottle(throttling.UserRateThrottle):
 
 
 class CommonThrottle(throttling.SimpleRateThrottle):
-    cache_format = "throttle_%(scope)s_%(rate)s_%(ident)s"
+    """
+    Throttle every request by the scope of the user (anon/user, read/write)
+    with one or more rates. Rates are stored and checked by the configured
+    throttle backend (see `taiga.base.throttling_backends`).
+    """
+    cache_format = "throttle_%(scope)s_%(ident)s"
 
     def __init__(self):
         pass
@@ -84,43 +91,15 @@ class CommonThrottle(throttling.SimpleRateThrottle):
         if rates is None or rates == []:
             return True
 
-        now = self.timer()
-
-        waits = []
-        history_writes = []
-
-        for rate in rates:
-            rate_name = rate[0]
-            rate_num_requests = rate[1]
-            rate_duration = rate[2]
-
-            key = self.get_cache_key(ident, scope, rate_name)
-            history = self.cache.get(key, [])
-
-            while history and history[-1] <= now - rate_duration:
-                history.pop()
-
-            if len(history) >= rate_num_requests:
-                waits.append(self.wait_time(history, rate, now))
-
-            history_writes.append({
-                "key": key,
-                "history": history,
-                "rate_duration": rate_duration,
-            })
-
-        if waits:
-            self._wait = max(waits)
+        # A "0/<period>" rate blocks the scope
+        blocked_durations = [rate[2] for rate in rates if rate[1] <= 0]
+        if blocked_durations:
+            self._wait = max(blocked_durations)
             return False
 
-        for history_write in history_writes:
-            history_write['history'].insert(0, now)
-            self.cache.set(
-                history_write['key'],
-                history_write['history'],
-                history_write['rate_duration']
-            )
-        return True
+        key = self.get_cache_key(ident, scope)
+        self._wait = get_throttle_backend().hit(key, rates, self.timer())
+        return not self._wait
 
     def get_rates(self, scope):
         try:
@@ -163,23 +142,8 @@ class CommonThrottle(throttling.SimpleRateThrottle):
         ident = get_ip(request)
         return ident
 
-    def get_cache_key(self, ident, scope, rate):
-        return self.cache_format % { "scope": scope, "ident": ident, "rate": rate }
-
-    def wait_time(self, history, rate, now):
-        rate_num_requests = rate[1]
-        rate_duration = rate[2]
-
-        if history:
-            remaining_duration = rate_duration - (now - history[-1])
-        else:
-            remaining_duration = rate_duration
-
-        available_requests = rate_num_requests - len(history) + 1
-        if available_requests <= 0:
-            return remaining_duration
-
-        return remaining_duration / float(available_requests)
+    def get_cache_key(self, ident, scope):
+        return self.cache_format % { "scope": scope, "ident": ident }
 
     def wait(self):
         return self._wait
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+Storage backends for `taiga.base.throttling.CommonThrottle`.
+
+Rates are enforced with GCRA (generic cell rate algorithm): for every rate
+only the "theoretical arrival time" (TAT) of the next request is stored, so
+the memory used per key is fixed no matter how big the rate is. A rate of
+N requests per P seconds allows a burst of N requests and then one request
+every P/N seconds.
+
+All the rates of a scope are stored in the same key and are checked and
+updated together in a single round trip. A throttled request does not
+consume any rate.
+"""
+
+import abc
+import math
+import threading
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+def gcra(tats:dict, rates:list, now:float):
+    """
+    Apply a request at `now` to the stored `tats` ({rate name: TAT}).
+
+    Return a tuple (wait, new_tats, ttl): `wait` is 0 if the request is
+    allowed, otherwise the seconds to wait until it will be (and `new_tats`
+    is None).
+    """
+    wait = 0
+    ttl = 0
+    new_tats = {}
+
+    for rate_name, num_requests, duration in rates:
+        interval = duration / num_requests
+        tat = max(tats.get(rate_name) or now, now)
+        new_tat = tat + interval
+        allow_at = new_tat - duration
+
+        if allow_at > now:
+            wait = max(wait, allow_at - now)
+
+        new_tats[rate_name] = new_tat
+        ttl = max(ttl, new_tat - now)
+
+    if wait:
+        return (wait, None, 0)
+    return (0, new_tats, ttl)
+
+
+class BaseThrottleBackend(object, metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def hit(self, key:str, rates:list, now:float) -> float:
+        """
+        Register a request for `key` against all the `rates` (a list of
+        (name, num_requests, duration) tuples).
+
+        Return 0 if the request is allowed or the seconds to wait otherwise.
+        """
+        pass
+
+
+class CacheThrottleBackend(BaseThrottleBackend):
+    """
+    Store the TATs in the Django cache with one get and one set per request.
+
+    Updates are serialized inside the process but not between processes, so
+    with a shared cache (memcached...) concurrent requests of the same user
+    can be counted only once. Use `RedisThrottleBackend` if you need strict
+    limits with several workers.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache or default_cache
+        self._lock = threading.Lock()
+
+    def hit(self, key:str, rates:list, now:float) -> float:
+        with self._lock:
+            tats = self.cache.get(key) or {}
+            wait, new_tats, ttl = gcra(tats, rates, now)
+            if new_tats is not None:
+                self.cache.set(key, new_tats, math.ceil(ttl))
+            return wait
+
+
+# KEYS[1]: key of the hash with the TAT of every rate
+# ARGV: now, and a (rate name, interval, duration) triplet for every rate
+#
+# Floats are returned as strings because Redis truncates Lua numbers to
+# integers.
+GCRA_LUA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local fields = {}
+for i = 2, #ARGV, 3 do
+    fields[#fields + 1] = ARGV[i]
+end
+
+local tats = redis.call("HMGET", KEYS[1], unpack(fields))
+local wait = 0
+local ttl = 0
+local updates = {}
+
+for i, field in ipairs(fields) do
+    local interval = tonumber(ARGV[i * 3])
+    local duration = tonumber(ARGV[i * 3 + 1])
+    local tat = tonumber(tats[i]) or now
+    if tat < now then
+        tat = now
+    end
+
+    local new_tat = tat + interval
+    local allow_at = new_tat - duration
+    if allow_at > now and allow_at - now > wait then
+        wait = allow_at - now
+    end
+    if new_tat - now > ttl then
+        ttl = new_tat - now
+    end
+
+    updates[#updates + 1] = field
+    updates[#updates + 1] = string.format("%.6f", new_tat)
+end
+
+if wait > 0 then
+    return string.format("%.6f", wait)
+end
+
+redis.call("HMSET", KEYS[1], unpack(updates))
+redis.call("PEXPIRE", KEYS[1], math.ceil(ttl * 1000))
+return "0"
+"""
+
+
+class RedisThrottleBackend(BaseThrottleBackend):
+    """
+    Check and update all the rates atomically with a Lua script in a single
+    round trip to Redis.
+    """
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", key_prefix="taiga:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured("RedisThrottleBackend requires the redis package") from e
+
+        self.key_prefix = key_prefix
+        self.client = redis.StrictRedis.from_url(url)
+        self.script = self.client.register_script(GCRA_LUA_SCRIPT)
+
+    def hit(self, key:str, rates:list, now:float) -> float:
+        args = [repr(now)]
+        for rate_name, num_requests, duration in rates:
+            args.extend([rate_name, repr(duration / num_requests), repr(float(duration))])
+
+        return float(self.script(keys=[self.key_prefix + key], args=args))
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_throttle_backend(path:str=None, options:dict=None):
+    """
+    Return the (per process) instance of the configured throttle backend.
+    """
+    if path is None:
+        path = getattr(settings, "THROTTLE_BACKEND", "taiga.base.throttling_backends.CacheThrottleBackend")
+
+    if options is None:
+        options = getattr(settings, "THROTTLE_BACKEND_OPTIONS", {})
+
+    key = (path, tuple(sorted(options.items())))
+    backend = _backends.get(key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(key)
+            if backend is None:
+                backend = import_string(path)(**options)
+                _backends[key] = backend
+    return backend
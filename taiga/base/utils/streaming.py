@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+Streaming of the CSV exports.
+
+The ids of the exported elements are read first and the elements (with
+their prefetched relations) are loaded a chunk at a time, so the memory
+used does not depend on the size of the project and the first bytes are
+sent as soon as the first chunk is written.
+"""
+
+import csv
+import io
+import re
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+
+CSV_BUFFER_SIZE = 64 * 1024
+
+ACCEPTS_GZIP_RE = re.compile(r"\bgzip\b")
+
+
+def iter_queryset_in_chunks(queryset, chunk_size=None):
+    """
+    Yield the elements of the queryset, in its order, loading them (and
+    their prefetched relations) `chunk_size` at a time.
+    """
+    chunk_size = chunk_size or settings.CSV_EXPORT_CHUNK_SIZE
+    ids = list(queryset.prefetch_related(None).values_list("pk", flat=True))
+
+    for start in range(0, len(ids), chunk_size):
+        chunk_ids = ids[start:start + chunk_size]
+        elements = {element.pk: element for element in queryset.filter(pk__in=chunk_ids)}
+        for id in chunk_ids:
+            if id in elements:
+                yield elements[id]
+
+
+def iter_csv(fieldnames, rows, buffer_size=CSV_BUFFER_SIZE):
+    """
+    Yield the CSV file of the `rows` dicts in pieces of about
+    `buffer_size` characters. The header is yielded first.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= buffer_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def csv_response(request, content, filename):
+    """
+    Return a streaming response sending the `content` pieces of a CSV file
+    as an attachment, compressed with gzip if the client accepts it.
+    """
+    content = (piece.encode("utf-8") for piece in content)
+
+    use_gzip = (settings.CSV_EXPORT_GZIP and
+                ACCEPTS_GZIP_RE.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+    if use_gzip:
+        content = compress_sequence(content)
+
+    response = StreamingHttpResponse(content, content_type="application/csv; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
+    if use_gzip:
+        response["Content-Encoding"] = "gzip"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
@@ -38,6 +38,13 @@ if settings.SEND_BULK_EMAILS_WITH_CELERY and settings.CHANGE_NOTIFICATIONS_MIN_I
         'args': (),
     }
 
+if getattr(settings, "PROJECT_TOTALS_REFRESH_INTERVAL", 0) > 0:
+    app.conf.beat_schedule['refresh-projects-totals'] = {
+        'task': 'taiga.projects.services.totals.refresh_projects_totals',
+        'schedule': settings.PROJECT_TOTALS_REFRESH_INTERVAL,
+        'args': (),
+    }
+
 if ('taiga.auth.token_denylist' in settings.INSTALLED_APPS and
         getattr(settings, "FLUSH_REFRESHED_TOKENS_PERIODICITY", None)):
     app.conf.beat_schedule['auth-flush-expired-tokens'] = {
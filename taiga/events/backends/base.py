@@ -17,6 +17,14 @@ class BaseEventsPushBackend(object, metaclass=abc.ABCMeta):
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
         pass
 
+    def emit_events(self, events):
+        """
+        Emit a batch of events. `events` is a list of
+        (channel, routing_key, message) tuples.
+        """
+        for channel, routing_key, message in events:
+            self.emit_event(message, routing_key=routing_key, channel=channel)
+
 
 def load_class(path):
     """
@@ -11,13 +11,29 @@ from django.db import connection
 from . import base
 
 
+def _make_notify_sql(routing_key:str, channel:str) -> str:
+    routing_key = routing_key.replace(".", "__")
+    channel = "{channel}_{routing_key}".format(channel=channel,
+                                               routing_key=routing_key)
+    return "NOTIFY {channel}, %s".format(channel=channel)
+
+
 class EventsPushBackend(base.BaseEventsPushBackend):
     @transaction.atomic
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
-        routing_key = routing_key.replace(".", "__")
-        channel = "{channel}_{routing_key}".format(channel=channel,
-                                                   routing_key=routing_key)
-        sql = "NOTIFY {channel}, %s".format(channel=channel)
+        sql = _make_notify_sql(routing_key, channel)
         cursor = connection.cursor()
         cursor.execute(sql, [message])
         cursor.close()
+
+    @transaction.atomic
+    def emit_events(self, events):
+        if not events:
+            return
+
+        # One round trip with a multi-statement NOTIFY
+        sql = ";\n".join(_make_notify_sql(routing_key, channel) for channel, routing_key, _ in events)
+        params = [message for _, _, message in events]
+        cursor = connection.cursor()
+        cursor.execute(sql, params)
+        cursor.close()
@@ -5,11 +5,12 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
-import json
 import logging
+import os
+import threading
 
 from amqp import Connection as AmqpConnection
-from amqp.exceptions import AccessRefused
+from amqp.exceptions import AccessRefused, ConnectionError as AmqpConnectionError, NotFound, RecoverableChannelError
 from amqp.basic_message import Message as AmqpMessage
 from urllib.parse import urlparse
 
@@ -17,8 +18,11 @@ from . import base
 
 log = logging.getLogger("tagia.events")
 
+# Errors of the connection or the channel worth opening them again
+RETRY_ERRORS = (OSError, AmqpConnectionError, RecoverableChannelError)
 
-def _make_rabbitmq_connection(url):
+
+def _make_rabbitmq_connection(url, **kwargs):
     parse_result = urlparse(url)
 
     # Parse host & user/password
@@ -34,17 +38,142 @@ def _make_rabbitmq_connection(url):
 
     vhost = parse_result.path
     return AmqpConnection(host=host, userid=user,
-                          password=password, virtual_host=vhost[1:])
+                          password=password, virtual_host=vhost[1:], **kwargs)
+
+
+class RabbitMQPublisher:
+    """
+    Long-lived AMQP publisher.
+
+    Keeps one connection and one channel open per process, declares every
+    exchange only once (again if the broker has deleted it) and
+    transparently reconnects when the connection is lost. The owner pid is
+    tracked so a forked child (celery prefork, uwsgi, gunicorn...) never
+    reuses the socket inherited from its parent.
+    """
+
+    def __init__(self, url, *, confirm_publish=True, max_retries=1):
+        self.url = url
+        self.confirm_publish = confirm_publish
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._connection = None
+        self._channel = None
+        self._declared_exchanges = set()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            # The socket belongs to the parent process, drop it without closing
+            # so the parent keeps its connection alive.
+            self._reset()
+
+    def _ensure_channel(self):
+        if self._channel is not None and self._connection is not None and self._connection.connected:
+            return self._channel
+
+        self.close()
+        connection = _make_rabbitmq_connection(self.url, confirm_publish=self.confirm_publish)
+        connection.connect()
+        self._connection = connection
+        self._channel = connection.channel()
+        return self._channel
+
+    def _declare_exchange(self, channel, exchange):
+        if exchange in self._declared_exchanges:
+            return
+        channel.exchange_declare(exchange=exchange, type="topic", auto_delete=True)
+        self._declared_exchanges.add(exchange)
+
+    def _open_channel(self, exchange):
+        attempt = 0
+        while True:
+            try:
+                channel = self._ensure_channel()
+                self._declare_exchange(channel, exchange)
+                return channel
+            except (ConnectionRefusedError, AccessRefused):
+                self.close()
+                raise
+            except RETRY_ERRORS:
+                self.close()
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+            except Exception:
+                self.close()
+                raise
+
+    def publish(self, message:str, *, routing_key:str, exchange:str):
+        with self._lock:
+            self._check_pid()
+            for attempt in range(2):
+                channel = self._open_channel(exchange)
+                try:
+                    channel.basic_publish(AmqpMessage(message), routing_key=routing_key, exchange=exchange)
+                    return
+                except NotFound:
+                    # The broker deletes the (auto_delete) exchange once its last
+                    # queue is unbound, so the message was not routed; the
+                    # exchange is declared again and the message sent once more
+                    self.close()
+                    if attempt:
+                        raise
+                except Exception:
+                    # The message could have been delivered, so it is not sent
+                    # again; the connection is opened again for the next one
+                    self.close()
+                    raise
+
+    def close(self):
+        connection = self._connection
+        self._connection = None
+        self._channel = None
+        self._declared_exchanges = set()
+
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+_publishers = {}
+_publishers_lock = threading.Lock()
+
+
+def get_publisher(url, **options):
+    """
+    Return the publisher of the current process for `url`.
+    """
+    key = (os.getpid(), url)
+    publisher = _publishers.get(key)
+    if publisher is None:
+        with _publishers_lock:
+            publisher = _publishers.get(key)
+            if publisher is None:
+                # Forget publishers inherited from a parent process
+                for stale_key in [k for k in _publishers if k[0] != key[0]]:
+                    del _publishers[stale_key]
+                publisher = RabbitMQPublisher(url, **options)
+                _publishers[key] = publisher
+    return publisher
 
 
 class EventsPushBackend(base.BaseEventsPushBackend):
-    def __init__(self, url):
+    def __init__(self, url, confirm_publish=True, max_retries=1):
         self.url = url
+        self.confirm_publish = confirm_publish
+        self.max_retries = max_retries
 
     def emit_event(self, message:str, *, routing_key:str, channel:str="events"):
-        connection = _make_rabbitmq_connection(self.url)
+        publisher = get_publisher(self.url, confirm_publish=self.confirm_publish,
+                                  max_retries=self.max_retries)
         try:
-            connection.connect()
+            publisher.publish(message, routing_key=routing_key, exchange=channel)
         except ConnectionRefusedError:
             err_msg = "EventsPushBackend: Unable to connect with RabbitMQ (connection refused) at {}".format(
                                                                                                      self.url)
@@ -53,15 +182,5 @@ class EventsPushBackend(base.BaseEventsPushBackend):
             err_msg = "EventsPushBackend: Unable to connect with RabbitMQ (access refused) at {}".format(
                                                                                                  self.url)
             log.error(err_msg, exc_info=True)
-        else:
-            try:
-                message = AmqpMessage(message)
-                rchannel = connection.channel()
-
-                rchannel.exchange_declare(exchange=channel, type="topic", auto_delete=True)
-                rchannel.basic_publish(message, routing_key=routing_key, exchange=channel)
-                rchannel.close()
-            except Exception:
-                log.error("EventsPushBackend: Unhandled exception", exc_info=True)
-            finally:
-                connection.close()
+        except Exception:
+            log.error("EventsPushBackend: Unhandled exception", exc_info=True)
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+import collections
+
+from django.db import connection
+
+from taiga.base.utils import json
+
+from . import backends
+
+
+MODEL_EVENT_KEYS = frozenset(["type", "matches", "pk"])
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_MESSAGE_SIZE = 7999
+
+
+class EventsBuffer:
+    """
+    Collect the events emitted inside a transaction and send them once
+    it is commited.
+
+    Model events ({"type", "matches", "pk"}) sharing the same channel,
+    routing key, session, type and content type are merged into a single
+    message whose "pk" is the list of affected ids (the same format used by
+    `emit_event_for_ids`); repeated pks are sent only once. Any other event
+    is deduplicated by its content.
+
+    The merged pk lists are split into several messages so that none of
+    them is bigger than `MAX_MESSAGE_SIZE` bytes.
+    """
+
+    def __init__(self):
+        self._events = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, data:dict, *, routing_key:str, channel:str):
+        payload = data.get("data")
+
+        if isinstance(payload, dict) and set(payload.keys()) == MODEL_EVENT_KEYS:
+            key = ("model", channel, routing_key, data.get("session_id"),
+                   payload["type"], payload["matches"])
+            entry = self._events.get(key)
+            if entry is None:
+                entry = self._events[key] = {"data": data, "pks": collections.OrderedDict(), "many": False}
+
+            pk = payload["pk"]
+            if isinstance(pk, (list, tuple, set)):
+                entry["many"] = True
+                for item in pk:
+                    entry["pks"][item] = None
+            else:
+                entry["pks"][pk] = None
+        else:
+            message = json.dumps(data)
+            key = ("raw", channel, routing_key, message)
+            self._events.setdefault(key, {"message": message})
+
+    def messages(self):
+        for key, entry in self._events.items():
+            channel, routing_key = key[1], key[2]
+
+            if key[0] == "raw":
+                yield (channel, routing_key, entry["message"])
+                continue
+
+            pks = list(entry["pks"].keys())
+            if not entry["many"] and len(pks) == 1:
+                yield (channel, routing_key, self._model_message(entry["data"], pks[0]))
+                continue
+
+            for chunk in self._split_pks(entry["data"], pks):
+                yield (channel, routing_key, self._model_message(entry["data"], chunk))
+
+    def _model_message(self, data:dict, pk) -> str:
+        data = dict(data)
+        data["data"] = dict(data["data"])
+        data["data"]["pk"] = pk
+        return json.dumps(data)
+
+    def _split_pks(self, data:dict, pks:list):
+        # The size of a message is the size of the message with no pks plus
+        # the size of every pk and its ", " separator.
+        empty_size = len(self._model_message(data, []).encode("utf-8"))
+        chunk, size = [], empty_size
+        for pk in pks:
+            pk_size = len(json.dumps(pk).encode("utf-8")) + (2 if chunk else 0)
+            if chunk and size + pk_size > MAX_MESSAGE_SIZE:
+                yield chunk
+                chunk, size = [], empty_size
+                pk_size -= 2
+            chunk.append(pk)
+            size += pk_size
+        yield chunk
+
+    def flush(self):
+        events = list(self.messages())
+        self._events.clear()
+
+        if events:
+            backends.get_events_backend().emit_events(events)
+
+
+def _is_pending(callback):
+    return any(item[1] is callback for item in connection.run_on_commit)
+
+
+def get_transaction_events_buffer():
+    """
+    Return the events buffer of the current transaction (and savepoint),
+    registering its flush as an `on_commit` callback the first time it is
+    requested.
+
+    Must be called inside an atomic block. There is a buffer for every
+    savepoint, so when a savepoint is rolled back Django discards the
+    callback of its buffer and its events are never sent; the buffers of
+    the released savepoints are sent when the transaction is committed.
+    """
+    buffers = getattr(connection, "_taiga_events_buffers", None)
+    if buffers is None:
+        buffers = connection._taiga_events_buffers = {}
+
+    key = tuple(connection.savepoint_ids)
+    state = buffers.get(key)
+    if state is not None and _is_pending(state[1]):
+        return state[0]
+
+    # Forget the buffers of the savepoints rolled back or already sent
+    for other_key, (other_buffer, other_flush) in list(buffers.items()):
+        if not _is_pending(other_flush):
+            del buffers[other_key]
+
+    buffer = EventsBuffer()
+
+    def flush_events_buffer():
+        if buffers.get(key) is state_ref:
+            del buffers[key]
+        buffer.flush()
+
+    state_ref = (buffer, flush_events_buffer)
+    buffers[key] = state_ref
+    connection.on_commit(flush_events_buffer)
+    return buffer
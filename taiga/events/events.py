@@ -16,6 +16,7 @@ from taiga.base.utils import json
 from taiga.base.utils.db import get_typename_for_model_instance
 from . import middleware as mw
 from . import backends
+from .buffer import get_transaction_events_buffer
 from taiga.front.templatetags.functions import resolve
 from taiga.projects.history.choices import HistoryType
 
@@ -29,15 +30,13 @@ def emit_event(data:dict, routing_key:str, *,
     data = {"session_id": sessionid,
             "data": data}
 
-    backend = backends.get_events_backend()
-
-    def backend_emit_event():
-        backend.emit_event(message=json.dumps(data), routing_key=routing_key, channel=channel)
-
-    if on_commit:
-        connection.on_commit(backend_emit_event)
+    if on_commit and connection.in_atomic_block:
+        # Events are coalesced and sent in batch when the transaction is commited
+        buffer = get_transaction_events_buffer()
+        buffer.add(data, routing_key=routing_key, channel=channel)
     else:
-        backend_emit_event()
+        backend = backends.get_events_backend()
+        backend.emit_event(message=json.dumps(data), routing_key=routing_key, channel=channel)
 
 
 def emit_event_for_model(obj, *, type:str="change", channel:str="events",
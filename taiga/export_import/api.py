@@ -5,7 +5,6 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
-import codecs
 import uuid
 import gzip
 
@@ -17,7 +16,6 @@ from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 
-from taiga.base.utils import json
 from taiga.base.decorators import detail_route, list_route
 from taiga.base import exceptions as exc
 from taiga.base import response
@@ -326,26 +324,23 @@ class ProjectImporterViewSet(mixins.ImportThrottlingPolicyMixin, CreateModelMixi
         if not dump:
             raise exc.WrongArguments(_("Needed dump file"))
 
-        if dump.content_type == "application/gzip":
-            dump = gzip.GzipFile(fileobj=dump)
-
-        reader = codecs.getreader("utf-8")
+        is_gzip = dump.content_type == "application/gzip"
 
+        # Read only the project data, user stories, tasks, issues... (and
+        # their attachments) are not kept in memory
         try:
-            dump = json.load(reader(dump))
+            header = services.stream.read_dump_header(gzip.GzipFile(fileobj=dump) if is_gzip else dump)
         except Exception:
             raise exc.WrongArguments(_("Invalid dump format"))
 
-        slug = dump.get('slug', None)
-        if slug is not None and Project.objects.filter(slug=slug).exists():
-            del dump['slug']
+        slug = header.get('slug', None)
+        discard_slug = slug is not None and Project.objects.filter(slug=slug).exists()
 
         user = request.user
-        dump['owner'] = user.email
 
         # Validate if the project can be imported
-        is_private = dump.get("is_private", False)
-        memberships = [m["email"] for m in dump.get("memberships", []) if m.get("email", None)]
+        is_private = header.get("is_private", False)
+        memberships = [m["email"] for m in header.get("memberships", []) if m.get("email", None)]
         (enough_slots, error_message, total_memberships) = services.has_available_slot_for_new_project(
             user,
             is_private,
@@ -354,14 +349,18 @@ class ProjectImporterViewSet(mixins.ImportThrottlingPolicyMixin, CreateModelMixi
         if not enough_slots:
             raise exc.NotEnoughSlotsForProject(is_private, total_memberships, error_message)
 
+        dump.seek(0)
+        dump_path = services.stream.save_dump_file(dump, is_gzip=is_gzip)
+
         # Async mode
         if settings.CELERY_ENABLED:
-            task = tasks.load_project_dump.delay(user, dump)
+            task = tasks.load_project_dump.delay(user, dump_path, discard_slug=discard_slug)
             return response.Accepted({"import_id": task.id})
 
         # Sync mode
         try:
-            project = services.store_project_from_dict(dump, request.user)
+            with services.stream.open_dump_file(dump_path) as dump_file:
+                project = services.store_project_from_dump(dump_file, request.user, discard_slug=discard_slug)
         except err.TaigaImportError as e:
             # On Error
             ## remove project
@@ -376,3 +375,5 @@ class ProjectImporterViewSet(mixins.ImportThrottlingPolicyMixin, CreateModelMixi
             response_data = ProjectSerializer(project_from_qs).data
 
             return response.Created(response_data)
+        finally:
+            default_storage.delete(dump_path)
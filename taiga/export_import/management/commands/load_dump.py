@@ -37,7 +37,10 @@ class Command(BaseCommand):
         owner_email = options["owner_email"]
         overwrite = options["overwrite"]
 
-        data = json.loads(open(dump_file_path, 'r').read())
+        with open(dump_file_path, 'rb') as dump_file:
+            data = services.stream.read_dump_header(dump_file)
+
+        discard_slug = False
         try:
             if overwrite:
                 receivers_back = signals.post_delete.receivers
@@ -55,11 +58,11 @@ class Command(BaseCommand):
                 signals.post_delete.receivers = receivers_back
             else:
                 slug = data.get('slug', None)
-                if slug is not None and Project.objects.filter(slug=slug).exists():
-                    del data['slug']
+                discard_slug = slug is not None and Project.objects.filter(slug=slug).exists()
 
             user = User.objects.get(email=owner_email)
-            services.store_project_from_dict(data, user)
+            with open(dump_file_path, 'rb') as dump_file:
+                services.store_project_from_dump(dump_file, user, discard_slug=discard_slug)
         except err.TaigaImportError as e:
             if e.project:
                 e.project.delete_related_content()
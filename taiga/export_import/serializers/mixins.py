@@ -82,10 +82,13 @@ class HistoryExportSerializerMixin(serializers.LightSerializer):
         raise NotImplementedError()
 
     def get_history(self, obj):
-        history_qs = history_service.get_history_queryset_by_model_instance(
-            obj,
-            types=(history_models.HistoryType.change, history_models.HistoryType.create,)
-        )
+        # Prefetched by the export renderer
+        history_qs = getattr(obj, "_exported_history", None)
+        if history_qs is None:
+            history_qs = history_service.get_history_queryset_by_model_instance(
+                obj,
+                types=(history_models.HistoryType.change, history_models.HistoryType.create,)
+            )
         return HistoryExportSerializer(history_qs, many=True,
                                        statuses_queryset=self.statuses_queryset(obj.project)).data
 
@@ -107,6 +110,11 @@ class AttachmentExportSerializerMixin(serializers.LightSerializer):
     attachments = MethodField()
 
     def get_attachments(self, obj):
+        # Already serialized by the export renderer
+        exported_attachments = getattr(obj, "_exported_attachments", None)
+        if exported_attachments is not None:
+            return exported_attachments
+
         content_type = ContentType.objects.get_for_model(obj.__class__)
         attachments_qs = attachments_models.Attachment.objects.filter(object_id=obj.pk,
                                                                       content_type=content_type)
@@ -11,8 +11,10 @@
 from .render import render_project
 from . import render
 
-from .store import store_project_from_dict
+from .store import store_project_from_dict, store_project_from_dump
 from . import store
 
+from . import stream
+
 from .validations import has_available_slot_for_new_project
 from . import validations
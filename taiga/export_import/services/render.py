@@ -8,81 +8,167 @@
 # This makes all code that import services works and
 # is not the baddest practice ;)
 
-import gc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 
 from taiga.base.utils import json
 from taiga.base.fields import MethodField
 from taiga.timeline.service import get_project_timeline
 from taiga.base.api.fields import get_component
+from taiga.projects.attachments.models import Attachment
+from taiga.projects.history.models import HistoryEntry, HistoryType
+from taiga.projects.history.services import make_key_from_model_object
 
 from .. import serializers
 
 
-def render_project(project, outfile, chunk_size=8190):
-    serializer = serializers.ProjectExportSerializer(project)
-    outfile.write(b'{\n')
-
-    first_field = True
-    for field_name in serializer._field_map.keys():
-        # Avoid writing "," in the last element
-        if not first_field:
-            outfile.write(b",\n")
-        else:
-            first_field = False
+class BufferedExportWriter:
+    """
+    Accumulate the rendered dump and write it to the output file in blocks
+    of `buffer_size` bytes.
+    """
+
+    def __init__(self, outfile, buffer_size=1024 * 1024):
+        self.outfile = outfile
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._size = 0
+
+    def write(self, data:str):
+        data = data.encode()
+        self._buffer.append(data)
+        self._size += len(data)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.outfile.write(b"".join(self._buffer))
+            self._buffer = []
+            self._size = 0
+
+
+def _iter_chunks(queryset, chunk_size):
+    """
+    Iterate over the objects of a queryset fetching them in chunks of
+    `chunk_size` (keeping the queryset order).
+    """
+    ids = list(queryset.values_list("id", flat=True))
+    for index in range(0, len(ids), chunk_size):
+        chunk_ids = ids[index:index + chunk_size]
+        objs = {obj.id: obj for obj in queryset.filter(id__in=chunk_ids)}
+        yield [objs[id] for id in chunk_ids if id in objs]
+
+
+def _prefetch_history(objs):
+    entries = defaultdict(list)
+    keys = [make_key_from_model_object(obj) for obj in objs]
+    history_qs = (HistoryEntry.objects.filter(key__in=keys,
+                                              type__in=(HistoryType.change, HistoryType.create),
+                                              is_hidden=False)
+                                      .order_by("created_at"))
+    for entry in history_qs:
+        entries[entry.key].append(entry)
+
+    for key, obj in zip(keys, objs):
+        obj._exported_history = entries[key]
+
+
+def _serialize_attachment(attachment):
+    return serializers.AttachmentExportSerializer(attachment).data
+
+
+def _prefetch_attachments(objs, executor):
+    content_type = ContentType.objects.get_for_model(objs[0].__class__)
+    attachments_qs = (Attachment.objects.filter(content_type=content_type,
+                                                object_id__in=[obj.id for obj in objs])
+                                        .select_related("owner"))
+
+    # Reading and encoding the files is the slow part, do it in parallel
+    attachments = defaultdict(list)
+    for attachment in attachments_qs:
+        attachments[attachment.object_id].append(executor.submit(_serialize_attachment, attachment))
+
+    for obj in objs:
+        obj._exported_attachments = [future.result() for future in attachments[obj.id]]
+
+
+def _write_section(writer, project, field_name, field, executor, chunk_size):
+    value = get_component(project, field_name)
+    if field_name != "wiki_pages":
+        value = value.select_related('owner', 'status',
+                                     'project', 'assigned_to',
+                                     'custom_attributes_values')
+
+    if field_name in ["user_stories", "tasks", "issues"]:
+        value = value.select_related('milestone')
+
+    if field_name == "issues":
+        value = value.select_related('severity', 'priority', 'type')
+
+    writer.write('"{}": [\n'.format(field_name))
+
+    field.many = False
+    first_item = True
+    for objs in _iter_chunks(value, chunk_size):
+        _prefetch_history(objs)
+        _prefetch_attachments(objs, executor)
+
+        for item in objs:
+            # Avoid writing "," in the last element
+            if not first_item:
+                writer.write(",\n")
+            else:
+                first_item = False
 
-        field = serializer._field_map.get(field_name)
-        # field.initialize(parent=serializer, field_name=field_name)
+            writer.write(json.dumps(field.to_value(item)))
 
-        # These four "special" fields hava attachments so we use them in a special way
-        if field_name in ["wiki_pages", "user_stories", "tasks", "issues", "epics"]:
-            value = get_component(project, field_name)
-            if field_name != "wiki_pages":
-                value = value.select_related('owner', 'status',
-                                             'project', 'assigned_to',
-                                             'custom_attributes_values')
+    writer.write(']')
 
-            if field_name in ["user_stories", "tasks", "issues"]:
-                value = value.select_related('milestone')
 
-            if field_name == "issues":
-                value = value.select_related('severity', 'priority', 'type')
-            value = value.prefetch_related('history_entry', 'attachments')
+def render_project(project, outfile, chunk_size=100):
+    serializer = serializers.ProjectExportSerializer(project)
+    writer = BufferedExportWriter(outfile)
+    writer.write('{\n')
+
+    max_workers = getattr(settings, "EXPORTS_ATTACHMENTS_WORKERS", 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        first_field = True
+        for field_name in serializer._field_map.keys():
+            # Avoid writing "," in the last element
+            if not first_field:
+                writer.write(",\n")
+            else:
+                first_field = False
 
-            outfile.write('"{}": [\n'.format(field_name).encode())
+            field = serializer._field_map.get(field_name)
+            # field.initialize(parent=serializer, field_name=field_name)
 
-            first_item = True
-            for item in value.iterator():
-                # Avoid writing "," in the last element
-                if not first_item:
-                    outfile.write(b",\n")
-                else:
-                    first_item = False
-
-                field.many = False
-                dumped_value = json.dumps(field.to_value(item))
-                outfile.write(dumped_value.encode())
-                outfile.flush()
-            gc.collect()
-            outfile.write(b']')
-        else:
-            if isinstance(field, MethodField):
-                value = field.as_getter(field_name, serializers.ProjectExportSerializer)(serializer, project)
+            # These four "special" fields hava attachments so we use them in a special way
+            if field_name in ["wiki_pages", "user_stories", "tasks", "issues", "epics"]:
+                _write_section(writer, project, field_name, field, executor, chunk_size)
             else:
-                attr = getattr(project, field_name)
-                value = field.to_value(attr)
-            outfile.write('"{}": {}'.format(field_name, json.dumps(value)).encode())
+                if isinstance(field, MethodField):
+                    value = field.as_getter(field_name, serializers.ProjectExportSerializer)(serializer, project)
+                else:
+                    attr = getattr(project, field_name)
+                    value = field.to_value(attr)
+                writer.write('"{}": {}'.format(field_name, json.dumps(value)))
 
     # Generate the timeline
-    outfile.write(b',\n"timeline": [\n')
+    writer.write(',\n"timeline": [\n')
     first_timeline = True
     for timeline_item in get_project_timeline(project).iterator():
         # Avoid writing "," in the last element
         if not first_timeline:
-            outfile.write(b",\n")
+            writer.write(",\n")
         else:
             first_timeline = False
 
-        dumped_value = json.dumps(serializers.TimelineExportSerializer(timeline_item).data)
-        outfile.write(dumped_value.encode())
+        writer.write(json.dumps(serializers.TimelineExportSerializer(timeline_item).data))
 
-    outfile.write(b']}\n')
+    writer.write(']}\n')
+    writer.flush()
@@ -9,6 +9,7 @@
 # is not the baddest practice ;)
 
 import os
+import tempfile
 import uuid
 
 from unidecode import unidecode
@@ -19,6 +20,7 @@ from django.db import utils
 from django.template.defaultfilters import slugify
 from django.utils.translation import ugettext as _
 
+from taiga.projects.history.models import HistoryEntry
 from taiga.projects.history.services import make_key_from_model_object, take_snapshot
 from taiga.projects.models import Membership
 from taiga.projects.references import sequences as seq
@@ -30,6 +32,7 @@ from taiga.timeline.service import build_project_namespace
 from .. import exceptions as err
 from .. import validators
 from .. import services
+from . import stream
 
 import logging
 logger = logging.getLogger('taiga.export_import')
@@ -110,6 +113,14 @@ def _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes, v
     return ret
 
 
+def _get_element_lookups(project, statuses_field, custom_attributes_field):
+    # Resolved once for all the elements of a kind instead of once per element
+    return {
+        "statuses": {s.name: s.id for s in getattr(project, statuses_field).all()},
+        "custom_attributes": list(getattr(project, custom_attributes_field).all().values('id', 'name')),
+    }
+
+
 def _store_custom_attributes_values(obj, data_values, obj_field, serializer_class):
     data = {
         obj_field: obj.id,
@@ -147,18 +158,24 @@ def _store_attachment(project, obj, attachment):
     return validator
 
 
-def _store_history(project, obj, history, statuses={}):
-    validator = validators.HistoryExportValidator(data=history, context={"project": project, "statuses": statuses})
-    if validator.is_valid():
-        validator.object.key = make_key_from_model_object(obj)
-        if validator.object.diff is None:
-            validator.object.diff = []
-        validator.object.project_id = project.id
-        validator.object._importing = True
-        validator.save()
-        return validator
-    add_errors("history", validator.errors)
-    return validator
+def _store_history_entries(project, obj, history_entries, statuses={}):
+    # The entries are validated one by one and created with a single query
+    entries = []
+    key = make_key_from_model_object(obj)
+    for history in history_entries:
+        validator = validators.HistoryExportValidator(data=history, context={"project": project, "statuses": statuses})
+        if validator.is_valid():
+            validator.object.key = key
+            if validator.object.diff is None:
+                validator.object.diff = []
+            validator.object.project_id = project.id
+            validator.object._importing = True
+            entries.append(validator.object)
+        else:
+            add_errors("history", validator.errors)
+
+    HistoryEntry.objects.bulk_create(entries)
+    return entries
 
 
 ## ROLES
@@ -369,7 +386,10 @@ def _store_role_point(project, us, role_point):
     return None
 
 
-def store_user_story(project, data):
+def store_user_story(project, data, lookups=None):
+    if lookups is None:
+        lookups = _get_element_lookups(project, "us_statuses", "userstorycustomattributes")
+
     if "status" not in data and project.default_us_status:
         data["status"] = project.default_us_status.name
 
@@ -404,16 +424,15 @@ def store_user_story(project, data):
             _store_role_point(project, validator.object, role_point)
 
         history_entries = data.get("history", [])
-        statuses = {s.name: s.id for s in project.us_statuses.all()}
-        for history in history_entries:
-            _store_history(project, validator.object, history, statuses)
+        statuses = lookups["statuses"]
+        _store_history_entries(project, validator.object, history_entries, statuses)
 
         if not history_entries:
             take_snapshot(validator.object, user=validator.object.owner)
 
         custom_attributes_values = data.get("custom_attributes_values", None)
         if custom_attributes_values:
-            custom_attributes = validator.object.project.userstorycustomattributes.all().values('id', 'name')
+            custom_attributes = lookups["custom_attributes"]
             custom_attributes_values = \
                 _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes,
                                                                         custom_attributes_values)
@@ -430,8 +449,9 @@ def store_user_story(project, data):
 
 def store_user_stories(project, data):
     user_stories = {}
+    lookups = _get_element_lookups(project, "us_statuses", "userstorycustomattributes")
     for userstory in data.get("user_stories", []):
-        validator = store_user_story(project, userstory)
+        validator = store_user_story(project, userstory, lookups=lookups)
         if validator:
             user_stories[validator.object.ref] = validator.object
     return user_stories
@@ -473,7 +493,10 @@ def _store_epic_related_user_story(project, epic, related_user_story):
     return None
 
 
-def store_epic(project, data):
+def store_epic(project, data, lookups=None):
+    if lookups is None:
+        lookups = _get_element_lookups(project, "epic_statuses", "epiccustomattributes")
+
     if "status" not in data and project.default_epic_status:
         data["status"] = project.default_epic_status.name
 
@@ -511,16 +534,15 @@ def store_epic(project, data):
             _store_epic_related_user_story(project, validator.object, related_user_story)
 
         history_entries = data.get("history", [])
-        statuses = {s.name: s.id for s in project.epic_statuses.all()}
-        for history in history_entries:
-            _store_history(project, validator.object, history, statuses)
+        statuses = lookups["statuses"]
+        _store_history_entries(project, validator.object, history_entries, statuses)
 
         if not history_entries:
             take_snapshot(validator.object, user=validator.object.owner)
 
         custom_attributes_values = data.get("custom_attributes_values", None)
         if custom_attributes_values:
-            custom_attributes = validator.object.project.epiccustomattributes.all().values('id', 'name')
+            custom_attributes = lookups["custom_attributes"]
             custom_attributes_values = \
                 _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes,
                                                                         custom_attributes_values)
@@ -536,15 +558,19 @@ def store_epic(project, data):
 
 def store_epics(project, data):
     results = []
+    lookups = _get_element_lookups(project, "epic_statuses", "epiccustomattributes")
     for epic in data.get("epics", []):
-        epic = store_epic(project, epic)
+        epic = store_epic(project, epic, lookups=lookups)
         results.append(epic)
     return results
 
 
 ## TASKS
 
-def store_task(project, data):
+def store_task(project, data, lookups=None):
+    if lookups is None:
+        lookups = _get_element_lookups(project, "task_statuses", "taskcustomattributes")
+
     if "status" not in data and project.default_task_status:
         data["status"] = project.default_task_status.name
 
@@ -572,16 +598,15 @@ def store_task(project, data):
             _store_attachment(project, validator.object, task_attachment)
 
         history_entries = data.get("history", [])
-        statuses = {s.name: s.id for s in project.task_statuses.all()}
-        for history in history_entries:
-            _store_history(project, validator.object, history, statuses)
+        statuses = lookups["statuses"]
+        _store_history_entries(project, validator.object, history_entries, statuses)
 
         if not history_entries:
             take_snapshot(validator.object, user=validator.object.owner)
 
         custom_attributes_values = data.get("custom_attributes_values", None)
         if custom_attributes_values:
-            custom_attributes = validator.object.project.taskcustomattributes.all().values('id', 'name')
+            custom_attributes = lookups["custom_attributes"]
             custom_attributes_values = \
                 _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes,
                                                                         custom_attributes_values)
@@ -598,8 +623,9 @@ def store_task(project, data):
 
 def store_tasks(project, data):
     tasks = {}
+    lookups = _get_element_lookups(project, "task_statuses", "taskcustomattributes")
     for task in data.get("tasks", []):
-        validator = store_task(project, task)
+        validator = store_task(project, task, lookups=lookups)
         if validator:
             tasks[validator.object.ref] = validator.object
     return tasks
@@ -607,7 +633,10 @@ def store_tasks(project, data):
 
 ## ISSUES
 
-def store_issue(project, data):
+def store_issue(project, data, lookups=None):
+    if lookups is None:
+        lookups = _get_element_lookups(project, "issue_statuses", "issuecustomattributes")
+
     validator = validators.IssueExportValidator(data=data, context={"project": project})
 
     if "type" not in data and project.default_issue_type:
@@ -645,16 +674,15 @@ def store_issue(project, data):
             _store_attachment(project, validator.object, attachment)
 
         history_entries = data.get("history", [])
-        statuses = {s.name: s.id for s in project.issue_statuses.all()}
-        for history in history_entries:
-            _store_history(project, validator.object, history, statuses)
+        statuses = lookups["statuses"]
+        _store_history_entries(project, validator.object, history_entries, statuses)
 
         if not history_entries:
             take_snapshot(validator.object, user=validator.object.owner)
 
         custom_attributes_values = data.get("custom_attributes_values", None)
         if custom_attributes_values:
-            custom_attributes = validator.object.project.issuecustomattributes.all().values('id', 'name')
+            custom_attributes = lookups["custom_attributes"]
             custom_attributes_values = \
                 _use_id_instead_name_as_key_in_custom_attributes_values(custom_attributes,
                                                                         custom_attributes_values)
@@ -670,8 +698,9 @@ def store_issue(project, data):
 
 def store_issues(project, data):
     issues = {}
+    lookups = _get_element_lookups(project, "issue_statuses", "issuecustomattributes")
     for issue in data.get("issues", []):
-        validator = store_issue(project, issue)
+        validator = store_issue(project, issue, lookups=lookups)
         if validator:
             issues[validator.object.ref] = validator.object
     return issues
@@ -695,8 +724,7 @@ def store_wiki_page(project, wiki_page):
             _store_attachment(project, validator.object, attachment)
 
         history_entries = wiki_page.get("history", [])
-        for history in history_entries:
-            _store_history(project, validator.object, history)
+        _store_history_entries(project, validator.object, history_entries)
 
         if not history_entries:
             take_snapshot(validator.object, user=validator.object.owner)
@@ -928,3 +956,20 @@ def store_project_from_dict(data, owner=None):
         raise err.TaigaImportError(_("unexpected error importing project"), project)
 
     return project
+
+
+def store_project_from_dump(fileobj, owner=None, discard_slug=False):
+    """
+    Import a project reading the dump from `fileobj` incrementally (see
+    `taiga.export_import.services.stream`).
+    """
+    with tempfile.TemporaryDirectory(prefix="taiga-import-") as spool_dir:
+        try:
+            data = stream.spool_dump(fileobj, spool_dir)
+        except stream.DumpFormatError as e:
+            raise err.TaigaImportError(_("Invalid dump format"), None, errors={"dump": [str(e)]})
+
+        if discard_slug:
+            data.pop("slug", None)
+
+        return store_project_from_dict(data, owner)
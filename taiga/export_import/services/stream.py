@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+Incremental reading of project dumps.
+
+A dump can be gigabytes big (attachments are embedded in base64) so it is
+never loaded at once. The big sections (STREAMED_SECTIONS) are read item by
+item and spooled to a local temporary directory, one JSON document per line,
+and the attachments of every item are decoded to their own file on the way.
+The memory used is bounded by the biggest single item of the dump, not by
+the dump size.
+"""
+
+import codecs
+import gzip
+import json
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from ..validators.fields import decode_base64_to_file
+
+
+STREAMED_SECTIONS = ("epics", "user_stories", "tasks", "issues", "wiki_pages", "timeline")
+
+READ_CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+
+class DumpFormatError(ValueError):
+    pass
+
+
+class DumpStreamReader:
+    """
+    Pull parser for the top level object of a dump.
+
+    `items()` yields (key, value) pairs; the value of the keys in
+    `streamed_sections` is an iterator over the items of the array that
+    must be consumed before asking for the next pair.
+    """
+
+    def __init__(self, fileobj, streamed_sections=STREAMED_SECTIONS):
+        self._file = codecs.getreader("utf-8")(fileobj)
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.streamed_sections = streamed_sections
+
+    def _read(self, size=READ_CHUNK_SIZE):
+        if self._eof:
+            return False
+
+        chunk = self._file.read(size)
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                raise DumpFormatError("Unexpected end of dump")
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars:
+            raise DumpFormatError("Expected '{}' at '{}'".format(chars, self._buffer[self._pos:self._pos + 20]))
+        self._pos += 1
+        return char
+
+    def _decode(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # Read (at least) as much as we already have so a big value
+                # is decoded a logarithmic number of times
+                if not self._read(max(READ_CHUNK_SIZE, len(self._buffer) - self._pos)):
+                    raise DumpFormatError(str(e)) from e
+                continue
+
+            # A number could be truncated at the end of the buffer
+            if end == len(self._buffer) and self._read():
+                continue
+
+            self._pos = end
+            return value
+
+    def _iter_array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode()
+            if self._expect(",]") == "]":
+                return
+
+    def items(self):
+        self._expect("{")
+        if self._peek() == "}":
+            return
+
+        while True:
+            if self._peek() != '"':
+                raise DumpFormatError("Expected a key")
+            key = self._decode()
+            self._expect(":")
+
+            if key in self.streamed_sections and self._peek() == "[":
+                array = self._iter_array()
+                yield key, array
+                # Skip the items the caller did not read
+                for item in array:
+                    pass
+            else:
+                yield key, self._decode()
+
+            if self._expect(",}") == "}":
+                return
+
+
+def read_dump_header(fileobj):
+    """
+    Return the dump as a dict without its streamed sections.
+    """
+    header = {}
+    for key, value in DumpStreamReader(fileobj).items():
+        if key not in STREAMED_SECTIONS:
+            header[key] = value
+    return header
+
+
+class SpooledSection:
+    """
+    Re-iterable list of items of a section spooled to disk. The attachments
+    are returned as `File` objects opened from their spooled files.
+    """
+
+    def __init__(self, path, attachments_dir):
+        self.path = path
+        self.attachments_dir = attachments_dir
+
+    def _restore_attachments(self, item):
+        for attachment in item.get("attachments", None) or []:
+            attached_file = attachment.get("attached_file", None)
+            if isinstance(attached_file, dict) and "spooled" in attached_file:
+                path = os.path.join(self.attachments_dir, "{}".format(int(attached_file["spooled"])))
+                attachment["attached_file"] = File(open(path, "rb"), name=attached_file["name"])
+        return item
+
+    def __iter__(self):
+        with open(self.path, "r", encoding="utf-8") as spool:
+            for line in spool:
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    item = self._restore_attachments(item)
+                yield item
+
+
+def _spool_attachments(item, attachments_dir, counter):
+    for attachment in item.get("attachments", None) or []:
+        if not isinstance(attachment, dict):
+            continue
+
+        attached_file = attachment.get("attached_file", None)
+        if not isinstance(attached_file, dict):
+            continue
+
+        if not attached_file.get("data", None):
+            attachment["attached_file"] = None
+            continue
+
+        index = next(counter)
+        with open(os.path.join(attachments_dir, "{}".format(index)), "wb") as outfile:
+            decode_base64_to_file(attached_file["data"], outfile)
+
+        # Never trust any other key coming from the dump
+        attachment["attached_file"] = {"name": attached_file.get("name", ""), "spooled": index}
+
+
+def spool_dump(fileobj, spool_dir):
+    """
+    Read a dump and return it as a dict where the streamed sections are
+    `SpooledSection` stored in `spool_dir`.
+    """
+    data = {}
+    attachments_dir = os.path.join(spool_dir, "attachments")
+    os.makedirs(attachments_dir, exist_ok=True)
+    counter = iter(range(2 ** 62))
+
+    for key, value in DumpStreamReader(fileobj).items():
+        if key not in STREAMED_SECTIONS or not hasattr(value, "__next__"):
+            data[key] = value
+            continue
+
+        path = os.path.join(spool_dir, "{}.jsonl".format(key))
+        with open(path, "w", encoding="utf-8") as spool:
+            for item in value:
+                if isinstance(item, dict):
+                    _spool_attachments(item, attachments_dir, counter)
+                spool.write(json.dumps(item))
+                spool.write("\n")
+
+        data[key] = SpooledSection(path, attachments_dir)
+
+    return data
+
+
+def save_dump_file(fileobj, is_gzip=False):
+    """
+    Save an uploaded dump (as it is) in the storage and return its path.
+    """
+    path = "imports/{}.json{}".format(uuid.uuid4().hex, ".gz" if is_gzip else "")
+    return default_storage.save(path, fileobj)
+
+
+def open_dump_file(path):
+    fileobj = default_storage.open(path, mode="rb")
+    if path.endswith(".gz"):
+        return gzip.GzipFile(fileobj=fileobj)
+    return fileobj
@@ -95,9 +95,18 @@ TRACE ERROR:
 
 
 @app.task
-def load_project_dump(user, dump):
+def load_project_dump(user, dump, discard_slug=False):
+    """
+    Import a project from the dump saved in the storage at the path `dump`
+    (see `services.stream.save_dump_file`). The dump is removed afterwards.
+    """
     try:
-        project = services.store_project_from_dict(dump, user)
+        if isinstance(dump, dict):
+            # Tasks enqueued before dumps were saved to the storage
+            project = services.store_project_from_dict(dump, user)
+        else:
+            with services.stream.open_dump_file(dump) as dump_file:
+                project = services.store_project_from_dump(dump_file, user, discard_slug=discard_slug)
     except err.TaigaImportError as e:
         # On Error
         ## remove project
@@ -132,3 +141,7 @@ def load_project_dump(user, dump):
         ctx = {"user": user, "project": project}
         email = mail_builder.load_dump(user, ctx)
         email.send()
+
+    finally:
+        if not isinstance(dump, dict):
+            default_storage.delete(dump)
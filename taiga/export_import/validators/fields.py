@@ -7,7 +7,9 @@
 
 import base64
 import copy
+import io
 
+from django.core.files import File
 from django.core.files.base import ContentFile
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import ugettext as _
@@ -22,6 +24,36 @@ from taiga.users import models as users_models
 from .cache import cached_get_user_by_email
 
 
+def decode_base64_to_file(data, outfile, chunk_size=4 * 64 * 1024):
+    """
+    Decode the base64 `data` of an exported file writing it to `outfile` in
+    chunks.
+    """
+    # The original file was encoded by chunks but we don't really know its
+    # length or if it was multiple of 3 so we must iterate over all those chunks
+    # decoding them one by one
+    start = 0
+    while start <= len(data):
+        end = data.find("=", start)
+        if end == -1:
+            end = len(data)
+
+        # Big chunks are decoded in slices with a length multiple of 4
+        while end - start > chunk_size:
+            outfile.write(base64.b64decode(data[start:start + chunk_size]))
+            start += chunk_size
+
+        # When encoding to base64 3 bytes are transformed into 4 bytes and
+        # the extra space of the block is filled with =
+        # We must ensure that the decoding chunk has a length multiple of 4 so
+        # we restore the stripped '='s adding appending them until the chunk has
+        # a length multiple of 4
+        decoding_chunk = data[start:end]
+        decoding_chunk += "=" * (-len(decoding_chunk) % 4)
+        outfile.write(base64.b64decode(decoding_chunk + "="))
+        start = end + 1
+
+
 class FileField(serializers.WritableField):
     read_only = False
 
@@ -29,20 +61,13 @@ class FileField(serializers.WritableField):
         if not data:
             return None
 
-        decoded_data = b''
-        # The original file was encoded by chunks but we don't really know its
-        # length or if it was multiple of 3 so we must iterate over all those chunks
-        # decoding them one by one
-        for decoding_chunk in data['data'].split("="):
-            # When encoding to base64 3 bytes are transformed into 4 bytes and
-            # the extra space of the block is filled with =
-            # We must ensure that the decoding chunk has a length multiple of 4 so
-            # we restore the stripped '='s adding appending them until the chunk has
-            # a length multiple of 4
-            decoding_chunk += "=" * (-len(decoding_chunk) % 4)
-            decoded_data += base64.b64decode(decoding_chunk + "=")
-
-        return ContentFile(decoded_data, name=data['name'])
+        # Already decoded (see `taiga.export_import.services.stream`)
+        if isinstance(data, File):
+            return data
+
+        decoded_data = io.BytesIO()
+        decode_base64_to_file(data['data'], decoded_data)
+        return ContentFile(decoded_data.getvalue(), name=data['name'])
 
 
 class ContentTypeField(serializers.RelatedField):
@@ -51,7 +51,8 @@ class AttachmentExportValidator(validators.ModelValidator):
 
     class Meta:
         model = attachments_models.Attachment
-        exclude = ('id', 'content_type', 'object_id', 'project')
+        # The thumbnails are always generated again from the imported file
+        exclude = ('id', 'content_type', 'object_id', 'project', 'thumbnails')
 
 
 class WatcheableObjectModelValidatorMixin(validators.ModelValidator):
@@ -5,7 +5,6 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
-import requests
 import asana
 from django.core.files.base import ContentFile
 from django.contrib.contenttypes.models import ContentType
@@ -22,6 +21,7 @@ from taiga.timeline.rebuilder import rebuild_timeline
 from taiga.timeline.models import Timeline
 from taiga.importers import exceptions
 from taiga.importers import services as import_service
+from taiga.importers.http_session import ImporterSession, prefetch
 
 
 class AsanaClient(asana.Client):
@@ -39,6 +39,7 @@ class AsanaImporter:
         self._import_closed_data = import_closed_data
         self._user = user
         self._client = AsanaClient.oauth(token=token)
+        self._session = ImporterSession()
 
     def list_projects(self):
         projects = []
@@ -325,8 +326,11 @@ class AsanaImporter:
             task['gid'],
             fields=['name', 'download_url', 'created_at']
         )
-        for attachment in attachments:
-            data = requests.get(attachment['download_url'])
+
+        def download(attachment):
+            return self._session.get(attachment['download_url'])
+
+        for attachment, data in prefetch(download, attachments):
             att = Attachment(
                 owner=self._user,
                 project=obj.project,
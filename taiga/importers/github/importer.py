@@ -20,6 +20,7 @@ from taiga.projects.history.services import (make_diff_from_dicts,
                                              make_diff_values,
                                              make_key_from_model_object,
                                              get_typename_for_model_class,
+                                             invalidate_snapshot_state,
                                              FrozenDiff)
 from taiga.projects.history.models import HistoryEntry
 from taiga.projects.history.choices import HistoryType
@@ -28,6 +29,7 @@ from taiga.timeline.models import Timeline
 from taiga.users.models import User, AuthData
 
 from taiga.importers.exceptions import InvalidAuthResult, FailedRequest
+from taiga.importers.http_session import ImporterSession
 from taiga.importers import services as import_service
 
 
@@ -35,6 +37,7 @@ class GithubClient:
     def __init__(self, token):
         self.api_url = "https://api.github.com/{}"
         self.token = token
+        self.session = ImporterSession()
 
     def get(self, uri_path, query_params=None):
         headers = {
@@ -51,7 +54,7 @@ class GithubClient:
             uri_path = uri_path[1:]
         url = self.api_url.format(uri_path)
 
-        response = requests.get(url, params=query_params, headers=headers)
+        response = self.session.get(url, params=query_params, headers=headers)
 
         if response.status_code == 401:
             raise Exception("Unauthorized: %s at %s" % (response.text, url), response)
@@ -197,7 +200,7 @@ class GithubImporter:
         )
 
         if 'organization' in repo and repo['organization'].get('avatar_url', None):
-            data = requests.get(repo['organization']['avatar_url'])
+            data = self._client.session.get(repo['organization']['avatar_url'])
             project.logo.save("logo.png", ContentFile(data.content), save=True)
 
         import_service.create_memberships(options.get('users_bindings', {}), project, self._user, "github")
@@ -426,6 +429,7 @@ class GithubImporter:
             is_snapshot=False,
         )
         HistoryEntry.objects.filter(id=entry.id).update(created_at=event['created_at'])
+        invalidate_snapshot_state(key)
         return HistoryEntry.objects.get(id=entry.id)
 
     def _transform_event_data(self, obj, event, options, cumulative_data):
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+HTTP layer shared by the importers.
+
+- `ImporterSession` keeps a pool of connections to the service and retries
+  the requests that fail because of rate limits (429, 403 with the GitHub
+  rate limit headers) or temporary errors (5xx, connection errors), waiting
+  as the service asks (Retry-After, X-RateLimit-Reset) or with exponential
+  backoff.
+- `prefetch` runs the per-item requests (pages of actions, comments,
+  attachment downloads...) of the next items in a thread pool while the
+  current one is stored in the database, which must be done in the main
+  thread.
+"""
+
+import itertools
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ImporterSession:
+    def __init__(self, max_retries=None, backoff_factor=0.5, max_wait=300, timeout=60, pool_size=None):
+        self.max_retries = _get_setting("IMPORTERS_HTTP_MAX_RETRIES", 5) if max_retries is None else max_retries
+        self.backoff_factor = backoff_factor
+        self.max_wait = max_wait
+        self.timeout = timeout
+
+        pool_size = pool_size or max(_get_setting("IMPORTERS_HTTP_WORKERS", 8), 1)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _get_backoff(self, attempt):
+        return self.backoff_factor * (2 ** attempt)
+
+    def _get_retry_wait(self, response, attempt):
+        """
+        Return the seconds to wait before retrying the request or None if
+        the response must not be retried.
+        """
+        if response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
+            reset = response.headers.get("X-RateLimit-Reset")
+            if reset and reset.isdigit():
+                return max(int(reset) - time.time(), 0)
+            return self._get_backoff(attempt)
+
+        if response.status_code not in RETRY_STATUSES:
+            return None
+
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            if retry_after.isdigit():
+                return int(retry_after)
+            try:
+                return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0)
+            except (TypeError, ValueError):
+                pass
+
+        return self._get_backoff(attempt)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in itertools.count():
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                wait = self._get_backoff(attempt)
+            else:
+                wait = self._get_retry_wait(response, attempt)
+                if wait is None or attempt >= self.max_retries:
+                    return response
+
+            logger.info("Retrying %s %s in %.1f seconds", method, url, wait)
+            time.sleep(min(wait, self.max_wait))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request("POST", url, data=data, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def prefetch(func, items, workers=None):
+    """
+    Yield (item, func(item)) for every item, in order, running func for
+    the next items concurrently in up to `workers` threads. At most
+    2 * `workers` results are kept in memory.
+
+    An exception raised by `func` is raised when its item is reached.
+    """
+    workers = _get_setting("IMPORTERS_HTTP_WORKERS", 8) if workers is None else workers
+
+    if workers <= 1:
+        for item in items:
+            yield item, func(item)
+        return
+
+    items = iter(items)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for item in itertools.islice(items, workers * 2):
+                pending.append((item, executor.submit(func, item)))
+
+            while pending:
+                item, future = pending.popleft()
+                for next_item in itertools.islice(items, 1):
+                    pending.append((next_item, executor.submit(func, next_item)))
+                yield item, future.result()
+        finally:
+            for item, future in pending:
+                future.cancel()
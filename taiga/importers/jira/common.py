@@ -27,6 +27,7 @@ from taiga.projects.history.services import (make_diff_from_dicts,
                                              make_diff_values,
                                              make_key_from_model_object,
                                              get_typename_for_model_class,
+                                             invalidate_snapshot_state,
                                              FrozenDiff)
 from taiga.projects.custom_attributes.models import (UserStoryCustomAttribute,
                                                      TaskCustomAttribute,
@@ -36,6 +37,7 @@ from taiga.projects.history.models import HistoryEntry
 from taiga.projects.history.choices import HistoryType
 from taiga.mdrender.service import render as mdrender
 from taiga.importers import exceptions
+from taiga.importers.http_session import ImporterSession, prefetch
 from taiga.front.templatetags.functions import resolve as resolve_front_url
 
 EPIC_COLORS = {
@@ -100,6 +102,7 @@ class JiraClient:
             )
         else:
             self.oauth = None
+        self.session = ImporterSession()
 
     def get(self, uri_path, query_params=None):
         headers = {
@@ -112,7 +115,7 @@ class JiraClient:
             uri_path = uri_path[1:]
         url = self.main_api_url.format(uri_path)
 
-        response = requests.get(url, params=query_params, headers=headers, auth=self.oauth)
+        response = self.session.get(url, params=query_params, headers=headers, auth=self.oauth)
 
         if response.status_code == 401:
             raise Exception("Unauthorized: %s at %s" % (response.text, url), response)
@@ -132,7 +135,7 @@ class JiraClient:
             uri_path = uri_path[1:]
         url = self.api_url.format(uri_path)
 
-        response = requests.get(url, params=query_params, headers=headers, auth=self.oauth)
+        response = self.session.get(url, params=query_params, headers=headers, auth=self.oauth)
 
         if response.status_code == 401:
             raise Exception("Unauthorized: %s at %s" % (response.text, url), response)
@@ -145,7 +148,7 @@ class JiraClient:
         if query_params is None:
             query_params = {}
 
-        response = requests.get(absolute_uri, params=query_params, auth=self.oauth)
+        response = self.session.get(absolute_uri, params=query_params, auth=self.oauth)
 
         if response.status_code == 401:
             raise Exception("Unauthorized: %s at %s" % (response.text, absolute_uri), response)
@@ -421,9 +424,18 @@ class JiraImporterCommon:
     def _import_attachments(self, obj, issue, options):
         users_bindings = options.get('users_bindings', {})
 
-        for attachment in issue['fields']['attachment']:
+        def download(attachment):
+            try:
+                return self._client.raw_get(attachment['content'])
+            except Exception:
+                return None
+
+        for attachment, data in prefetch(download, issue['fields']['attachment']):
+            if data is None:
+                print("ERROR getting attachment url {}".format(attachment['content']))
+                continue
+
             try:
-                data = self._client.raw_get(attachment['content'])
                 att = Attachment(
                     owner=users_bindings.get(attachment['author']['name'], self._user),
                     project=obj.project,
@@ -477,6 +489,7 @@ class JiraImporterCommon:
             is_snapshot=False,
         )
         HistoryEntry.objects.filter(id=entry.id).update(created_at=history['created'])
+        invalidate_snapshot_state(key)
         return HistoryEntry.objects.get(id=entry.id)
 
     def _transform_history_data(self, project, obj, history, options):
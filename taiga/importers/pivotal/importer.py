@@ -7,7 +7,6 @@
 
 from django.core.files.base import ContentFile
 from django.contrib.contenttypes.models import ContentType
-import requests
 
 from taiga.users.models import User
 from taiga.projects.references.models import recalc_reference_counter
@@ -22,6 +21,7 @@ from taiga.projects.history.services import (make_diff_from_dicts,
                                              make_diff_values,
                                              make_key_from_model_object,
                                              get_typename_for_model_class,
+                                             invalidate_snapshot_state,
                                              FrozenDiff)
 from taiga.projects.history.models import HistoryEntry
 from taiga.projects.history.choices import HistoryType
@@ -29,12 +29,14 @@ from taiga.projects.custom_attributes.models import UserStoryCustomAttribute
 from taiga.mdrender.service import render as mdrender
 from taiga.timeline.rebuilder import rebuild_timeline
 from taiga.timeline.models import Timeline
+from taiga.importers.http_session import ImporterSession
 
 
 class PivotalClient:
     def __init__(self, token):
         self.api_url = "https://www.pivotaltracker.com/services/v5/{}"
         self.token = token
+        self.session = ImporterSession()
         self.me = self.get('/me')
 
     def get(self, uri_path, query_params=None):
@@ -48,7 +50,7 @@ class PivotalClient:
             uri_path = uri_path[1:]
         url = self.api_url.format(uri_path)
 
-        response = requests.get(url, params=query_params, headers=headers)
+        response = self.session.get(url, params=query_params, headers=headers)
 
         if response.status_code == 401:
             raise Exception("Unauthorized: %s at %s" % (response.text, url), response)
@@ -62,7 +64,7 @@ class PivotalClient:
             'X-TrackerToken': self.token
         }
         url = "https://www.pivotaltracker.com/file_attachments/{}/download".format(attachment_id)
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers)
         return response.content
 
 
@@ -560,6 +562,7 @@ class PivotalImporter:
             is_snapshot=False,
         )
         HistoryEntry.objects.filter(id=entry.id).update(created_at=activity['occurred_at'])
+        invalidate_snapshot_state(key)
         return HistoryEntry.objects.get(id=entry.id)
 
     def _transform_activity_data(self, obj, activity, options):
@@ -5,13 +5,15 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import itertools
+
+from django.utils.dateparse import parse_datetime
 from django.utils.translation import ugettext as _
 
 from requests_oauthlib import OAuth1Session, OAuth1
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.contrib.contenttypes.models import ContentType
-import requests
 import webcolors
 
 from django.template.defaultfilters import slugify
@@ -20,7 +22,6 @@ from taiga.projects.services import projects as projects_service
 from taiga.projects.models import Project, ProjectTemplate
 from taiga.projects.userstories.models import UserStory
 from taiga.projects.tasks.models import Task
-from taiga.projects.attachments.models import Attachment
 from taiga.projects.history.services import (make_diff_from_dicts,
                                              make_diff_values,
                                              make_key_from_model_object,
@@ -34,6 +35,8 @@ from taiga.timeline.rebuilder import rebuild_timeline
 from taiga.timeline.models import Timeline
 from taiga.front.templatetags.functions import resolve as resolve_front_url
 from taiga.importers import services as import_service
+from taiga.importers.http_session import ImporterSession, prefetch
+from taiga.projects.services.bulk_load import BulkLoader
 
 from taiga.base import exceptions
 
@@ -51,6 +54,7 @@ class TrelloClient:
             )
         else:
             self.oauth = None
+        self.session = ImporterSession()
 
     def _validate_response(self, response):
         if response.status_code == 400:
@@ -74,12 +78,12 @@ class TrelloClient:
             uri_path = uri_path[1:]
         url = 'https://api.trello.com/1/%s' % uri_path
 
-        response = requests.get(url, params=query_params, headers=headers, auth=self.oauth)
+        response = self.session.get(url, params=query_params, headers=headers, auth=self.oauth)
         self._validate_response(response)
         return response.json()
 
     def download(self, url):
-        response = requests.get(url, auth=self.oauth)
+        response = self.session.get(url, auth=self.oauth)
         self._validate_response(response)
         return response.content
 
@@ -249,7 +253,7 @@ class TrelloImporter:
         if board.get('organization', None):
             trello_avatar_template = "https://trello-logos.s3.amazonaws.com/{}/170.png"
             project_logo_url = trello_avatar_template.format(board['organization']['logoHash'])
-            data = requests.get(project_logo_url)
+            data = self._client.session.get(project_logo_url)
             project.logo.save("logo.png", ContentFile(data.content), save=True)
 
         UserStoryCustomAttribute.objects.create(
@@ -264,101 +268,144 @@ class TrelloImporter:
         return project
 
     def _import_user_stories_data(self, data, project, options):
-        users_bindings = options.get('users_bindings', {})
         statuses = {s['id']: s for s in data['lists']}
+        checklists = {c['id']: c for c in data['checklists']}
         cards = data['cards']
         due_date_field = project.userstorycustomattributes.first()
+        loader = BulkLoader(project)
 
-        for card in cards:
-            if card['closed'] and not options.get("import_closed_data", False):
-                continue
-            if statuses[card['idList']]['closed'] and not options.get("import_closed_data", False):
-                continue
+        if not options.get("import_closed_data", False):
+            cards = [card for card in cards if not card['closed'] and not statuses[card['idList']]['closed']]
+
+        # The attachments and the actions of the next cards are downloaded
+        # while the current ones are saved
+        fetched_cards = prefetch(self._fetch_card_data, cards)
+        while True:
+            chunk = [self._build_card(loader, card, card_data, statuses, options)
+                     for card, card_data in itertools.islice(fetched_cards, loader.chunk_size)]
+            if not chunk:
+                break
+            self._import_user_stories_chunk(loader, checklists, chunk, statuses, due_date_field, options)
+
+        loader.flush()
+
+    def _build_card(self, loader, card, card_data, statuses, options):
+        # The files are stored now so the downloaded data is not kept in memory
+        attachments = self._build_attachments(loader, card_data["attachments"], options)
+        us = self._build_user_story(loader, card, attachments, card_data["actions"], statuses, options)
+        return card, us, attachments, card_data["actions"]
+
+    def _build_user_story(self, loader, card, attachments, actions, statuses, options):
+        users_bindings = options.get('users_bindings', {})
 
-            tags = []
-            for tag in card['labels']:
-                name = tag['name']
-                if not name:
-                    name = tag['color']
-                name = name.lower()
-                tags.append(name)
-
-            assigned_to = None
-            if len(card['idMembers']) > 0:
-                assigned_to = users_bindings.get(card['idMembers'][0], None)
-
-            external_reference = None
-            if options.get('keep_external_reference', False):
-                external_reference = ["trello", card['url']]
-
-            us = UserStory.objects.create(
-                project=project,
-                owner=self._user,
-                assigned_to=assigned_to,
-                status=project.us_statuses.get(name=statuses[card['idList']]['name']),
-                kanban_order=card['pos'],
-                sprint_order=card['pos'],
-                backlog_order=card['pos'],
-                subject=card['name'],
-                description=card['desc'],
-                tags=tags,
-                external_reference=external_reference
-            )
+        tags = []
+        for tag in card['labels']:
+            name = tag['name']
+            if not name:
+                name = tag['color']
+            name = name.lower()
+            tags.append(name)
+
+        assigned_to = None
+        if len(card['idMembers']) > 0:
+            assigned_to = users_bindings.get(card['idMembers'][0], None)
+
+        external_reference = None
+        if options.get('keep_external_reference', False):
+            external_reference = ["trello", card['url']]
+
+        # The user story is created when the first attachment is added or by
+        # the first of its creation actions
+        created_date = parse_datetime(card['dateLastActivity'])
+        owner = self._user
+        for attachment in attachments:
+            created_date = min(created_date, parse_datetime(attachment.created_date))
+
+        for action in actions:
+            if action['type'] in ["convertToCardFromCheckItem", "copyCommentCard", "createCard"]:
+                action_date = parse_datetime(action['date'])
+                if action_date < created_date:
+                    created_date = action_date
+                    owner = users_bindings.get(action["idMemberCreator"], self._user)
+
+        return UserStory(
+            project=loader.project,
+            owner=owner,
+            assigned_to=assigned_to,
+            status=loader.lookup("us_statuses")[statuses[card['idList']]['name']],
+            kanban_order=card['pos'],
+            sprint_order=card['pos'],
+            backlog_order=card['pos'],
+            subject=card['name'],
+            description=card['desc'],
+            tags=tags,
+            external_reference=external_reference,
+            created_date=created_date,
+            modified_date=card['dateLastActivity'],
+        )
 
-            if len(card['idMembers']) > 1:
-                for watcher in card['idMembers'][1:]:
-                    watcher_user = users_bindings.get(watcher, None)
-                    if watcher_user:
-                        us.add_watcher(watcher_user)
+    def _import_user_stories_chunk(self, loader, checklists, chunk, statuses, due_date_field, options):
+        users_bindings = options.get('users_bindings', {})
 
-            if card['due']:
-                us.custom_attributes_values.attributes_values = {due_date_field.id: card['due']}
-                us.custom_attributes_values.save()
+        attributes_values = []
+        for card, us, attachments, actions in chunk:
+            attributes_values.append({due_date_field.id: card['due']} if card['due'] else {})
+        loader.create(UserStory, [us for card, us, attachments, actions in chunk], attributes_values)
 
-            UserStory.objects.filter(id=us.id).update(
-                modified_date=card['dateLastActivity'],
-                created_date=card['dateLastActivity']
-            )
-            self._import_attachments(us, card, options)
-            self._import_tasks(data, us, card)
-            self._import_actions(us, card, statuses, options)
+        tasks = []
+        for card, us, attachments, actions in chunk:
+            watchers = [users_bindings.get(watcher, None) for watcher in card['idMembers'][1:]]
+            loader.add_watchers(us, [watcher for watcher in watchers if watcher])
+
+            for attachment in attachments:
+                attachment.object_id = us.id
+                loader.add(attachment)
+
+            tasks += self._build_tasks(loader, checklists, us, card)
+            self._import_actions(loader, us, actions, statuses, due_date_field, options)
+
+        loader.create(Task, tasks)
 
-    def _import_tasks(self, data, us, card):
-        checklists_by_id = {c['id']: c for c in data['checklists']}
+    def _build_tasks(self, loader, checklists, us, card):
+        tasks = []
         for checklist_id in card['idChecklists']:
-            for item in checklists_by_id.get(checklist_id, {}).get('checkItems', []):
-                Task.objects.create(
+            for item in checklists.get(checklist_id, {}).get('checkItems', []):
+                tasks.append(Task(
                     subject=item['name'],
-                    status=us.project.task_statuses.get(slug=item['state']),
+                    status=loader.lookup("task_statuses", "slug")[item['state']],
                     project=us.project,
                     user_story=us
-                )
+                ))
+        return tasks
 
-    def _import_attachments(self, us, card, options):
-        users_bindings = options.get('users_bindings', {})
+    def _fetch_card_data(self, card):
+        attachments = []
         for attachment in card['attachments']:
             if attachment['bytes'] is None:
                 continue
+            attachments.append((attachment, self._client.download(attachment['url'])))
 
-            data = self._client.download(attachment['url'])
+        return {
+            "attachments": attachments,
+            "actions": self._fetch_actions(card),
+        }
 
-            att = Attachment(
+    def _build_attachments(self, loader, attachments, options):
+        users_bindings = options.get('users_bindings', {})
+        return [
+            loader.new_attachment(
+                attachment['name'],
+                data,
                 owner=users_bindings.get(attachment['idMember'], self._user),
-                project=us.project,
                 content_type=ContentType.objects.get_for_model(UserStory),
-                object_id=us.id,
-                name=attachment['name'],
                 size=attachment['bytes'],
                 created_date=attachment['date'],
                 is_deprecated=False,
             )
-            att.attached_file.save(attachment['name'], ContentFile(data), save=True)
-
-            UserStory.objects.filter(id=us.id, created_date__gt=attachment['date']).update(
-                created_date=attachment['date']
-            )
+            for attachment, data in attachments
+        ]
 
-    def _import_actions(self, us, card, statuses, options):
+    def _fetch_actions(self, card):
         included_actions = [
             "addAttachmentToCard", "addMemberToCard", "commentCard",
             "convertToCardFromCheckItem", "copyCommentCard", "createCard",
@@ -376,9 +423,10 @@ class TrelloImporter:
             }
         )
 
+        result = []
         while actions:
-            for action in actions:
-                self._import_action(us, action, statuses, options)
+            result.extend(actions)
+            action = actions[-1]
             actions = self._client.get(
                 "/card/{}/actions".format(card['id']),
                 {
@@ -390,13 +438,20 @@ class TrelloImporter:
                     "memberCreator_fields": "fullName",
                 }
             )
+        return result
 
-    def _import_action(self, us, action, statuses, options):
+    def _import_actions(self, loader, us, actions, statuses, due_date_field, options):
+        for action in actions:
+            entry = self._build_history_entry(loader, us, action, statuses, due_date_field, options)
+            if entry is not None:
+                loader.add(entry)
+
+    def _build_history_entry(self, loader, us, action, statuses, due_date_field, options):
         key = make_key_from_model_object(us)
         typename = get_typename_for_model_class(UserStory)
-        action_data = self._transform_action_data(us, action, statuses, options)
+        action_data = self._transform_action_data(loader, us, action, statuses, due_date_field, options)
         if action_data is None:
-            return
+            return None
 
         change_old = action_data['change_old']
         change_new = action_data['change_new']
@@ -407,7 +462,7 @@ class TrelloImporter:
         diff = make_diff_from_dicts(change_old, change_new)
         fdiff = FrozenDiff(key, diff, {})
 
-        entry = HistoryEntry.objects.create(
+        return HistoryEntry(
             user=user,
             project_id=us.project.id,
             key=key,
@@ -419,13 +474,11 @@ class TrelloImporter:
             comment_html=mdrender(us.project, comment),
             is_hidden=False,
             is_snapshot=False,
+            created_at=action['date'],
         )
-        HistoryEntry.objects.filter(id=entry.id).update(created_at=action['date'])
-        return HistoryEntry.objects.get(id=entry.id)
 
-    def _transform_action_data(self, us, action, statuses, options):
+    def _transform_action_data(self, loader, us, action, statuses, due_date_field, options):
         users_bindings = options.get('users_bindings', {})
-        due_date_field = us.project.userstorycustomattributes.first()
 
         ignored_actions = ["addAttachmentToCard", "addMemberToCard",
                            "deleteAttachmentFromCard", "deleteCard",
@@ -449,23 +502,8 @@ class TrelloImporter:
 
         if action['type'] == "commentCard":
             result['comment'] = str(action['data']['text'])
-        elif action['type'] == "convertToCardFromCheckItem":
-            UserStory.objects.filter(id=us.id, created_date__gt=action['date']).update(
-                created_date=action['date'],
-                owner=users_bindings.get(action["idMemberCreator"], self._user)
-            )
-            result['hist_type'] = HistoryType.create
-        elif action['type'] == "copyCommentCard":
-            UserStory.objects.filter(id=us.id, created_date__gt=action['date']).update(
-                created_date=action['date'],
-                owner=users_bindings.get(action["idMemberCreator"], self._user)
-            )
-            result['hist_type'] = HistoryType.create
-        elif action['type'] == "createCard":
-            UserStory.objects.filter(id=us.id, created_date__gt=action['date']).update(
-                created_date=action['date'],
-                owner=users_bindings.get(action["idMemberCreator"], self._user)
-            )
+        elif action['type'] in ["convertToCardFromCheckItem", "copyCommentCard", "createCard"]:
+            # The creation date and the owner of the user story are set in _build_user_story
             result['hist_type'] = HistoryType.create
         elif action['type'] == "updateCard":
             if 'desc' in action['data']['old']:
@@ -475,9 +513,9 @@ class TrelloImporter:
                 result['change_new']["description_html"] = mdrender(us.project, str(action['data']['card'].get('desc', '')))
             if 'idList' in action['data']['old']:
                 old_status_name = statuses[action['data']['old']['idList']]['name']
-                result['change_old']["status"] = us.project.us_statuses.get(name=old_status_name).id
+                result['change_old']["status"] = loader.lookup("us_statuses")[old_status_name].id
                 new_status_name = statuses[action['data']['card']['idList']]['name']
-                result['change_new']["status"] = us.project.us_statuses.get(name=new_status_name).id
+                result['change_new']["status"] = loader.lookup("us_statuses")[new_status_name].id
             if 'name' in action['data']['old']:
                 result['change_old']["subject"] = action['data']['old']['name']
                 result['change_new']["subject"] = action['data']['card']['name']
@@ -5,3 +5,5 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+
+default_app_config = "taiga.mdrender.apps.MdRenderAppConfig"
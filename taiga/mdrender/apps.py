@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.apps import AppConfig
+from django.apps import apps
+from django.db.models import signals
+
+
+class MdRenderAppConfig(AppConfig):
+    name = "taiga.mdrender"
+    verbose_name = "Markdown render"
+
+    def ready(self):
+        from . import signals as handlers
+
+        # The rendered texts of a project depend on its slug, its references
+        # and its members
+        signals.post_save.connect(handlers.invalidate_project_cache_on_project_change,
+                                  sender=apps.get_model("projects", "Project"),
+                                  dispatch_uid="mdrender_project_post_save")
+        for model in ("references.Reference", "projects.Membership"):
+            signals.post_save.connect(handlers.invalidate_project_cache_on_project_content_change,
+                                      sender=apps.get_model(model),
+                                      dispatch_uid="mdrender_{}_post_save".format(model))
+            signals.post_delete.connect(handlers.invalidate_project_cache_on_project_content_change,
+                                        sender=apps.get_model(model),
+                                        dispatch_uid="mdrender_{}_post_delete".format(model))
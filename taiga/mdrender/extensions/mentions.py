@@ -28,13 +28,30 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
+import re
+
 from django.contrib.auth import get_user_model
 
 from markdown.extensions import Extension
 from markdown.inlinepatterns import Pattern
+from markdown.preprocessors import Preprocessor
 from markdown.util import etree, AtomicString
 
 
+MENTION_RE = r"(@)([\w.-]+)"
+
+
+def get_users_by_username(usernames, project=None):
+    """
+    Return a dict with the users with the `usernames` usernames (members of
+    `project` if it's not None) by username.
+    """
+    kwargs = {"username__in": usernames}
+    if project is not None:
+        kwargs["memberships__project_id"] = project.id
+    return {user.username: user for user in get_user_model().objects.filter(**kwargs)}
+
+
 class MentionsExtension(Extension):
     project = None
 
@@ -43,12 +60,25 @@ class MentionsExtension(Extension):
         super().__init__(*args, **kwargs)
 
     def extendMarkdown(self, md):
-        MENTION_RE = r"(@)([\w.-]+)"
+        md.preprocessors.add("mentions", MentionsPreprocessor(md), "_begin")
         mentionsPattern = MentionsPattern(MENTION_RE, project=self.project)
         mentionsPattern.md = md
         md.inlinePatterns.add("mentions", mentionsPattern, "_end")
 
 
+class MentionsPreprocessor(Preprocessor):
+    """
+    Collect the mentions of the document, they are resolved all together
+    the first time one of them is rendered.
+    """
+    def run(self, lines):
+        pattern = re.compile(MENTION_RE)
+        self.md.users_by_username = {}
+        self.md.pending_mentions = list(dict.fromkeys(username for line in lines
+                                                      for _, username in pattern.findall(line)))
+        return lines
+
+
 class MentionsPattern(Pattern):
     project = None
 
@@ -56,14 +86,21 @@ class MentionsPattern(Pattern):
         self.project = project
         super().__init__(pattern, md)
 
+    def _get_user(self, username):
+        users_by_username = self.md.users_by_username
+        if username not in users_by_username:
+            pending_mentions = self.md.pending_mentions
+            if username not in pending_mentions:
+                pending_mentions.append(username)
+            users_by_username.update(dict.fromkeys(pending_mentions))
+            users_by_username.update(get_users_by_username(pending_mentions, project=self.project))
+            self.md.pending_mentions = []
+        return users_by_username[username]
+
     def handleMatch(self, m):
         username = m.group(3)
-        kwargs = {"username": username}
-        if self.project is not None:
-            kwargs["memberships__project_id"]=self.project.id
-        try:
-            user = get_user_model().objects.get(**kwargs)
-        except get_user_model().DoesNotExist:
+        user = self._get_user(username)
+        if user is None:
             return "@{}".format(username)
 
         url = "/profile/{}".format(username)
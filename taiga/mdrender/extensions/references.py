@@ -29,35 +29,65 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import re
+
 from markdown.extensions import Extension
 from markdown.inlinepatterns import Pattern
+from markdown.preprocessors import Preprocessor
 from markdown.util import etree
 
-from taiga.projects.references.services import get_instance_by_ref
+from taiga.projects.references.services import get_instances_by_ref
 from taiga.front.templatetags.functions import resolve
 
 
+TAIGA_REFERENCE_RE = r'(?<=^|(?<=[^a-zA-Z0-9-\[]))#(\d+)'
+
+
 class TaigaReferencesExtension(Extension):
     def __init__(self, project, *args, **kwargs):
         self.project = project
         return super().__init__(*args, **kwargs)
 
     def extendMarkdown(self, md):
-        TAIGA_REFERENCE_RE = r'(?<=^|(?<=[^a-zA-Z0-9-\[]))#(\d+)'
+        md.preprocessors.add('taiga-references',
+                             TaigaReferencesPreprocessor(md),
+                             '_begin')
         referencesPattern = TaigaReferencesPattern(TAIGA_REFERENCE_RE, self.project)
         referencesPattern.md = md
         md.inlinePatterns.add('taiga-references', referencesPattern, '_begin')
 
 
+class TaigaReferencesPreprocessor(Preprocessor):
+    """
+    Collect the references of the document, they are resolved all together
+    the first time one of them is rendered.
+    """
+    def run(self, lines):
+        pattern = re.compile(TAIGA_REFERENCE_RE)
+        self.md.references_by_ref = {}
+        self.md.pending_references = {int(ref) for line in lines for ref in pattern.findall(line)}
+        return lines
+
+
 class TaigaReferencesPattern(Pattern):
     def __init__(self, pattern, project):
         self.project = project
         super().__init__(pattern)
 
+    def _get_instance(self, obj_ref):
+        references_by_ref = self.md.references_by_ref
+        if obj_ref not in references_by_ref:
+            pending_references = self.md.pending_references
+            pending_references.add(obj_ref)
+            references_by_ref.update(dict.fromkeys(pending_references))
+            references_by_ref.update(get_instances_by_ref(self.project.id, pending_references))
+            self.md.pending_references = set()
+        return references_by_ref[obj_ref]
+
     def handleMatch(self, m):
         obj_ref = m.group(2)
 
-        instance = get_instance_by_ref(self.project.id, obj_ref)
+        instance = self._get_instance(int(obj_ref))
         if instance is None or instance.content_object is None:
             return "#{}".format(obj_ref)
 
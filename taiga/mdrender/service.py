@@ -9,6 +9,12 @@ from django.conf import settings
 
 import hashlib
 import functools
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
 import bleach
 
 # BEGIN PATCH
@@ -90,49 +96,180 @@ def _make_extension_configs():
 import diff_match_patch
 
 
+# Only the links (`[...]`), references (`#...`) and mentions (`@...`)
+# depend on the project, the rest of the texts render the same everywhere.
+PROJECT_DEPENDENT_RE = re.compile(r"[\[#@]")
+
+
+def _get_project_key(project):
+    return (getattr(project, "id", None), getattr(project, "slug", None))
+
+
+def _get_project_version_key(project_id):
+    return "mdrender/version/{}".format(project_id)
+
+
+def _get_project_version(project_id):
+    return cache.get_or_set(_get_project_version_key(project_id), lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_project_cache(project_id):
+    """
+    Discard the rendered texts of the project, because its references,
+    members or slug have changed.
+    """
+    cache.delete(_get_project_version_key(project_id))
+
+
+class LocalCache:
+    """
+    In-process LRU cache of rendered texts, in front of the shared cache.
+    """
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._items[key] = (time.monotonic() + timeout, value)
+            self._items.move_to_end(key)
+            while len(self._items) > settings.MDRENDER_LOCAL_CACHE_SIZE:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+local_cache = LocalCache()
+
+
 def cache_by_sha(func):
     @functools.wraps(func)
     def _decorator(project, text):
         if not settings.MDRENDER_CACHE_ENABLE:
             return func(project, text)
 
-        # Avoid cache of too short texts
-        if len(text) <= settings.MDRENDER_CACHE_MIN_SIZE:
+        use_shared_cache = len(text) > settings.MDRENDER_CACHE_MIN_SIZE
+        is_project_dependent = PROJECT_DEPENDENT_RE.search(text) is not None
+
+        # The titles of the references (as "See #12") are not part of the
+        # project version, so the short texts with them are always rendered
+        if is_project_dependent and not use_shared_cache:
             return func(project, text)
 
         sha1_hash = hashlib.sha1(force_bytes(text)).hexdigest()
-        key = "mdrender/{}-{}".format(sha1_hash, project.id)
-
-        # Try to get it from the cache
-        cached = cache.get(key)
+        if is_project_dependent:
+            key = "mdrender/{}-{}-{}".format(sha1_hash, project.id, _get_project_version(project.id))
+        else:
+            key = "mdrender/{}".format(sha1_hash)
+
+        # Try to get it from the in-process cache and then from the shared
+        # one (avoid it for too short texts)
+        cached = local_cache.get(key)
         if cached is not None:
             return cached
 
+        if use_shared_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                local_cache.set(key, cached, timeout=settings.MDRENDER_CACHE_TIMEOUT)
+                return cached
+
         returned_value = func(project, text)
-        cache.set(key, returned_value, timeout=settings.MDRENDER_CACHE_TIMEOUT)
+        if use_shared_cache:
+            cache.set(key, returned_value, timeout=settings.MDRENDER_CACHE_TIMEOUT)
+        local_cache.set(key, returned_value, timeout=settings.MDRENDER_CACHE_TIMEOUT)
         return returned_value
 
     return _decorator
 
 
-def _get_markdown(project):
+def _make_markdown(project):
     extensions = _make_extensions_list(project=project)
     extension_configs = _make_extension_configs()
-    md = Markdown(extensions=extensions, extension_configs=extension_configs)
-    md.extracted_data = {"mentions": [], "references": []}
-    return md
+    return Markdown(extensions=extensions, extension_configs=extension_configs)
+
+
+class MarkdownPool:
+    """
+    Idle Markdown engines by project, reused instead of loading all the
+    extensions for every text. Only the engines of the
+    `MDRENDER_ENGINE_POOL_SIZE` most recently used projects are kept.
+    """
+    def __init__(self):
+        self._engines = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, project):
+        with self._lock:
+            engines = self._engines.get(_get_project_key(project))
+            md = engines.pop() if engines else None
+
+        if md is None:
+            md = _make_markdown(project)
+        else:
+            md.reset()
+        md.extracted_data = {"mentions": [], "references": []}
+        return md
+
+    def release(self, project, md):
+        key = _get_project_key(project)
+        with self._lock:
+            self._engines.setdefault(key, []).append(md)
+            self._engines.move_to_end(key)
+            while len(self._engines) > settings.MDRENDER_ENGINE_POOL_SIZE:
+                self._engines.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._engines.clear()
+
+
+markdown_pool = MarkdownPool()
+
+# bleach.Cleaner instances can be reused but are not thread safe
+_cleaners = threading.local()
+
+
+def _clean(html):
+    cleaner = getattr(_cleaners, "cleaner", None)
+    if cleaner is None:
+        cleaner = _cleaners.cleaner = bleach.Cleaner()
+    return cleaner.clean(html)
+
+
+def _render(project, text):
+    md = markdown_pool.acquire(project)
+    result = _clean(md.convert(text))
+    extracted_data = md.extracted_data
+    # The engine is not reused if the rendering fails
+    markdown_pool.release(project, md)
+    return result, extracted_data
 
 
 @cache_by_sha
 def render(project, text):
-    md = _get_markdown(project)
-    return bleach.clean(md.convert(text))
+    result, _ = _render(project, text)
+    return result
 
 
 def render_and_extract(project, text):
-    md = _get_markdown(project)
-    result = bleach.clean(md.convert(text))
-    return (result, md.extracted_data)
+    return _render(project, text)
 
 
 class DiffMatchPatch(diff_match_patch.diff_match_patch):
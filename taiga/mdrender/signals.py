@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from .service import invalidate_project_cache
+
+
+def invalidate_project_cache_on_project_change(sender, instance, **kwargs):
+    invalidate_project_cache(instance.id)
+
+
+def invalidate_project_cache_on_project_content_change(sender, instance, **kwargs):
+    invalidate_project_cache(instance.project_id)
@@ -5,6 +5,8 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+from functools import lru_cache
+
 from .choices import ADMINS_PERMISSIONS, MEMBERS_PERMISSIONS, ANON_PERMISSIONS
 
 from django.apps import apps
@@ -78,55 +80,99 @@ def _get_membership_permissions(membership):
     return []
 
 
+ADMINS_PERMISSIONS_SET = frozenset(perm for perm, _ in ADMINS_PERMISSIONS)
+MEMBERS_PERMISSIONS_SET = frozenset(perm for perm, _ in MEMBERS_PERMISSIONS)
+ANON_PERMISSIONS_SET = frozenset(perm for perm, _ in ANON_PERMISSIONS)
+
+
+def _as_key(permissions):
+    return tuple(permissions) if permissions is not None else ()
+
+
+@lru_cache(maxsize=1024)
+def _resolve_permissions(is_authenticated, is_superuser, is_member, is_admin,
+                         role_permissions, anon_permissions, public_permissions):
+    """
+    Return the frozenset of permissions of a user. The permissions are
+    passed as tuples so the result can be cached in-process: the key changes
+    whenever a membership, a role or the permissions of a project change,
+    so there is nothing to invalidate.
+    """
+    if is_superuser:
+        return ADMINS_PERMISSIONS_SET | MEMBERS_PERMISSIONS_SET | ANON_PERMISSIONS_SET
+
+    permissions = set(anon_permissions)
+    if is_member or is_authenticated:
+        permissions.update(public_permissions)
+    if is_member:
+        if is_admin:
+            permissions.update(ADMINS_PERMISSIONS_SET)
+            permissions.update(MEMBERS_PERMISSIONS_SET)
+        permissions.update(role_permissions)
+    return frozenset(permissions)
+
+
+def _calculate_permissions(is_authenticated=False, is_superuser=False, is_member=False,
+                           is_admin=False, role_permissions=None, anon_permissions=None,
+                           public_permissions=None):
+    return _resolve_permissions(bool(is_authenticated), bool(is_superuser), bool(is_member),
+                                bool(is_admin) and bool(is_member), _as_key(role_permissions),
+                                _as_key(anon_permissions), _as_key(public_permissions))
+
+
 def calculate_permissions(is_authenticated=False, is_superuser=False, is_member=False,
                           is_admin=False, role_permissions=[], anon_permissions=[],
                           public_permissions=[]):
-    if is_superuser:
-        admins_permissions = list(map(lambda perm: perm[0], ADMINS_PERMISSIONS))
-        members_permissions = list(map(lambda perm: perm[0], MEMBERS_PERMISSIONS))
-        public_permissions = []
-        anon_permissions = list(map(lambda perm: perm[0], ANON_PERMISSIONS))
-    elif is_member:
-        if is_admin:
-            admins_permissions = list(map(lambda perm: perm[0], ADMINS_PERMISSIONS))
-            members_permissions = list(map(lambda perm: perm[0], MEMBERS_PERMISSIONS))
-        else:
-            admins_permissions = []
-            members_permissions = []
-        members_permissions = members_permissions + role_permissions
-        public_permissions = public_permissions if public_permissions is not None else []
-        anon_permissions = anon_permissions if anon_permissions is not None else []
-    elif is_authenticated:
-        admins_permissions = []
-        members_permissions = []
-        public_permissions = public_permissions if public_permissions is not None else []
-        anon_permissions = anon_permissions if anon_permissions is not None else []
-    else:
-        admins_permissions = []
-        members_permissions = []
-        public_permissions = []
-        anon_permissions = anon_permissions if anon_permissions is not None else []
+    return set(_calculate_permissions(is_authenticated=is_authenticated,
+                                      is_superuser=is_superuser,
+                                      is_member=is_member,
+                                      is_admin=is_admin,
+                                      role_permissions=role_permissions,
+                                      anon_permissions=anon_permissions,
+                                      public_permissions=public_permissions))
+
+
+# The resolved permissions of a user are also cached in the user instance
+# (so, per request) by project. The cache of a user is dropped when a
+# project, a membership or a role is saved or deleted in this process.
+_permissions_version = 0
 
-    return set(admins_permissions + members_permissions + public_permissions + anon_permissions)
+
+def invalidate_permissions_cache(**kwargs):
+    global _permissions_version
+    _permissions_version += 1
 
 
 def get_user_project_permissions(user, project, cache="user"):
     """
     cache param determines how memberships are calculated trying to reuse the existing data
     in cache
+
+    The returned frozenset is shared and must not be modified.
     """
-    membership = _get_user_project_membership(user, project, cache=cache)
-    is_member = membership is not None
-    is_admin = is_member and membership.is_admin
-    return calculate_permissions(
-        is_authenticated = user.is_authenticated,
-        is_superuser =  user.is_superuser,
-        is_member = is_member,
-        is_admin = is_admin,
-        role_permissions = _get_membership_permissions(membership),
-        anon_permissions = project.anon_permissions,
-        public_permissions = project.public_permissions
-    )
+    cached = getattr(user, "_cached_project_permissions", None)
+    if cached is None or cached[0] != _permissions_version:
+        cached = (_permissions_version, {})
+        user._cached_project_permissions = cached
+
+    key = (project.id, cache)
+    permissions = cached[1].get(key) if project.id is not None else None
+    if permissions is None:
+        membership = _get_user_project_membership(user, project, cache=cache)
+        is_member = membership is not None
+        is_admin = is_member and membership.is_admin
+        permissions = _calculate_permissions(
+            is_authenticated=user.is_authenticated,
+            is_superuser=user.is_superuser,
+            is_member=is_member,
+            is_admin=is_admin,
+            role_permissions=_get_membership_permissions(membership),
+            anon_permissions=project.anon_permissions,
+            public_permissions=project.public_permissions
+        )
+        if project.id is not None:
+            cached[1][key] = permissions
+    return permissions
 
 
 def set_base_permissions_for_project(project):
@@ -136,6 +182,5 @@ def set_base_permissions_for_project(project):
     else:
         # If a project is public anonymous and registered users should have at
         # least visualization permissions.
-        anon_permissions = list(map(lambda perm: perm[0], ANON_PERMISSIONS))
-        project.anon_permissions = list(set((project.anon_permissions or []) + anon_permissions))
-        project.public_permissions = list(set((project.public_permissions or []) + anon_permissions))
+        project.anon_permissions = list(ANON_PERMISSIONS_SET.union(project.anon_permissions or []))
+        project.public_permissions = list(ANON_PERMISSIONS_SET.union(project.public_permissions or []))
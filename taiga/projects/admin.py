@@ -201,31 +201,10 @@ class ProjectAdmin(admin.ModelAdmin):
         #
         # More info https://docs.djangoproject.com/en/2.2/ref/contrib/admin/actions/#admin-actions
 
-        from taiga.events.apps import (connect_events_signals,
-                                       disconnect_events_signals)
-        from taiga.projects.tasks.apps import (connect_all_tasks_signals,
-                                               disconnect_all_tasks_signals)
-        from taiga.projects.userstories.apps import (connect_all_userstories_signals,
-                                                     disconnect_all_userstories_signals)
-        from taiga.projects.issues.apps import (connect_all_issues_signals,
-                                                disconnect_all_issues_signals)
-        from taiga.projects.apps import (connect_memberships_signals,
-                                         disconnect_memberships_signals)
-
-        disconnect_events_signals()
-        disconnect_all_issues_signals()
-        disconnect_all_tasks_signals()
-        disconnect_all_userstories_signals()
-        disconnect_memberships_signals()
-
-        try:
-            super().delete_queryset(request, queryset)
-        finally:
-            connect_events_signals()
-            connect_all_issues_signals()
-            connect_all_tasks_signals()
-            connect_all_userstories_signals()
-            connect_memberships_signals()
+        for project in queryset:
+            project.delete_related_content()
+
+        super().delete_queryset(request, queryset)
 
 # User Stories common admins
 class PointsAdmin(admin.ModelAdmin):
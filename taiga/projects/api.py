@@ -110,6 +110,12 @@ class ProjectViewSet(LikedResourceMixin, HistoryResourceMixin,
             qs = project_utils.attach_my_homepage(qs, user=self.request.user)
         elif self.request.QUERY_PARAMS.get('slight', False):
             qs = project_utils.attach_basic_info(qs, user=self.request.user)
+        elif self.action in ["retrieve", "by_slug"]:
+            # The rest of the extra info is attached from the cached
+            # configuration document of the project
+            qs = project_utils.attach_is_fan(qs, user=self.request.user)
+            qs = project_utils.attach_my_role_permissions(qs, user=self.request.user)
+            qs = project_utils.attach_my_homepage(qs, user=self.request.user)
         else:
             qs = project_utils.attach_extra_info(qs, user=self.request.user)
 
@@ -148,6 +154,7 @@ class ProjectViewSet(LikedResourceMixin, HistoryResourceMixin,
         if self.object is None:
             raise Http404
 
+        services.attach_project_config(self.object)
         serializer = self.get_serializer(self.object)
         return response.Ok(serializer.data)
 
@@ -108,6 +108,65 @@ def disconnect_task_status_signals():
                                  dispatch_uid="try_to_close_or_open_user_stories_when_edit_task_status")
 
 
+## Project configuration document Signals
+
+PROJECT_CONFIG_MODELS = (
+    "projects.Membership",
+    "projects.EpicStatus",
+    "projects.Swimlane",
+    "projects.UserStoryStatus",
+    "projects.UserStoryDueDate",
+    "projects.Points",
+    "projects.TaskStatus",
+    "projects.TaskDueDate",
+    "projects.IssueStatus",
+    "projects.IssueDueDate",
+    "projects.IssueType",
+    "projects.Priority",
+    "projects.Severity",
+    "custom_attributes.EpicCustomAttribute",
+    "custom_attributes.UserStoryCustomAttribute",
+    "custom_attributes.TaskCustomAttribute",
+    "custom_attributes.IssueCustomAttribute",
+    "users.Role",
+    "milestones.Milestone",
+    "notifications.NotifyPolicy",
+)
+
+
+def connect_project_config_signals():
+    from . import signals as handlers
+
+    for model in PROJECT_CONFIG_MODELS:
+        signals.post_save.connect(handlers.invalidate_project_config_on_change,
+                                  sender=apps.get_model(model),
+                                  dispatch_uid="invalidate_project_config_{}_post_save".format(model))
+        signals.post_delete.connect(handlers.invalidate_project_config_on_change,
+                                    sender=apps.get_model(model),
+                                    dispatch_uid="invalidate_project_config_{}_post_delete".format(model))
+
+    signals.post_delete.connect(handlers.invalidate_project_config_on_project_delete,
+                                sender=apps.get_model("projects", "Project"),
+                                dispatch_uid="invalidate_project_config_project_post_delete")
+    signals.post_save.connect(handlers.invalidate_projects_config_on_user_change,
+                              sender=apps.get_model("users", "User"),
+                              dispatch_uid="invalidate_projects_config_user_post_save")
+
+
+## Permissions cache Signals
+
+def connect_permissions_cache_signals():
+    from taiga.permissions.services import invalidate_permissions_cache
+
+    for model in ("projects.Project", "projects.Membership", "users.Role"):
+        signals.post_save.connect(invalidate_permissions_cache,
+                                  sender=apps.get_model(model),
+                                  dispatch_uid="invalidate_permissions_cache_{}_post_save".format(model))
+        signals.post_delete.connect(invalidate_permissions_cache,
+                                    sender=apps.get_model(model),
+                                    dispatch_uid="invalidate_permissions_cache_{}_post_delete".format(model))
+
+
 class ProjectsAppConfig(AppConfig):
     name = "taiga.projects"
     verbose_name = "Projects"
@@ -118,8 +177,13 @@ class ProjectsAppConfig(AppConfig):
     ]
 
     def ready(self):
+        # Register the periodic celery task of the project totals
+        from .services import totals  # noqa
+
         connect_projects_signals()
         connect_memberships_signals()
         connect_us_status_signals()
         connect_swimlane_signals()
         connect_task_status_signals()
+        connect_permissions_cache_signals()
+        connect_project_config_signals()
@@ -7,8 +7,16 @@
 
 from django.apps import AppConfig
 from django.apps import apps
+from django.db.models import signals
 
 
 class AttachmentsAppConfig(AppConfig):
     name = "taiga.projects.attachments"
     verbose_name = "Attachments"
+
+    def ready(self):
+        from . import signals as handlers
+
+        signals.post_save.connect(handlers.generate_thumbnails_on_attachment_save,
+                                  sender=apps.get_model("attachments", "Attachment"),
+                                  dispatch_uid="generate_thumbnails_on_attachment_save")
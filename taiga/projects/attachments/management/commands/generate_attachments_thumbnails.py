@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.core.management.base import BaseCommand
+
+from taiga.projects.attachments.models import Attachment
+from taiga.projects.attachments.services import generate_attachments_thumbnails_in_bulk
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Generate the thumbnails of the attachments that have not got them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", dest="all",
+                            help="Generate again the thumbnails of every attachment")
+        parser.add_argument("--processes", type=int, dest="processes", default=None,
+                            help="Number of processes (by default, the number of CPUs)")
+
+    def handle(self, *args, **options):
+        queryset = Attachment.objects.exclude(attached_file="").exclude(attached_file__isnull=True)
+        if not options["all"]:
+            queryset = queryset.filter(thumbnails__isnull=True)
+
+        attachment_ids = list(queryset.order_by("id").values_list("id", flat=True))
+        total = rest = len(attachment_ids)
+
+        def progress(attachment_id):
+            nonlocal rest
+            rest -= 1
+            logger.debug("[{} / {} remaining] - Generate thumbnails for attach {}".format(rest, total, attachment_id))
+
+        generate_attachments_thumbnails_in_bulk(attachment_ids, processes=options["processes"], progress=progress)
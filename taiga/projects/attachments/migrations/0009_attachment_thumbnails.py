@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.db import migrations
+
+import taiga.base.db.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attachments', '0008_auto_20170201_1053'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='thumbnails',
+            field=taiga.base.db.models.fields.JSONField(blank=True, default=None, null=True, verbose_name='thumbnails'),
+        ),
+    ]
@@ -15,6 +15,7 @@ from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 from django.utils.text import get_valid_filename
 
+from taiga.base.db.models.fields import JSONField
 from taiga.base.utils.files import get_file_path
 
 
@@ -61,6 +62,7 @@ class Attachment(models.Model):
                                      verbose_name=_("attached file"))
 
     sha1 = models.CharField(default="", max_length=40, verbose_name=_("sha1"), blank=True)
+    thumbnails = JSONField(null=True, blank=True, default=None, verbose_name=_("thumbnails"))
 
     is_deprecated = models.BooleanField(default=False, verbose_name=_("is deprecated"))
     from_comment = models.BooleanField(default=False, verbose_name=_("from comment"))
@@ -94,6 +96,8 @@ class Attachment(models.Model):
         if self.attached_file:
             if not self.sha1 or self.attached_file != self._orig_attached_file:
                 self._generate_sha1()
+        if self.attached_file != self._orig_attached_file:
+            self.thumbnails = None
         save = super().save(*args, **kwargs)
         self._orig_attached_file = self.attached_file
         if self.attached_file:
@@ -9,7 +9,6 @@ from django.conf import settings
 
 from taiga.base.api import serializers
 from taiga.base.fields import MethodField, Field, FileField
-from taiga.base.utils.thumbnails import get_thumbnail_url
 
 from . import services
 
@@ -67,6 +66,7 @@ class BasicAttachmentsInfoSerializerMixin(serializers.LightSerializer):
             return []
 
         for at in obj.attachments_attr:
-            at["thumbnail_card_url"] = get_thumbnail_url(at["attached_file"], settings.THN_ATTACHMENT_CARD)
+            thumbnails = at.pop("thumbnails", None)
+            at["thumbnail_card_url"] = services.get_thumbnail_url_by_alias(thumbnails, settings.THN_ATTACHMENT_CARD)
 
         return obj.attachments_attr
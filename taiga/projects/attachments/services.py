@@ -9,13 +9,18 @@ from typing import List, Optional, Union
 
 from urllib.parse import parse_qs, urldefrag
 
+from concurrent.futures import ProcessPoolExecutor
+
 from django.apps import apps
-from django.db import connection
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
 from django.conf import settings
 
 from psycopg2.extras import execute_values
 
-from taiga.base.utils.thumbnails import get_thumbnail_url, get_thumbnail
+from taiga.base.utils.thumbnails import get_thumbnail
+from taiga.base.utils.urls import get_absolute_url
+from taiga.celery import app
 
 from . import models
 
@@ -70,9 +75,116 @@ def url_is_an_attachment(url: str, base=None) -> "Union[str, None]":
 
 
 # Thumbnail services
+#
+# The thumbnails of an attachment are generated in background when its file
+# is saved and their names are stored, by alias, in its `thumbnails` field
+# (None while they are pending), so the serializers only build their urls.
+
+def get_thumbnails_aliases():
+    return (settings.THN_ATTACHMENT_CARD,
+            settings.THN_ATTACHMENT_PREVIEW,
+            settings.THN_ATTACHMENT_TIMELINE)
+
+
+def generate_thumbnails(attached_file_name):
+    """
+    Generate the thumbnails of an attachment file and return a dict with
+    their names (None if the file has no thumbnails) by alias.
+    """
+    thumbnails = {}
+    for alias in get_thumbnails_aliases():
+        thumbnail = get_thumbnail(attached_file_name, alias)
+        thumbnails[alias] = thumbnail.name if thumbnail else None
+    return thumbnails
+
+
+def _store_thumbnails(attachment_id, attached_file_name, thumbnails):
+    # The file could have been replaced while its thumbnails were generated
+    model_cls = apps.get_model("attachments", "Attachment")
+    model_cls.objects.filter(id=attachment_id,
+                             attached_file=attached_file_name).update(thumbnails=thumbnails)
+
+
+def _get_pending_files(attachment_ids):
+    model_cls = apps.get_model("attachments", "Attachment")
+    return (model_cls.objects.filter(id__in=attachment_ids)
+                             .exclude(attached_file="")
+                             .exclude(attached_file__isnull=True)
+                             .values_list("id", "attached_file"))
+
+
+@app.task
+def generate_attachments_thumbnails(attachment_ids):
+    """
+    Generate and store the thumbnails of the attachments and return them by
+    attachment id.
+    """
+    result = {}
+    for id, attached_file_name in _get_pending_files(attachment_ids):
+        result[id] = generate_thumbnails(attached_file_name)
+        _store_thumbnails(id, attached_file_name, result[id])
+    return result
+
+
+def schedule_attachments_thumbnails(attachment_ids):
+    """
+    Generate the thumbnails of the attachments in a celery task, once the
+    current transaction is committed, or right now (returning them by
+    attachment id) if celery is not enabled.
+    """
+    attachment_ids = list(attachment_ids)
+    if not attachment_ids:
+        return {}
+
+    if settings.CELERY_ENABLED:
+        transaction.on_commit(lambda: generate_attachments_thumbnails.delay(attachment_ids))
+        return {}
+    return generate_attachments_thumbnails(attachment_ids)
+
+
+def generate_attachments_thumbnails_in_bulk(attachment_ids, processes=None, progress=None):
+    """
+    Generate and store the thumbnails of the attachments in a pool of
+    `processes` processes (all the CPUs by default, none if it is 1).
+    `progress` is called with the id of every attachment once its
+    thumbnails are stored.
+    """
+    files = list(_get_pending_files(attachment_ids))
+    names = [attached_file_name for id, attached_file_name in files]
+
+    def store(results):
+        for (id, attached_file_name), thumbnails in zip(files, results):
+            _store_thumbnails(id, attached_file_name, thumbnails)
+            if progress:
+                progress(id)
+
+    if processes == 1:
+        store(map(generate_thumbnails, names))
+        return
+
+    # The processes can not share the connections to the database
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        store(executor.map(generate_thumbnails, names))
+
+
+def get_thumbnail_url_by_alias(thumbnails, alias):
+    """
+    Return the url of the `alias` thumbnail given the stored `thumbnails` of
+    an attachment, or None if it has no thumbnail or it is not generated yet.
+    """
+    name = (thumbnails or {}).get(alias)
+    if not name:
+        return None
+    return get_absolute_url(default_storage.url(name))
+
 
 def get_timeline_image_thumbnail_name(attachment):
     if attachment.attached_file:
+        if attachment.thumbnails is not None:
+            return attachment.thumbnails.get(settings.THN_ATTACHMENT_TIMELINE)
+
+        # The thumbnails are still pending, but the timeline entry is frozen now
         thumbnail = get_thumbnail(attachment.attached_file, settings.THN_ATTACHMENT_TIMELINE)
         return thumbnail.name if thumbnail else None
     return None
@@ -80,13 +192,13 @@ def get_timeline_image_thumbnail_name(attachment):
 
 def get_card_image_thumbnail_url(attachment):
     if attachment.attached_file:
-        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_CARD)
+        return get_thumbnail_url_by_alias(attachment.thumbnails, settings.THN_ATTACHMENT_CARD)
     return None
 
 
 def get_attachment_image_preview_url(attachment):
     if attachment.attached_file:
-        return get_thumbnail_url(attachment.attached_file, settings.THN_ATTACHMENT_PREVIEW)
+        return get_thumbnail_url_by_alias(attachment.thumbnails, settings.THN_ATTACHMENT_PREVIEW)
     return None
 
 
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from . import services
+
+
+def generate_thumbnails_on_attachment_save(sender, instance, **kwargs):
+    if instance.attached_file and instance.thumbnails is None:
+        thumbnails = services.schedule_attachments_thumbnails([instance.id])
+        if instance.id in thumbnails:
+            instance.thumbnails = thumbnails[instance.id]
@@ -5,7 +5,6 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
-from django.http import HttpResponse
 from django.utils.translation import ugettext as _
 
 from taiga.base.api.utils import get_object_or_error
@@ -16,6 +15,7 @@ from taiga.base.api import ModelCrudViewSet, ModelListViewSet
 from taiga.base.api.mixins import BlockedByProjectMixin
 from taiga.base.api.viewsets import NestedViewSetMixin
 from taiga.base.utils import json
+from taiga.base.utils.streaming import csv_response
 
 from taiga.projects.history.mixins import HistoryResourceMixin
 from taiga.projects.mixins.by_ref import ByRefMixin
@@ -161,7 +161,8 @@ class EpicViewSet(OCCResourceMixin, VotedResourceMixin, HistoryResourceMixin, Wa
             "owners": self.filter_queryset(queryset, filter_backends=owners_filter_backends),
             "tags": self.filter_queryset(queryset)
         }
-        return response.Ok(services.get_epics_filters_data(project, querysets))
+        use_tags_counts = self.use_project_tags_counts(request, project, "view_epics")
+        return response.Ok(services.get_epics_filters_data(project, querysets, use_tags_counts=use_tags_counts))
 
     @list_route(methods=["GET"])
     def csv(self, request):
@@ -172,9 +173,7 @@ class EpicViewSet(OCCResourceMixin, VotedResourceMixin, HistoryResourceMixin, Wa
         project = get_object_or_error(Project, request.user, epics_csv_uuid=uuid)
         queryset = project.epics.all().order_by('ref')
         data = services.epics_to_csv(project, queryset)
-        csv_response = HttpResponse(data.getvalue(), content_type='application/csv; charset=utf-8')
-        csv_response['Content-Disposition'] = 'attachment; filename="epics.csv"'
-        return csv_response
+        return csv_response(request, data, "epics.csv")
 
     @list_route(methods=["POST"])
     def bulk_create(self, request, **kwargs):
@@ -5,8 +5,6 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
-import csv
-import io
 from collections import OrderedDict
 from operator import itemgetter
 from contextlib import closing
@@ -15,9 +13,11 @@ from django.db import connection
 from django.utils.translation import ugettext as _
 
 from taiga.base.utils import db, text
+from taiga.base.utils.streaming import iter_csv, iter_queryset_in_chunks
 from taiga.projects.epics.apps import connect_epics_signals
 from taiga.projects.epics.apps import disconnect_epics_signals
 from taiga.projects.services import apply_order_updates
+from taiga.projects.tagging import services as tagging_services
 from taiga.projects.userstories.apps import connect_userstories_signals
 from taiga.projects.userstories.apps import disconnect_userstories_signals
 from taiga.projects.userstories.services import get_userstories_from_bulk
@@ -158,7 +158,6 @@ def update_epic_related_userstories_order_in_bulk(bulk_data: list, epic: object)
 #####################################################
 
 def epics_to_csv(project, queryset):
-    csv_data = io.StringIO()
     fieldnames = ["id", "ref", "subject", "description", "owner", "owner_full_name",
                   "assigned_to", "assigned_to_full_name", "status", "epics_order",
                   "client_requirement", "team_requirement", "attachments", "tags",
@@ -180,9 +179,11 @@ def epics_to_csv(project, queryset):
     queryset = attach_total_voters_to_queryset(queryset)
     queryset = attach_watchers_to_queryset(queryset)
 
-    writer = csv.DictWriter(csv_data, fieldnames=fieldnames)
-    writer.writeheader()
-    for epic in queryset:
+    return iter_csv(fieldnames, _iter_epics_csv_rows(queryset, custom_attrs))
+
+
+def _iter_epics_csv_rows(queryset, custom_attrs):
+    for epic in iter_queryset_in_chunks(queryset):
         epic_data = {
             "id": epic.id,
             "ref": epic.ref,
@@ -213,9 +214,7 @@ def epics_to_csv(project, queryset):
             value = epic.custom_attributes_values.attributes_values.get(str(custom_attr.id), None)
             epic_data[custom_attr.name] = value
 
-        writer.writerow(epic_data)
-
-    return csv_data
+        yield epic_data
 
 
 #####################################################
@@ -417,7 +416,13 @@ def _get_epics_tags(project, queryset):
     return sorted(result, key=itemgetter("name"))
 
 
-def get_epics_filters_data(project, querysets):
+def _get_epics_tags_data(project, queryset, use_tags_counts=False):
+    if use_tags_counts:
+        return tagging_services.get_project_tags_counts(project, "epics")
+    return _get_epics_tags(project, queryset)
+
+
+def get_epics_filters_data(project, querysets, use_tags_counts=False):
     """
     Given a project and an epics queryset, return a simple data structure
     of all possible filters for the epics in the queryset.
@@ -426,7 +431,7 @@ def get_epics_filters_data(project, querysets):
         ("statuses", _get_epics_statuses(project, querysets["statuses"])),
         ("assigned_to", _get_epics_assigned_to(project, querysets["assigned_to"])),
         ("owners", _get_epics_owners(project, querysets["owners"])),
-        ("tags", _get_epics_tags(project, querysets["tags"])),
+        ("tags", _get_epics_tags_data(project, querysets["tags"], use_tags_counts)),
     ])
 
     return data
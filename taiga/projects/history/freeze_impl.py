@@ -325,11 +325,8 @@ def epic_related_userstory_freezer(related_us) -> dict:
 
 
 def userstory_freezer(us) -> dict:
-    rp_cls = apps.get_model("userstories", "RolePoints")
-    rpqsd = rp_cls.objects.filter(user_story=us)
-
     points = {}
-    for rp in rpqsd:
+    for rp in us.role_points.all():
         points[str(rp.role_id)] = rp.points_id
 
     assigned_users = [u.id for u in us.assigned_users.all()]
@@ -373,7 +370,7 @@ def userstory_freezer(us) -> dict:
 
 
 def issue_freezer(issue) -> dict:
-    promoted_to = list(issue.generated_user_stories.values_list("id", flat=True))
+    promoted_to = [us.id for us in issue.generated_user_stories.all()]
 
     snapshot = {
         "ref": issue.ref,
@@ -401,7 +398,7 @@ def issue_freezer(issue) -> dict:
 
 
 def task_freezer(task) -> dict:
-    promoted_to = list(task.generated_user_stories.values_list("id", flat=True))
+    promoted_to = [us.id for us in task.generated_user_stories.all()]
 
     snapshot = {
         "ref": task.ref,
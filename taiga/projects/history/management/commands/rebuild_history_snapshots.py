@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from taiga.projects.models import Project
+from taiga.projects.history.models import HistoryEntry
+from taiga.projects.history.services import rebuild_snapshot_state_for_key
+
+
+class Command(BaseCommand):
+    help = "Build (or rebuild) the materialized current snapshot of every history key"
+
+    def add_arguments(self, parser):
+        parser.add_argument("project_slugs",
+                            nargs="*",
+                            help="<project_slug project_slug ...> (all projects by default)")
+
+    @override_settings(DEBUG=False)
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by("id")
+        if options["project_slugs"]:
+            projects = projects.filter(slug__in=options["project_slugs"])
+            if projects.count() != len(set(options["project_slugs"])):
+                raise CommandError("Some of the projects does not exist")
+
+        for project in projects.iterator():
+            keys = (HistoryEntry.objects.filter(project_id=project.id)
+                                        .exclude(key__isnull=True)
+                                        .values_list("key", flat=True)
+                                        .distinct())
+            total = 0
+            for key in keys.iterator():
+                with transaction.atomic():
+                    if rebuild_snapshot_state_for_key(key, project.id):
+                        total += 1
+
+            self.stdout.write(self.style.SUCCESS(
+                "-> {}: {} history snapshots built.".format(project.slug, total)))
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import taiga.base.db.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0067_auto_20201230_1237'),
+        ('history', '0014_json_to_jsonb'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorySnapshot',
+            fields=[
+                ('key', models.CharField(editable=False, max_length=255, primary_key=True, serialize=False)),
+                ('snapshot', taiga.base.db.models.fields.JSONField(blank=True, default=None, null=True)),
+                ('partial_diffs', models.PositiveIntegerField(default=0)),
+                ('modified_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.Project')),
+            ],
+        ),
+    ]
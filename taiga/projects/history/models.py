@@ -324,3 +324,27 @@ class HistoryEntry(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+
+
+class HistorySnapshot(models.Model):
+    """
+    Materialized current frozen state of a history key.
+
+    It is kept up to date by `take_snapshot` in the same transaction that
+    creates the history entry, so the last snapshot of a key can be
+    obtained with one indexed read instead of replaying the partial diffs
+    stored since the last complete snapshot.
+    """
+    key = models.CharField(primary_key=True, max_length=255, editable=False)
+    project = models.ForeignKey("projects.Project", on_delete=models.CASCADE,
+                                related_name="+")
+
+    # Current complete frozen object (the same as rebuilding the last
+    # complete snapshot with all the partial diffs after it)
+    snapshot = JSONField(null=True, blank=True, default=None)
+
+    # Number of partial history entries created since the last
+    # complete snapshot
+    partial_diffs = models.PositiveIntegerField(default=0)
+
+    modified_date = models.DateTimeField(default=timezone.now)
@@ -20,6 +20,7 @@ This is possible example:
 """
 import logging
 from collections import namedtuple
+from contextlib import ExitStack, contextmanager
 from copy import deepcopy
 from functools import partial
 from functools import wraps
@@ -28,6 +29,8 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.apps import apps
 from django.db import transaction as tx
+from django.db.models import signals
+from django.utils import timezone
 from django_pglocks import advisory_lock
 
 from taiga.mdrender.service import render as mdrender
@@ -315,7 +318,16 @@ def _rebuild_snapshot_from_diffs(keysnapshot, partials):
     return result
 
 
-def get_last_snapshot_for_key(key: str) -> FrozenObj:
+def _get_max_partial_diffs():
+    return getattr(settings, "MAX_PARTIAL_DIFFS", 60)
+
+
+def _rebuild_last_snapshot_for_key(key: str):
+    """
+    Rebuild the last frozen state of a key replaying all the partial
+    diffs stored after its last complete snapshot. Returns the
+    frozen object and the number of partial diffs.
+    """
     entry_model = apps.get_model("history", "HistoryEntry")
 
     # Search last snapshot
@@ -325,7 +337,7 @@ def get_last_snapshot_for_key(key: str) -> FrozenObj:
 
     keysnapshot = qs.first()
     if keysnapshot is None:
-        return None, True
+        return None, 0
 
     # Get all partial snapshots
     entries = tuple(entry_model.objects
@@ -334,12 +346,66 @@ def get_last_snapshot_for_key(key: str) -> FrozenObj:
                     .order_by("created_at"))
 
     snapshot = _rebuild_snapshot_from_diffs(keysnapshot.snapshot, entries)
-    max_partial_diffs = getattr(settings, "MAX_PARTIAL_DIFFS", 60)
+    return FrozenObj(keysnapshot.key, snapshot), len(entries)
+
+
+def _get_snapshot_state_for_key(key: str):
+    """
+    Get the last frozen state of a key and the number of partial diffs
+    stored since its last complete snapshot.
+
+    The materialized `HistorySnapshot` is used when it exists (one
+    indexed read), otherwise the state is rebuilt from history entries.
+    """
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    state = snapshot_model.objects.filter(key=key).first()
+    if state is not None:
+        return FrozenObj(key, state.snapshot), state.partial_diffs, True
 
-    if len(entries) >= max_partial_diffs:
-        return FrozenObj(keysnapshot.key, snapshot), True
+    fobj, partial_diffs = _rebuild_last_snapshot_for_key(key)
+    return fobj, partial_diffs, False
 
-    return FrozenObj(keysnapshot.key, snapshot), False
+
+def get_last_snapshot_for_key(key: str) -> FrozenObj:
+    fobj, partial_diffs, _ = _get_snapshot_state_for_key(key)
+    if fobj is None:
+        return None, True
+
+    return fobj, partial_diffs >= _get_max_partial_diffs()
+
+
+def _save_snapshot_state(key: str, project_id: int, snapshot: dict, partial_diffs: int):
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    snapshot_model.objects.update_or_create(key=key, defaults={
+        "project_id": project_id,
+        "snapshot": snapshot,
+        "partial_diffs": partial_diffs,
+        "modified_date": timezone.now(),
+    })
+
+
+def invalidate_snapshot_state(key: str):
+    """
+    Remove the materialized state of a key. It must be called when history
+    entries are written without `take_snapshot`, the state will be rebuilt
+    from the history entries the next time.
+    """
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    snapshot_model.objects.filter(key=key).delete()
+
+
+def rebuild_snapshot_state_for_key(key: str, project_id: int) -> bool:
+    """
+    (Re)build the materialized state of a key from its history entries.
+    """
+    with advisory_lock("history-"+key):
+        fobj, partial_diffs = _rebuild_last_snapshot_for_key(key)
+        if fobj is None:
+            invalidate_snapshot_state(key)
+            return False
+
+        _save_snapshot_state(key, project_id, fobj.snapshot, partial_diffs)
+        return True
 
 
 # Public api
@@ -380,9 +446,11 @@ def take_snapshot(obj: object, *, comment: str="", user=None,
         typename = get_typename_for_model_class(obj.__class__)
 
         new_fobj = freeze_model_instance(obj)
-        old_fobj, need_real_snapshot = get_last_snapshot_for_key(key)
+        raw_old_fobj, partial_diffs, _ = _get_snapshot_state_for_key(key)
+        need_real_snapshot = raw_old_fobj is None or partial_diffs >= _get_max_partial_diffs()
 
         # migrate diff to latest schema
+        old_fobj = raw_old_fobj
         if old_fobj:
             old_fobj = migrate_to_last_version(typename, old_fobj)
 
@@ -419,9 +487,10 @@ def take_snapshot(obj: object, *, comment: str="", user=None,
         else:
             is_hidden = is_hidden_snapshot(fdiff)
 
+        project_id = getattr(obj, 'project_id', getattr(obj, 'id', None))
         kwargs = {
             "user": {"pk": user_id, "name": user_name},
-            "project_id": getattr(obj, 'project_id', getattr(obj, 'id', None)),
+            "project_id": project_id,
             "key": key,
             "type": entry_type,
             "snapshot": fdiff.snapshot if need_real_snapshot else None,
@@ -433,7 +502,200 @@ def take_snapshot(obj: object, *, comment: str="", user=None,
             "is_snapshot": need_real_snapshot,
         }
 
-        return entry_model.objects.create(**kwargs)
+        entry = entry_model.objects.create(**kwargs)
+
+        # Keep the materialized state of the key up to date
+        if need_real_snapshot:
+            _save_snapshot_state(key, project_id, fdiff.snapshot, 0)
+        else:
+            _save_snapshot_state(key, project_id,
+                                 _rebuild_snapshot_from_diffs(raw_old_fobj.snapshot, [fdiff]),
+                                 partial_diffs + 1)
+
+        return entry
+
+
+# Prefetches used to freeze many instances of the same type with
+# a constant number of queries.
+_bulk_freeze_select_related = {
+    "epics.epic": ("project", "status", "custom_attributes_values"),
+    "userstories.userstory": ("project", "status", "swimlane", "custom_attributes_values"),
+    "issues.issue": ("project", "status", "custom_attributes_values"),
+    "tasks.task": ("project", "status", "custom_attributes_values"),
+    "wiki.wikipage": ("project",),
+}
+
+_bulk_freeze_prefetch_related = {
+    "epics.epic": ("attachments", "project__epiccustomattributes"),
+    "userstories.userstory": ("attachments", "assigned_users", "role_points",
+                              "project__userstorycustomattributes"),
+    "issues.issue": ("attachments", "generated_user_stories", "project__issuecustomattributes"),
+    "tasks.task": ("attachments", "generated_user_stories", "project__taskcustomattributes"),
+    "wiki.wikipage": ("attachments",),
+}
+
+
+def _freeze_model_instances_in_bulk(model_cls, pks) -> dict:
+    """
+    Freeze all the instances of `model_cls` with the given pks. Returns a
+    dict {key: FrozenObj}, removed instances are not included.
+    """
+    typename = get_typename_for_model_class(model_cls)
+    if typename not in _freeze_impl_map:
+        raise RuntimeError("No implementation found for {}".format(typename))
+
+    qs = model_cls.objects.filter(pk__in=pks)
+    qs = qs.select_related(*_bulk_freeze_select_related.get(typename, ()))
+    qs = qs.prefetch_related(*_bulk_freeze_prefetch_related.get(typename, ()))
+
+    impl_fn = _freeze_impl_map[typename]
+    result = {}
+    for obj in qs:
+        snapshot = impl_fn(obj)
+        assert isinstance(snapshot, dict), \
+            "freeze handlers should return always a dict"
+
+        key = make_key_from_model_object(obj)
+        result[key] = (obj, FrozenObj(key, snapshot))
+
+    return result
+
+
+def _get_snapshot_states_for_keys(keys) -> dict:
+    """
+    Bulk version of `_get_snapshot_state_for_key`.
+    """
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    states = {state.key: (FrozenObj(state.key, state.snapshot), state.partial_diffs)
+              for state in snapshot_model.objects.filter(key__in=keys)}
+
+    for key in keys:
+        if key not in states:
+            states[key] = _rebuild_last_snapshot_for_key(key)
+
+    return states
+
+
+@contextmanager
+def _lock_history_keys(keys):
+    """
+    Take the advisory locks of the history keys in the given order.
+    """
+    with ExitStack() as stack:
+        for key in keys:
+            stack.enter_context(advisory_lock("history-"+key))
+        yield
+
+
+def _make_bulk_history_entry(obj, new_fobj, state, *, comment: str, user: dict, comment_html: dict):
+    """
+    Compute the history entry and the new snapshot state of a frozen
+    instance for `take_snapshots_in_bulk`. Returns None if there are no
+    changes. `comment_html` caches the rendered comment by project.
+    """
+    entry_model = apps.get_model("history", "HistoryEntry")
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+
+    key = new_fobj.key
+    typename = get_typename_for_model_class(obj.__class__)
+    raw_old_fobj, partial_diffs = state
+    need_real_snapshot = raw_old_fobj is None or partial_diffs >= _get_max_partial_diffs()
+
+    old_fobj = raw_old_fobj
+    if old_fobj:
+        old_fobj = migrate_to_last_version(typename, old_fobj)
+
+    entry_type = HistoryType.change if old_fobj else HistoryType.create
+    fdiff = make_diff(old_fobj, new_fobj, get_excluded_fields(typename))
+
+    # If diff and comment are empty, do
+    # not create empty history entry
+    if not fdiff.diff and not comment and old_fobj is not None:
+        return None
+
+    project_id = getattr(obj, 'project_id', getattr(obj, 'id', None))
+    if project_id not in comment_html:
+        comment_html[project_id] = mdrender(obj.project, comment)
+
+    entry = entry_model(
+        user=user,
+        project_id=project_id,
+        key=key,
+        type=entry_type,
+        snapshot=fdiff.snapshot if need_real_snapshot else None,
+        diff=fdiff.diff,
+        values=make_diff_values(typename, fdiff),
+        comment=comment,
+        comment_html=comment_html[project_id],
+        is_hidden=False if comment else is_hidden_snapshot(fdiff),
+        is_snapshot=need_real_snapshot,
+    )
+
+    if need_real_snapshot:
+        new_state = snapshot_model(key=key, project_id=project_id,
+                                   snapshot=fdiff.snapshot, partial_diffs=0)
+    else:
+        new_state = snapshot_model(key=key, project_id=project_id,
+                                   snapshot=_rebuild_snapshot_from_diffs(raw_old_fobj.snapshot, [fdiff]),
+                                   partial_diffs=partial_diffs + 1)
+
+    return entry, new_state
+
+
+@tx.atomic
+def take_snapshots_in_bulk(objs, *, comment: str="", user=None):
+    """
+    Bulk version of `take_snapshot` for (not deleted) model instances.
+
+    The freezer inputs are prefetched for all the instances, the advisory
+    locks are taken in key order (to avoid deadlocks with concurrent bulk
+    operations) and the history entries and snapshot states are written
+    with `bulk_create`. `post_save` is sent for every new entry so
+    timeline, webhooks and notifications keep working as with
+    `take_snapshot`.
+    """
+    objs_by_model = {}
+    for obj in objs:
+        objs_by_model.setdefault(obj.__class__, set()).add(obj.pk)
+
+    if not objs_by_model:
+        return []
+
+    keys = sorted("{0}:{1}".format(get_typename_for_model_class(model_cls), pk)
+                  for model_cls, pks in objs_by_model.items() for pk in pks)
+
+    entry_model = apps.get_model("history", "HistoryEntry")
+    snapshot_model = apps.get_model("history", "HistorySnapshot")
+    user_data = {"pk": None if user is None else user.id,
+                 "name": "" if user is None else user.get_full_name()}
+
+    with _lock_history_keys(keys):
+        frozen = {}
+        for model_cls, pks in objs_by_model.items():
+            frozen.update(_freeze_model_instances_in_bulk(model_cls, pks))
+
+        # Removed instances (simultaneous DELETE requests) are not frozen
+        keys = [key for key in keys if key in frozen]
+        states = _get_snapshot_states_for_keys(keys)
+        comment_html = {}
+        results = [_make_bulk_history_entry(*frozen[key], states[key], comment=comment, user=user_data,
+                                            comment_html=comment_html)
+                   for key in keys]
+        results = [result for result in results if result is not None]
+        entries = [entry for entry, new_state in results]
+        new_states = [new_state for entry, new_state in results]
+
+        entry_model.objects.bulk_create(entries)
+
+        # Keep the materialized state of the keys up to date
+        snapshot_model.objects.filter(key__in=[state.key for state in new_states]).delete()
+        snapshot_model.objects.bulk_create(new_states)
+
+    for entry in entries:
+        signals.post_save.send(sender=entry_model, instance=entry, created=True,
+                               update_fields=None, raw=False, using=entry._state.db)
+
+    return entries
 
 
 # High level query api
@@ -7,7 +7,6 @@
 
 #
 from django.utils.translation import ugettext as _
-from django.http import HttpResponse
 
 from taiga.base import filters
 from taiga.base import exceptions as exc
@@ -16,6 +15,7 @@ from taiga.base.decorators import detail_route, list_route
 from taiga.base.api import ModelCrudViewSet, ModelListViewSet
 from taiga.base.api.mixins import BlockedByProjectMixin
 from taiga.base.api.utils import get_object_or_error
+from taiga.base.utils.streaming import csv_response
 
 from taiga.projects.history.mixins import HistoryResourceMixin
 from taiga.projects.milestones.models import Milestone
@@ -205,7 +205,9 @@ class IssueViewSet(AssignedToSignalMixin, OCCResourceMixin, VotedResourceMixin,
             "tags": self.filter_queryset(queryset, filter_backends=tags_filter_backends),
             "roles": self.filter_queryset(queryset, filter_backends=roles_filter_backends),
         }
-        return response.Ok(services.get_issues_filters_data(project, querysets))
+        use_tags_counts = self.use_project_tags_counts(request, project, "view_issues",
+                                                       ignored_params=("tags", "exclude_tags"))
+        return response.Ok(services.get_issues_filters_data(project, querysets, use_tags_counts=use_tags_counts))
 
     @list_route(methods=["GET"])
     def csv(self, request):
@@ -216,9 +218,7 @@ class IssueViewSet(AssignedToSignalMixin, OCCResourceMixin, VotedResourceMixin,
         project = get_object_or_error(Project, request.user, issues_csv_uuid=uuid)
         queryset = project.issues.all().order_by('ref')
         data = services.issues_to_csv(project, queryset)
-        csv_response = HttpResponse(data.getvalue(), content_type='application/csv; charset=utf-8')
-        csv_response['Content-Disposition'] = 'attachment; filename="issues.csv"'
-        return csv_response
+        return csv_response(request, data, "issues.csv")
 
     @list_route(methods=["POST"])
     def bulk_create(self, request, **kwargs):
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('likes', '0002_auto_20151130_2230'),
+        ('timeline', '0008_auto_20190606_1528'),
+        ('projects', '0067_auto_20201230_1237'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTotalsBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counter', models.CharField(choices=[('activity', 'activity'), ('fans', 'fans')], max_length=16, verbose_name='counter')),
+                ('date', models.DateField(verbose_name='date')),
+                ('count', models.IntegerField(default=0, verbose_name='count')),
+                ('modified_date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='modified date')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='totals_buckets', to='projects.Project', verbose_name='project')),
+            ],
+            options={
+                'verbose_name': 'project totals bucket',
+                'verbose_name_plural': 'project totals buckets',
+                'unique_together': {('project', 'counter', 'date')},
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO projects_projecttotalsbucket (project_id, counter, date, count, modified_date)
+                 SELECT likes_like.object_id, 'fans', (likes_like.created_date AT TIME ZONE 'UTC')::date, COUNT(*), now()
+                   FROM likes_like
+             INNER JOIN django_content_type ON django_content_type.id = likes_like.content_type_id
+             INNER JOIN projects_project ON projects_project.id = likes_like.object_id
+                  WHERE django_content_type.app_label = 'projects'
+                    AND django_content_type.model = 'project'
+               GROUP BY 1, 3;
+
+            INSERT INTO projects_projecttotalsbucket (project_id, counter, date, count, modified_date)
+                 SELECT projects_project.id, 'activity', (timeline_timeline.created AT TIME ZONE 'UTC')::date, COUNT(*), now()
+                   FROM timeline_timeline
+             INNER JOIN projects_project ON timeline_timeline.namespace = CONCAT('project:', projects_project.id)
+               GROUP BY 1, 3;
+            """,
+            reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
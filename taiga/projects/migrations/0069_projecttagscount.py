@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TAGGED_TABLES = (
+    ("epics", "epics_epic"),
+    ("userstories", "userstories_userstory"),
+    ("tasks", "tasks_task"),
+    ("issues", "issues_issue"),
+)
+
+
+# NOTE: These indexes are needed by taiga.projects.tagging.services and
+#       taiga.base.filters.TagsFilter (tags @> ARRAY[...] and tags && ARRAY[...])
+CREATE_INDEXES = "".join("""
+    CREATE INDEX IF NOT EXISTS {table}_tags_idx ON {table} USING gin (tags);
+""".format(table=table) for element, table in TAGGED_TABLES)
+
+DROP_INDEXES = "".join("""
+    DROP INDEX IF EXISTS {table}_tags_idx;
+""".format(table=table) for element, table in TAGGED_TABLES)
+
+
+# TG_ARGV[0] is the element of the table (epics, userstories, tasks or issues)
+CREATE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION update_project_tags_counts()
+    RETURNS trigger AS $update_project_tags_counts$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.tags IS NOT NULL THEN
+            UPDATE projects_projecttagscount
+               SET count = count - 1
+             WHERE project_id = OLD.project_id
+               AND element = TG_ARGV[0]
+               AND tag IN (SELECT DISTINCT unnest(OLD.tags));
+        END IF;
+
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.tags IS NOT NULL THEN
+            INSERT INTO projects_projecttagscount (project_id, element, tag, count)
+                 SELECT NEW.project_id, TG_ARGV[0], tag, 1
+                   FROM (SELECT DISTINCT unnest(NEW.tags) tag) new_tags
+            ON CONFLICT (project_id, element, tag)
+              DO UPDATE SET count = projects_projecttagscount.count + 1;
+        END IF;
+
+        RETURN NULL;
+    END; $update_project_tags_counts$
+    LANGUAGE plpgsql;
+"""
+
+DROP_FUNCTION = """
+    DROP FUNCTION IF EXISTS update_project_tags_counts();
+"""
+
+CREATE_TRIGGERS = "".join("""
+    DROP TRIGGER IF EXISTS update_project_tags_counts_on_insert_or_delete ON {table};
+    CREATE TRIGGER update_project_tags_counts_on_insert_or_delete
+    AFTER INSERT OR DELETE ON {table}
+    FOR EACH ROW EXECUTE PROCEDURE update_project_tags_counts('{element}');
+
+    DROP TRIGGER IF EXISTS update_project_tags_counts_on_update ON {table};
+    CREATE TRIGGER update_project_tags_counts_on_update
+    AFTER UPDATE OF tags, project_id ON {table}
+    FOR EACH ROW
+    WHEN (OLD.tags IS DISTINCT FROM NEW.tags OR OLD.project_id IS DISTINCT FROM NEW.project_id)
+    EXECUTE PROCEDURE update_project_tags_counts('{element}');
+""".format(table=table, element=element) for element, table in TAGGED_TABLES)
+
+DROP_TRIGGERS = "".join("""
+    DROP TRIGGER IF EXISTS update_project_tags_counts_on_insert_or_delete ON {table};
+    DROP TRIGGER IF EXISTS update_project_tags_counts_on_update ON {table};
+""".format(table=table) for element, table in TAGGED_TABLES)
+
+FILL_COUNTS = "".join("""
+    INSERT INTO projects_projecttagscount (project_id, element, tag, count)
+         SELECT project_id, '{element}', tag, COUNT(*)
+           FROM (SELECT DISTINCT id, project_id, unnest(tags) tag FROM {table}) tags
+       GROUP BY project_id, tag;
+""".format(table=table, element=element) for element, table in TAGGED_TABLES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0068_projecttotalsbucket'),
+        ('epics', '0006_auto_20200615_0811'),
+        ('userstories', '0021_auto_20201202_0850'),
+        ('tasks', '0013_auto_20200615_0811'),
+        ('issues', '0009_auto_20200615_0811'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTagsCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('element', models.CharField(choices=[('epics', 'epics'), ('userstories', 'user stories'), ('tasks', 'tasks'), ('issues', 'issues')], max_length=16, verbose_name='element')),
+                ('tag', models.TextField(verbose_name='tag')),
+                ('count', models.IntegerField(default=0, verbose_name='count')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags_counts', to='projects.Project', verbose_name='project')),
+            ],
+            options={
+                'verbose_name': 'project tags count',
+                'verbose_name_plural': 'project tags counts',
+                'unique_together': {('project', 'element', 'tag')},
+            },
+        ),
+        migrations.RunSQL([CREATE_INDEXES], [DROP_INDEXES]),
+        migrations.RunSQL([CREATE_FUNCTION, CREATE_TRIGGERS, FILL_COUNTS],
+                          [DROP_TRIGGERS, DROP_FUNCTION]),
+    ]
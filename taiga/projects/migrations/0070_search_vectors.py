@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from django.db import migrations
+
+
+ITEM_TABLES = (
+    "epics_epic",
+    "userstories_userstory",
+    "tasks_task",
+    "issues_issue",
+)
+
+
+# NOTE: The search_vector columns are not model fields, they are kept up to
+#       date by the triggers and only used by taiga.searches.services and
+#       taiga.base.filters.QFilter
+CREATE_FUNCTIONS = """
+    CREATE OR REPLACE FUNCTION item_search_vector(subject text, ref bigint, tags text[], description text)
+                       RETURNS tsvector
+                      LANGUAGE sql
+                     IMMUTABLE AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(subject, '') || ' ' || coalesce(ref::text, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(inmutable_array_to_string(tags), '')), 'B') ||
+               setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    $$;
+
+    CREATE OR REPLACE FUNCTION wiki_page_search_vector(slug text, content text)
+                       RETURNS tsvector
+                      LANGUAGE sql
+                     IMMUTABLE AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(slug, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(content, '')), 'B')
+    $$;
+
+    CREATE OR REPLACE FUNCTION update_item_search_vector()
+    RETURNS trigger AS $update_item_search_vector$
+    BEGIN
+        NEW.search_vector := item_search_vector(NEW.subject, NEW.ref, NEW.tags, NEW.description);
+        RETURN NEW;
+    END; $update_item_search_vector$
+    LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION update_wiki_page_search_vector()
+    RETURNS trigger AS $update_wiki_page_search_vector$
+    BEGIN
+        NEW.search_vector := wiki_page_search_vector(NEW.slug, NEW.content);
+        RETURN NEW;
+    END; $update_wiki_page_search_vector$
+    LANGUAGE plpgsql;
+"""
+
+DROP_FUNCTIONS = """
+    DROP FUNCTION IF EXISTS update_item_search_vector();
+    DROP FUNCTION IF EXISTS update_wiki_page_search_vector();
+    DROP FUNCTION IF EXISTS item_search_vector(text, bigint, text[], text);
+    DROP FUNCTION IF EXISTS wiki_page_search_vector(text, text);
+"""
+
+
+CREATE_COLUMNS = "".join("""
+    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector;
+    UPDATE {table} SET search_vector = item_search_vector(subject, ref, tags, description);
+    CREATE INDEX IF NOT EXISTS {table}_search_vector_idx ON {table} USING gin (search_vector);
+
+    DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table};
+    CREATE TRIGGER {table}_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF subject, ref, tags, description ON {table}
+        FOR EACH ROW EXECUTE PROCEDURE update_item_search_vector();
+""".format(table=table) for table in ITEM_TABLES) + """
+    ALTER TABLE wiki_wikipage ADD COLUMN IF NOT EXISTS search_vector tsvector;
+    UPDATE wiki_wikipage SET search_vector = wiki_page_search_vector(slug, content);
+    CREATE INDEX IF NOT EXISTS wiki_wikipage_search_vector_idx ON wiki_wikipage USING gin (search_vector);
+
+    DROP TRIGGER IF EXISTS wiki_wikipage_search_vector_trigger ON wiki_wikipage;
+    CREATE TRIGGER wiki_wikipage_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF slug, content ON wiki_wikipage
+        FOR EACH ROW EXECUTE PROCEDURE update_wiki_page_search_vector();
+"""
+
+DROP_COLUMNS = "".join("""
+    DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table};
+    ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector;
+""".format(table=table) for table in ITEM_TABLES + ("wiki_wikipage",))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0069_projecttagscount'),
+        ('epics', '0006_auto_20200615_0811'),
+        ('userstories', '0021_auto_20201202_0850'),
+        ('tasks', '0013_auto_20200615_0811'),
+        ('issues', '0009_auto_20200615_0811'),
+        ('wiki', '0005_auto_20161201_1628'),
+    ]
+
+    operations = [
+        migrations.RunSQL([CREATE_FUNCTIONS, CREATE_COLUMNS],
+                          [DROP_COLUMNS, DROP_FUNCTIONS]),
+    ]
@@ -7,7 +7,7 @@
 
 from taiga.base.utils import db
 from taiga.events import events
-from taiga.projects.history.services import take_snapshot
+from taiga.projects.history.services import take_snapshots_in_bulk
 from taiga.projects.services import apply_order_updates
 from taiga.projects.issues.models import Issue
 from taiga.projects.tasks.models import Task
@@ -87,12 +87,8 @@ def update_userstories_milestone_in_bulk(bulk_data: list, milestone: object):
 
 
 def snapshot_userstories_in_bulk(bulk_data, user):
-    for us_data in bulk_data:
-        try:
-            us = UserStory.objects.get(pk=us_data['us_id'])
-            take_snapshot(us, user=user)
-        except UserStory.DoesNotExist:
-            pass
+    ids = [us_data['us_id'] for us_data in bulk_data]
+    take_snapshots_in_bulk(UserStory.objects.filter(pk__in=ids).only("id"), user=user)
 
 
 def update_tasks_milestone_in_bulk(bulk_data: list, milestone: object):
@@ -135,12 +131,8 @@ def update_tasks_milestone_in_bulk(bulk_data: list, milestone: object):
 
 
 def snapshot_tasks_in_bulk(bulk_data, user):
-    for task_data in bulk_data:
-        try:
-            task = Task.objects.get(pk=task_data['task_id'])
-            take_snapshot(task, user=user)
-        except Task.DoesNotExist:
-            pass
+    ids = [task_data['task_id'] for task_data in bulk_data]
+    take_snapshots_in_bulk(Task.objects.filter(pk__in=ids).only("id"), user=user)
 
 
 def update_issues_milestone_in_bulk(bulk_data: list, milestone: object):
@@ -169,9 +161,5 @@ def update_issues_milestone_in_bulk(bulk_data: list, milestone: object):
 
 
 def snapshot_issues_in_bulk(bulk_data, user):
-    for issue_data in bulk_data:
-        try:
-            issue = Issue.objects.get(pk=issue_data['issue_id'])
-            take_snapshot(issue, user=user)
-        except Issue.DoesNotExist:
-            pass
+    ids = [issue_data['issue_id'] for issue_data in bulk_data]
+    take_snapshots_in_bulk(Issue.objects.filter(pk__in=ids).only("id"), user=user)
@@ -39,12 +39,8 @@ from taiga.projects.notifications.services import (
     set_notify_policy_level_to_ignore,
     create_notify_policy_if_not_exists)
 
-from taiga.timeline.service import build_project_namespace
-
 from . import choices
 
-from dateutil.relativedelta import relativedelta
-
 
 def get_project_logo_file_path(instance, filename):
     return get_file_path(instance, filename, "project")
@@ -329,38 +325,22 @@ class Project(ProjectDefaults, TaggedMixin, TagsColorsMixin, models.Model):
             super().save(*args, **kwargs)
 
     def refresh_totals(self, save=True):
-        now = timezone.now()
-        self.totals_updated_datetime = now
-
-        Like = apps.get_model("likes", "Like")
-        content_type = apps.get_model("contenttypes", "ContentType").objects.get_for_model(Project)
-        qs = Like.objects.filter(content_type=content_type, object_id=self.id)
-
-        self.total_fans = qs.count()
-
-        qs_week = qs.filter(created_date__gte=now - relativedelta(weeks=1))
-        self.total_fans_last_week = qs_week.count()
-
-        qs_month = qs.filter(created_date__gte=now - relativedelta(months=1))
-        self.total_fans_last_month = qs_month.count()
-
-        qs_year = qs.filter(created_date__gte=now - relativedelta(years=1))
-        self.total_fans_last_year = qs_year.count()
-
-        tl_model = apps.get_model("timeline", "Timeline")
-        namespace = build_project_namespace(self)
-
-        qs = tl_model.objects.filter(namespace=namespace)
-        self.total_activity = qs.count()
+        """
+        Recount the fans and activity of the project from scratch (likes and
+        timeline entries), rebuilding its totals buckets.
 
-        qs_week = qs.filter(created__gte=now - relativedelta(weeks=1))
-        self.total_activity_last_week = qs_week.count()
+        Timeline and likes update the buckets incrementally, see
+        `taiga.projects.services.totals`, so this is only needed after
+        writing them in other ways (imports, timeline rebuilds...).
+        """
+        from taiga.projects.services import totals as totals_services
 
-        qs_month = qs.filter(created__gte=now - relativedelta(months=1))
-        self.total_activity_last_month = qs_month.count()
+        now = timezone.now()
+        self.totals_updated_datetime = now
 
-        qs_year = qs.filter(created__gte=now - relativedelta(years=1))
-        self.total_activity_last_year = qs_year.count()
+        totals_services.rebuild_project_totals_buckets(self)
+        for field, value in totals_services.get_project_totals_from_buckets(self.id, now=now).items():
+            setattr(self, field, value)
 
         if save:
             self.save(update_fields=[
@@ -494,42 +474,81 @@ class Project(ProjectDefaults, TaggedMixin, TagsColorsMixin, models.Model):
         notify_policy = self.cached_notify_policy_for_user(user)
         set_notify_policy_level_to_ignore(notify_policy)
 
-    def delete_related_content(self):
+    def delete_related_content(self, progress=None):
         # NOTE: Remember to update code in taiga.projects.admin.ProjectAdmin.delete_queryset
-        from taiga.events.apps import (connect_events_signals,
-                                       disconnect_events_signals)
-        from taiga.projects.epics.apps import (connect_all_epics_signals,
-                                               disconnect_all_epics_signals)
-        from taiga.projects.tasks.apps import (connect_all_tasks_signals,
-                                               disconnect_all_tasks_signals)
-        from taiga.projects.userstories.apps import (connect_all_userstories_signals,
-                                                     disconnect_all_userstories_signals)
-        from taiga.projects.issues.apps import (connect_all_issues_signals,
-                                                disconnect_all_issues_signals)
-        from taiga.projects.apps import (connect_memberships_signals,
-                                         disconnect_memberships_signals)
-
-        disconnect_events_signals()
-        disconnect_all_epics_signals()
-        disconnect_all_issues_signals()
-        disconnect_all_tasks_signals()
-        disconnect_all_userstories_signals()
-        disconnect_memberships_signals()
+        from taiga.projects.services.deletion import delete_project_content
+        return delete_project_content(self, progress=progress)
+
+
+class ProjectTotalsBucket(models.Model):
+    """
+    Daily aggregate of a project counter (activity or fans). The totals of
+    the project (total_activity_last_week, total_fans...) are computed
+    from these buckets instead of counting timeline entries and likes.
+    """
+    ACTIVITY = "activity"
+    FANS = "fans"
+    COUNTER_CHOICES = (
+        (ACTIVITY, _("activity")),
+        (FANS, _("fans")),
+    )
 
-        try:
-            self.epics.all().delete()
-            self.tasks.all().delete()
-            self.user_stories.all().delete()
-            self.issues.all().delete()
-            self.memberships.all().delete()
-            self.roles.all().delete()
-        finally:
-            connect_events_signals()
-            connect_all_issues_signals()
-            connect_all_tasks_signals()
-            connect_all_userstories_signals()
-            connect_all_epics_signals()
-            connect_memberships_signals()
+    project = models.ForeignKey(
+        "Project",
+        null=False,
+        blank=False,
+        related_name="totals_buckets",
+        verbose_name=_("project"),
+        on_delete=models.CASCADE,
+    )
+    counter = models.CharField(max_length=16, null=False, blank=False, choices=COUNTER_CHOICES,
+                               verbose_name=_("counter"))
+    date = models.DateField(null=False, blank=False, verbose_name=_("date"))
+    count = models.IntegerField(null=False, blank=False, default=0, verbose_name=_("count"))
+    modified_date = models.DateTimeField(null=False, blank=False, default=timezone.now,
+                                         verbose_name=_("modified date"))
+
+    class Meta:
+        verbose_name = "project totals bucket"
+        verbose_name_plural = "project totals buckets"
+        unique_together = ("project", "counter", "date")
+
+
+class ProjectTagsCount(models.Model):
+    """
+    Number of elements (epics, user stories, tasks or issues) of a project
+    with every tag. Kept up to date by database triggers on the tags of the
+    elements, so any UPDATE (including the raw ones of the tag services)
+    is counted.
+    """
+    EPICS = "epics"
+    USERSTORIES = "userstories"
+    TASKS = "tasks"
+    ISSUES = "issues"
+    ELEMENT_CHOICES = (
+        (EPICS, _("epics")),
+        (USERSTORIES, _("user stories")),
+        (TASKS, _("tasks")),
+        (ISSUES, _("issues")),
+    )
+
+    project = models.ForeignKey(
+        "Project",
+        null=False,
+        blank=False,
+        related_name="tags_counts",
+        verbose_name=_("project"),
+        on_delete=models.CASCADE,
+    )
+    element = models.CharField(max_length=16, null=False, blank=False, choices=ELEMENT_CHOICES,
+                               verbose_name=_("element"))
+    tag = models.TextField(null=False, blank=False, verbose_name=_("tag"))
+    count = models.IntegerField(null=False, blank=False, default=0, verbose_name=_("count"))
+
+    class Meta:
+        verbose_name = "project tags count"
+        verbose_name_plural = "project tags counts"
+        unique_together = ("project", "element", "tag")
 
 
 class ProjectModulesConfig(models.Model):
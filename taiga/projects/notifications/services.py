@@ -5,13 +5,20 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import copy
 import datetime
+import smtplib
+import time
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
+from html import escape as html_escape
 import logging
 
 from django.apps import apps
-from django.db import IntegrityError, transaction
+from django.core.mail import get_connection
+from django.db import IntegrityError, connection as db_connection, transaction
 from django.db.models import Q
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
@@ -20,7 +27,6 @@ from django.utils import timezone
 from django.utils.translation import ugettext as _
 
 from taiga.base import exceptions as exc
-from taiga.base.utils.iterators import iter_queryset
 from taiga.base.mails import InlineCSSTemplateMail
 from taiga.front.templatetags.functions import resolve as resolve_front_url
 from taiga.projects.notifications.choices import NotifyLevel
@@ -269,12 +275,149 @@ def send_notifications(obj, *, history):
         events.emit_live_notification_for_model(obj, user, history)
 
 
+class _RecipientPlaceholder:
+    """
+    Stand-in for the recipient while rendering the message shared by all
+    the recipients with the same language. Notification templates only use
+    the full name of the recipient, any other attribute makes the message
+    be rendered for every recipient.
+    """
+    full_name = "TAIGARECIPIENTFULLNAME"
+
+    def get_full_name(self):
+        return self.full_name
+
+    def __str__(self):
+        return self.full_name
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        raise _PersonalizedTemplate(name)
+
+
+class _PersonalizedTemplate(Exception):
+    pass
+
+
+def _personalize_message(message, user):
+    full_name = user.get_full_name()
+    personalized = copy.copy(message)
+    personalized.to = [user.email]
+    personalized.extra_headers = dict(message.extra_headers)
+    personalized.subject = message.subject.replace(_RecipientPlaceholder.full_name, full_name)
+    personalized.body = message.body.replace(_RecipientPlaceholder.full_name, full_name)
+    personalized.alternatives = [
+        (content.replace(_RecipientPlaceholder.full_name,
+                         html_escape(full_name) if mimetype == "text/html" else full_name), mimetype)
+        for content, mimetype in getattr(message, "alternatives", [])
+    ]
+    return personalized
+
+
+def _make_notification_messages(email, context, users, headers):
+    """
+    Render the message once per language and return a copy of it for every
+    user.
+    """
+    users_by_lang = defaultdict(list)
+    for user in users:
+        users_by_lang[user.lang or settings.LANGUAGE_CODE].append(user)
+
+    messages = []
+    for lang, lang_users in users_by_lang.items():
+        lang_context = dict(context, lang=lang, user=_RecipientPlaceholder())
+        try:
+            message = email.make_email_object(lang_users[0].email, lang_context, headers=headers)
+        except _PersonalizedTemplate:
+            for user in lang_users:
+                user_context = dict(context, lang=lang, user=user)
+                messages.append(email.make_email_object(user.email, user_context, headers=headers))
+        else:
+            messages += [_personalize_message(message, user) for user in lang_users]
+
+    return messages
+
+
+def _is_connection_error(error):
+    # SMTPException is an OSError too, but only a disconnection breaks the connection
+    if isinstance(error, smtplib.SMTPException):
+        return isinstance(error, smtplib.SMTPServerDisconnected)
+    return isinstance(error, OSError)
+
+
+def _reopen_connection(connection):
+    try:
+        connection.close()
+    except OSError:
+        pass
+
+    try:
+        connection.open()
+    except OSError:
+        logger.exception("Error reopening the email connection")
+
+
+def _send_messages(messages, connection=None):
+    """
+    Send the messages through a single mail connection. A failed message
+    does not prevent the others from being sent. When the connection is
+    lost it is reopened and the message is sent again once.
+
+    Return the number of messages not sent because of connection errors.
+    """
+    if not messages:
+        return 0
+
+    connection = connection or get_connection()
+    try:
+        opened = connection.open()
+    except OSError:
+        logger.exception("Error opening the email connection")
+        return len(messages)
+
+    failed = 0
+    try:
+        for message in messages:
+            for attempt in range(2):
+                try:
+                    connection.send_messages([message])
+                    break
+                except Exception as e:
+                    """
+                    Catch all smtp exceptions:
+
+                      - smtplib.SMTPDataError
+                      - smtplib.SMTPException
+                      - smtplib.SMTPServerDisconnected
+                      - ssl.SSLError
+                      - OSError
+                      - ValueError
+                      - ...
+                    """
+                    logger.exception("Error sending email notifications")
+                    if not _is_connection_error(e):
+                        break
+                    _reopen_connection(connection)
+            else:
+                failed += 1
+    finally:
+        # Only close the connections opened here
+        if opened:
+            connection.close()
+
+    return failed
+
+
 @transaction.atomic
-def send_sync_notifications(notification_id):
+def send_sync_notifications(notification_id, connection=None):
     """
     Given changed instance, calculate the history entry and
     a complete list for users to notify, send
     email to all users.
+
+    The emails are sent using the mail `connection` if it is given (or a
+    new one otherwise).
     """
 
     notification = HistoryChangeNotification.objects.select_for_update().get(pk=notification_id)
@@ -365,24 +508,10 @@ def send_sync_notifications(notification_id):
         "List-Unsubscribe": "<{unsubscribe_url}>".format(**format_args),
     }
 
-    for user in notification.notify_users.distinct():
-        context["user"] = user
-        context["lang"] = user.lang or settings.LANGUAGE_CODE
-        try:
-            email.send(user.email, context, headers=headers)
-        except Exception:
-            """
-            Catch all smtp exceptions:
-
-              - smtplib.SMTPDataError
-              - smtplib.SMTPException
-              - smtplib.SMTPServerDisconnected
-              - ssl.SSLError
-              - OSError
-              - ValueError
-              - ...
-            """
-            logger.exception("Error sending email notifications")
+    messages = _make_notification_messages(email, context, notification.notify_users.distinct(), headers)
+    if _send_messages(messages, connection=connection):
+        # The notification is kept to be sent again later
+        return False, []
 
     notification_id = notification.id
     notification.delete()
@@ -574,12 +703,57 @@ def make_ms_thread_index(msg_id, dt):
     return base64.b64encode(thread_bin).decode("utf-8")
 
 
-def send_bulk_email():
+def _send_bulk_email_batch(notification_ids):
+    sent = 0
+    with get_connection() as connection:
+        for notification_id in notification_ids:
+            try:
+                with transaction.atomic():
+                    result, history_entries = send_sync_notifications(notification_id, connection=connection)
+                    sent += 1 if result else 0
+            except HistoryChangeNotification.DoesNotExist:
+                pass
+    return sent
+
+
+def _send_bulk_email_batch_in_thread(notification_ids):
+    try:
+        return _send_bulk_email_batch(notification_ids)
+    finally:
+        # Every thread has its own database connection
+        db_connection.close()
+
+
+def send_bulk_email(batch_size=100):
+    """
+    Send the pending change notifications.
+
+    Notifications are sent in batches of `batch_size`, every batch through
+    a single mail connection. With NOTIFICATIONS_SEND_WORKERS > 1 batches
+    are processed concurrently by that number of threads.
+    """
     with advisory_lock("send-notifications-command", wait=False) as acquired:
-        if acquired:
-            qs = HistoryChangeNotification.objects.all().order_by("-id")
-            for change_notification in iter_queryset(qs, itersize=100):
-                try:
-                    send_sync_notifications(change_notification.pk)
-                except HistoryChangeNotification.DoesNotExist:
-                    pass
+        if not acquired:
+            return None
+
+        start = time.perf_counter()
+        notification_ids = list(HistoryChangeNotification.objects.order_by("-id").values_list("id", flat=True))
+        batches = [notification_ids[i:i + batch_size] for i in range(0, len(notification_ids), batch_size)]
+
+        workers = getattr(settings, "NOTIFICATIONS_SEND_WORKERS", 1)
+        if workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                sent = sum(executor.map(_send_bulk_email_batch_in_thread, batches))
+        else:
+            sent = sum(map(_send_bulk_email_batch, batches))
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "pending": len(notification_ids),
+            "sent": sent,
+            "seconds": elapsed,
+            "notifications_per_second": sent / elapsed if elapsed else 0,
+        }
+        logger.info("Change notifications: %(sent)s of %(pending)s sent in %(seconds).2fs "
+                    "(%(notifications_per_second).1f/s)", stats)
+        return stats
@@ -16,3 +16,15 @@ def get_instance_by_ref(project_id, obj_ref):
         instance = None
 
     return instance
+
+
+def get_instances_by_ref(project_id, obj_refs):
+    """
+    Return a dict with the references of the project with the `obj_refs`
+    refs, by ref, and their content objects already fetched.
+    """
+    model_cls = apps.get_model("references", "Reference")
+    instances = (model_cls.objects.filter(project_id=project_id, ref__in=obj_refs)
+                                  .select_related("content_type")
+                                  .prefetch_related("content_object"))
+    return {instance.ref: instance for instance in instances}
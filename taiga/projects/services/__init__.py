@@ -23,7 +23,17 @@ from .bulk_update_order import bulk_update_epic_status_order
 from .bulk_update_order import bulk_update_swimlane_order
 from .bulk_update_order import update_projects_order_in_bulk
 
+from .config import attach_project_config
+from .config import get_project_config
+from .config import invalidate_project_config
+
 from .filters import get_all_tags
+from .filters import get_facets_counts
+from .filters import get_assigned_filters_data
+from .filters import get_choices_filters_data
+from .filters import get_owners_filters_data
+from .filters import get_roles_filters_data
+from .filters import get_tags_filters_data
 
 from .invitations import send_invitation
 from .invitations import find_invited_user
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+Bulk creation of the content of an imported project.
+
+Creating the elements one by one with the ORM costs tens of queries per
+element: the signals creating the reference, the custom attributes values
+and the role points, the lookups of statuses and users, one query for
+every watcher, history entry and attachment... `BulkLoader` resolves the
+lookups once and writes every kind of row with `bulk_create`, `chunk_size`
+rows at a time, doing itself the work of those signals.
+
+No signals are sent for the rows created by the loader, so it must only be
+used to fill a project that is being imported (the timeline is rebuilt at
+the end of the import).
+"""
+
+import hashlib
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from taiga.mdrender.service import invalidate_project_cache
+from taiga.projects.attachments.services import schedule_attachments_thumbnails
+from taiga.projects.references import models as refs
+from taiga.projects.references import sequences as seq
+
+
+BULK_LOAD_CHUNK_SIZE = 500
+
+# Fields filled by save() with a default of the project when they are empty
+DEFAULT_FIELDS = {
+    "epics.Epic": {"status": "default_epic_status"},
+    "userstories.UserStory": {"status": "default_us_status"},
+    "tasks.Task": {"status": "default_task_status"},
+    "issues.Issue": {
+        "status": "default_issue_status",
+        "type": "default_issue_type",
+        "severity": "default_severity",
+        "priority": "default_priority",
+    },
+}
+
+CUSTOM_ATTRIBUTES_VALUES_MODELS = {
+    "epics.Epic": ("custom_attributes.EpicCustomAttributesValues", "epic"),
+    "userstories.UserStory": ("custom_attributes.UserStoryCustomAttributesValues", "user_story"),
+    "tasks.Task": ("custom_attributes.TaskCustomAttributesValues", "task"),
+    "issues.Issue": ("custom_attributes.IssueCustomAttributesValues", "issue"),
+}
+
+
+class BulkLoader:
+    def __init__(self, project, chunk_size=BULK_LOAD_CHUNK_SIZE):
+        self.project = project
+        self.chunk_size = chunk_size
+        self._lookups = {}
+        self._pending = defaultdict(list)
+        self._has_sequence = False
+        self._tasks_user_stories = {}
+
+    def lookup(self, related_name, key="name"):
+        """
+        Return a dict with the objects of the `related_name` relation of the
+        project (us_statuses, task_statuses, roles...) by `key`. The
+        relation is queried only once.
+        """
+        if (related_name, key) not in self._lookups:
+            queryset = getattr(self.project, related_name).all()
+            self._lookups[(related_name, key)] = {getattr(obj, key): obj for obj in queryset}
+        return self._lookups[(related_name, key)]
+
+    def _allocate_refs(self, objs):
+        seqname = refs.make_sequence_name(self.project)
+        if not self._has_sequence:
+            if not seq.exists(seqname):
+                seq.create(seqname)
+            self._has_sequence = True
+
+        max_ref = max((obj.ref for obj in objs if obj.ref), default=None)
+        if max_ref is not None:
+            seq.set_max(seqname, max_ref)
+
+        without_ref = [obj for obj in objs if not obj.ref]
+        if without_ref:
+            for obj, ref in zip(without_ref, seq.next_values(seqname, len(without_ref))):
+                obj.ref = ref
+
+    def _set_defaults(self, model, objs):
+        now = timezone.now()
+        label = model._meta.label
+        defaults = DEFAULT_FIELDS.get(label, {})
+
+        for obj in objs:
+            obj.project = self.project
+            if not obj.modified_date:
+                obj.modified_date = now
+            if isinstance(getattr(obj, "tags", None), (list, tuple)):
+                obj.tags = list(map(str.lower, obj.tags))
+
+            for field, project_field in defaults.items():
+                if getattr(obj, "{}_id".format(field)) is None:
+                    setattr(obj, field, getattr(self.project, project_field))
+
+            self._set_closed_state(label, obj, now)
+
+    def _set_closed_state(self, label, obj, now):
+        is_closed = obj.status is not None and obj.status.is_closed
+        if label == "userstories.UserStory":
+            if is_closed and not obj.is_closed:
+                obj.is_closed = True
+                obj.finish_date = now
+        elif hasattr(obj, "finished_date"):
+            if is_closed and not obj.finished_date:
+                obj.finished_date = now
+            elif not is_closed:
+                obj.finished_date = None
+
+    def _create_role_points(self, user_stories):
+        RolePoints = apps.get_model("userstories", "RolePoints")
+        roles = [role for role in self.lookup("roles", "id").values() if role.computable]
+        role_points = [RolePoints(user_story=us, role=role, points=self.project.default_points)
+                       for us in user_stories for role in roles]
+        RolePoints.objects.bulk_create(role_points, batch_size=self.chunk_size)
+
+    def _update_user_stories_is_closed(self):
+        """
+        Close the user stories with all their tasks closed and open the
+        rest, as the signals of the tasks do. Their tasks can be created in
+        several chunks, so it is done once all of them are created.
+        """
+        UserStory = apps.get_model("userstories", "UserStory")
+        Task = apps.get_model("tasks", "Task")
+        user_stories = self._tasks_user_stories
+        self._tasks_user_stories = {}
+
+        ids = list(user_stories)
+        changed = []
+        for start in range(0, len(ids), self.chunk_size):
+            open_tasks = (Task.objects.filter(user_story_id__in=ids[start:start + self.chunk_size])
+                                      .order_by()
+                                      .values_list("user_story_id")
+                                      .annotate(Count("id", filter=Q(status__isnull=True) |
+                                                                   Q(status__is_closed=False))))
+            for us_id, open_count in open_tasks:
+                us = user_stories[us_id]
+                is_closed = us.status is not None and open_count == 0
+                if is_closed != us.is_closed:
+                    us.is_closed = is_closed
+                    us.finish_date = timezone.now() if is_closed else None
+                    changed.append(us)
+
+        UserStory.objects.bulk_update(changed, ["is_closed", "finish_date"], batch_size=self.chunk_size)
+
+    def create(self, model, objs, attributes_values=None):
+        """
+        Create the `objs` elements (epics, user stories, tasks or issues) of
+        `model` with their references, custom attributes values (from the
+        `attributes_values` list, in the same order as `objs`) and role
+        points.
+        """
+        objs = list(objs)
+        if attributes_values is None:
+            attributes_values = [{}] * len(objs)
+
+        label = model._meta.label
+        content_type = ContentType.objects.get_for_model(model)
+        values_model, values_field = CUSTOM_ATTRIBUTES_VALUES_MODELS[label]
+        values_model = apps.get_model(values_model)
+
+        for start in range(0, len(objs), self.chunk_size):
+            chunk = objs[start:start + self.chunk_size]
+            self._set_defaults(model, chunk)
+            self._allocate_refs(chunk)
+            model.objects.bulk_create(chunk)
+
+            refs.Reference.objects.bulk_create([
+                refs.Reference(content_type=content_type, object_id=obj.id, ref=obj.ref, project=self.project)
+                for obj in chunk
+            ])
+            values_model.objects.bulk_create([
+                values_model(**{values_field: obj, "attributes_values": values})
+                for obj, values in zip(chunk, attributes_values[start:start + self.chunk_size])
+            ])
+
+            if label == "userstories.UserStory":
+                self._create_role_points(chunk)
+            elif label == "tasks.Task":
+                self._tasks_user_stories.update((task.user_story_id, task.user_story)
+                                                for task in chunk if task.user_story_id is not None)
+
+        return objs
+
+    def new_attachment(self, name, content, **fields):
+        """
+        Store the file of an attachment and return the (unsaved) attachment.
+        """
+        Attachment = apps.get_model("attachments", "Attachment")
+        attachment = Attachment(project=self.project, name=name, **fields)
+        if attachment.size is None:
+            attachment.size = len(content)
+        attachment.sha1 = hashlib.sha1(content).hexdigest()
+        attachment.modified_date = timezone.now()
+        attachment.attached_file.save(name, ContentFile(content), save=False)
+        return attachment
+
+    def add(self, obj):
+        """
+        Queue a row (attachment, history entry, watcher...) to be created
+        with the next chunk of its model.
+        """
+        pending = self._pending[obj.__class__]
+        pending.append(obj)
+        if len(pending) >= self.chunk_size:
+            self._flush_model(obj.__class__)
+
+    def add_watchers(self, obj, users):
+        Watched = apps.get_model("notifications", "Watched")
+        content_type = ContentType.objects.get_for_model(obj)
+        for user in {user.id: user for user in users}.values():
+            self.add(Watched(content_type=content_type, object_id=obj.id, user=user, project=self.project))
+
+    def _flush_model(self, model):
+        objs = self._pending.pop(model, [])
+        if objs:
+            model.objects.bulk_create(objs, batch_size=self.chunk_size)
+
+            # bulk_create sends no post_save signal to generate the thumbnails
+            if model._meta.label == "attachments.Attachment":
+                schedule_attachments_thumbnails([obj.id for obj in objs])
+
+    def flush(self):
+        for model in list(self._pending):
+            self._flush_model(model)
+
+        if self._tasks_user_stories:
+            self._update_user_stories_is_closed()
+
+        # The references of the project have been created without signals
+        invalidate_project_cache(self.project.id)
@@ -16,6 +16,52 @@ from taiga.events import events
 from taiga.projects import models
 
 
+class _OrderShifts:
+    """
+    Orders of a list of elements sorted by their original order where a +1
+    can be added to a contiguous range of positions in O(log n) (a Fenwick
+    tree over the differences of the shifts).
+    """
+
+    def __init__(self, orders: list):
+        self.orders = orders
+        self._tree = [0] * (len(orders) + 1)
+
+    def _add(self, position: int, value: int):
+        position += 1
+        while position < len(self._tree):
+            self._tree[position] += value
+            position += position & -position
+
+    def shift(self, position: int) -> int:
+        position += 1
+        total = 0
+        while position > 0:
+            total += self._tree[position]
+            position -= position & -position
+        return total
+
+    def order(self, position: int):
+        return self.orders[position] + self.shift(position)
+
+    def increment(self, start: int, end: int):
+        self._add(start, 1)
+        if end < len(self.orders):
+            self._add(end, -1)
+
+    def bisect_left(self, order) -> int:
+        # Shifts never change the relative order of the elements so the
+        # current orders are still sorted
+        low, high = 0, len(self.orders)
+        while low < high:
+            middle = (low + high) // 2
+            if self.order(middle) < order:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
 def apply_order_updates(base_orders: dict, new_orders: dict, *, remove_equal_original=False):
     """
     `base_orders` must be a dict containing all the elements that can be affected by
@@ -27,7 +73,6 @@ def apply_order_updates(base_orders: dict, new_orders: dict, *, remove_equal_ori
     Extra order updates can be needed when moving elements to intermediate positions.
     The elements where no order update is needed will be removed.
     """
-    updated_order_ids = set()
     original_orders = {k: v for k, v in base_orders.items()}
 
     # Remove the elements from new_orders non existint in base_orders
@@ -38,18 +83,33 @@ def apply_order_updates(base_orders: dict, new_orders: dict, *, remove_equal_ori
     sorted_new_orders = [(k, v) for k, v in new_orders.items()]
     sorted_new_orders = sorted(sorted_new_orders, key=lambda e: e[1])
 
-    for new_order in sorted_new_orders:
-        old_order = base_orders[new_order[0]]
-        new_order = new_order[1]
-        for id, order in base_orders.items():
-            # When moving forward only the elements contained in the range new_order - old_order
-            # positions need to be updated
-            moving_backward = new_order <= old_order and order >= new_order and order < old_order
-            # When moving backward all the elements from the new_order position need to bee updated
-            moving_forward = new_order >= old_order and order >= new_order
-            if moving_backward or moving_forward:
-                base_orders[id] += 1
-                updated_order_ids.add(id)
+    # Every change moves a block of elements contiguous in the original
+    # order, so the elements are sorted once and each change is a range
+    # increment.
+    sorted_ids = sorted(base_orders.keys(), key=lambda id: base_orders[id])
+    positions = {id: position for position, id in enumerate(sorted_ids)}
+    shifts = _OrderShifts([base_orders[id] for id in sorted_ids])
+
+    for id, new_order in sorted_new_orders:
+        old_order = shifts.order(positions[id])
+        start = shifts.bisect_left(new_order)
+        if new_order >= old_order:
+            # When moving forward all the elements from the new_order position need to be updated
+            end = len(sorted_ids)
+        else:
+            # When moving backward only the elements contained in the range
+            # new_order - old_order positions need to be updated
+            end = shifts.bisect_left(old_order)
+
+        if start < end:
+            shifts.increment(start, end)
+
+    updated_order_ids = set()
+    for position, id in enumerate(sorted_ids):
+        shift = shifts.shift(position)
+        if shift:
+            base_orders[id] += shift
+            updated_order_ids.add(id)
 
     # Overwriting the orders specified
     for id, order in new_orders.items():
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+Configuration document of a project.
+
+The project detail returns the statuses, points, priorities, severities,
+types, due dates, custom attributes, roles, swimlanes, milestones, members
+and notify policies of the project, that rarely change. They are built
+once, with the same subqueries as `attach_extra_info`, and cached under a
+version of the project that is changed (see `taiga.projects.signals`)
+whenever one of them is saved or deleted.
+"""
+
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from taiga.projects import utils as project_utils
+
+
+PROJECT_CONFIG_ATTRS = (
+    (project_utils.attach_members, "members_attr"),
+    (project_utils.attach_closed_milestones, "closed_milestones_attr"),
+    (project_utils.attach_notify_policies, "notify_policies_attr"),
+    (project_utils.attach_epic_statuses, "epic_statuses_attr"),
+    (project_utils.attach_swimlanes, "swimlanes_attr"),
+    (project_utils.attach_userstory_statuses, "userstory_statuses_attr"),
+    (project_utils.attach_userstory_duedates, "userstory_duedates_attr"),
+    (project_utils.attach_points, "points_attr"),
+    (project_utils.attach_task_statuses, "task_statuses_attr"),
+    (project_utils.attach_task_duedates, "task_duedates_attr"),
+    (project_utils.attach_issue_statuses, "issue_statuses_attr"),
+    (project_utils.attach_issue_duedates, "issue_duedates_attr"),
+    (project_utils.attach_issue_types, "issue_types_attr"),
+    (project_utils.attach_priorities, "priorities_attr"),
+    (project_utils.attach_severities, "severities_attr"),
+    (project_utils.attach_epic_custom_attributes, "epic_custom_attributes_attr"),
+    (project_utils.attach_userstory_custom_attributes, "userstory_custom_attributes_attr"),
+    (project_utils.attach_task_custom_attributes, "task_custom_attributes_attr"),
+    (project_utils.attach_issue_custom_attributes, "issue_custom_attributes_attr"),
+    (project_utils.attach_roles, "roles_attr"),
+    (project_utils.attach_milestones, "milestones_attr"),
+)
+
+
+def _get_version_key(project_id):
+    return "projects/config/version/{}".format(project_id)
+
+
+def _get_version(project_id):
+    return cache.get_or_set(_get_version_key(project_id), lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_project_config(project_id):
+    """
+    Discard the cached configuration document of the project.
+    """
+    key = _get_version_key(project_id)
+    cache.delete(key)
+
+    # Another request could cache the document with the old data until the
+    # current transaction is committed
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def build_project_config(project_id):
+    """
+    Return a dict with the configuration document of the project (by
+    attribute name) or None if it does not exist.
+    """
+    queryset = apps.get_model("projects", "Project").objects.filter(id=project_id)
+    for attach, attr in PROJECT_CONFIG_ATTRS:
+        queryset = attach(queryset, as_field=attr)
+
+    attrs = [attr for attach, attr in PROJECT_CONFIG_ATTRS]
+    values = queryset.values_list(*attrs).first()
+    if values is None:
+        return None
+    return dict(zip(attrs, values))
+
+
+def get_project_config(project_id):
+    key = "projects/config/{}/{}".format(project_id, _get_version(project_id))
+    config = cache.get(key)
+    if config is None:
+        config = build_project_config(project_id)
+        if config is not None:
+            cache.set(key, config, settings.PROJECT_CONFIG_CACHE_TIMEOUT)
+    return config
+
+
+def attach_project_config(project):
+    """
+    Set the attributes of the configuration document (`members_attr`,
+    `epic_statuses_attr`...) in the project, as `attach_extra_info` does.
+    """
+    for attr, value in (get_project_config(project.id) or {}).items():
+        setattr(project, attr, value)
+    return project
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+Chunked deletion of the content of a project.
+
+The Django collector loads in memory every row to delete and all its
+dependents (history entries, timeline, attachments...), which can be
+hundreds of thousands of objects in a big project. Here the same relations
+the collector follows (CASCADE, SET_NULL and generic relations) are
+deleted with SQL, `chunk_size` rows at a time and children first, so the
+memory used is bounded by the chunk size and not by the project size.
+
+Rows deleted this way do not send pre_delete/post_delete signals (as
+before, the handlers of the elements of a project being deleted were
+disconnected), but the files of the deleted rows are still removed from
+the storage. Models that can not be deleted this way (PROTECT, SET(...),
+multi-table inheritance...) are deleted with the ORM, chunk by chunk.
+"""
+
+from collections import Counter
+
+from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, models, transaction
+from django.db.models.deletion import get_candidate_relations_to_delete
+
+from taiga.base.signals.cleanup_files import remove_files_on_delete
+
+
+DELETION_CHUNK_SIZE = 1000
+
+# The biggest tables are deleted first so the relations with SET_NULL to
+# them (milestones, statuses...) have less rows to update.
+FIRST_DELETED_MODELS = (
+    "epics.Epic",
+    "tasks.Task",
+    "userstories.UserStory",
+    "issues.Issue",
+    "history.HistoryEntry",
+    "timeline.Timeline",
+)
+
+SQL_ON_DELETE = (models.CASCADE, models.SET_NULL, models.DO_NOTHING)
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+class ChunkedDeletion:
+    def __init__(self, chunk_size=DELETION_CHUNK_SIZE, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.deleted = Counter()
+
+    def _can_delete_with_sql(self, model):
+        if model._meta.parents:
+            return False
+
+        for related in get_candidate_relations_to_delete(model._meta):
+            if related.field.remote_field.on_delete not in SQL_ON_DELETE:
+                return False
+        return True
+
+    def _get_related(self, model):
+        def priority(related):
+            label = related.related_model._meta.label
+            if label in FIRST_DELETED_MODELS:
+                return FIRST_DELETED_MODELS.index(label)
+            return len(FIRST_DELETED_MODELS)
+
+        return sorted(get_candidate_relations_to_delete(model._meta), key=priority)
+
+    def _set_null(self, model, field, where, params):
+        table = _quote(model._meta.db_table)
+        pk = _quote(model._meta.pk.column)
+        sql = f"""
+            UPDATE {table}
+               SET {_quote(field.column)} = NULL
+             WHERE {pk} IN (SELECT {pk} FROM {table} WHERE {where} LIMIT %s)
+        """
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, list(params) + [self.chunk_size])
+                if cursor.rowcount < self.chunk_size:
+                    return
+
+    def _delete_files(self, model, ids):
+        file_fields = [field.name for field in model._meta.fields if isinstance(field, models.FileField)]
+        if not file_fields:
+            return
+
+        for obj in model._base_manager.filter(pk__in=ids).only(model._meta.pk.name, *file_fields):
+            remove_files_on_delete(model, obj)
+
+    def delete_related(self, model, ids, path=()):
+        """
+        Delete (or update) the rows that depend on the `ids` rows of `model`.
+        """
+        path = path + (model,)
+        meta = model._meta
+
+        for related in self._get_related(model):
+            field = related.field
+            on_delete = field.remote_field.on_delete
+            child = related.related_model
+
+            if on_delete is models.DO_NOTHING:
+                continue
+
+            if field.target_field.column == meta.pk.column:
+                where = f"{_quote(field.column)} = ANY(%s)"
+            else:
+                where = (f"{_quote(field.column)} IN (SELECT {_quote(field.target_field.column)} "
+                         f"FROM {_quote(meta.db_table)} WHERE {_quote(meta.pk.column)} = ANY(%s))")
+
+            if on_delete is models.SET_NULL:
+                self._set_null(child, field, where, [ids])
+            elif child in path:
+                # Self-referencing (or cyclic) relations are left to the collector
+                queryset = child._base_manager.filter(**{f"{field.name}__{meta.pk.name}__in": ids})
+                self.deleted.update(queryset.delete()[1])
+            else:
+                self.delete(child, where, [ids], path=path)
+
+        for field in meta.private_fields:
+            if isinstance(field, GenericRelation):
+                child = field.related_model
+                content_type = ContentType.objects.get_for_model(model, for_concrete_model=field.for_concrete_model)
+                content_type_column = child._meta.get_field(field.content_type_field_name).column
+                object_id_column = child._meta.get_field(field.object_id_field_name).column
+                where = f"{_quote(content_type_column)} = %s AND {_quote(object_id_column)} = ANY(%s)"
+                self.delete(child, where, [content_type.id, ids], path=path)
+
+    def _delete_ids(self, model, ids, path):
+        meta = model._meta
+        if not self._can_delete_with_sql(model):
+            self.deleted.update(model._base_manager.filter(pk__in=ids).delete()[1])
+            return
+
+        self.delete_related(model, ids, path)
+        self._delete_files(model, ids)
+
+        sql = f"DELETE FROM {_quote(meta.db_table)} WHERE {_quote(meta.pk.column)} = ANY(%s)"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [ids])
+            self.deleted[meta.label] += cursor.rowcount
+
+    def delete(self, model, where, params, path=()):
+        """
+        Delete the rows of `model` matching the SQL condition `where` and
+        all their dependent rows. Every chunk is deleted in its own
+        transaction.
+        """
+        meta = model._meta
+        sql = f"SELECT {_quote(meta.pk.column)} FROM {_quote(meta.db_table)} WHERE {where} LIMIT %s"
+
+        while True:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, list(params) + [self.chunk_size])
+                    ids = [row[0] for row in cursor.fetchall()]
+
+                if not ids:
+                    return
+
+                self._delete_ids(model, ids, path)
+
+            if self.progress is not None:
+                self.progress(meta.label, self.deleted[meta.label])
+
+            if len(ids) < self.chunk_size:
+                return
+
+
+def delete_project_content(project, chunk_size=DELETION_CHUNK_SIZE, progress=None):
+    """
+    Delete all the rows that depend on the project (but not the project).
+
+    `progress` is called after every deleted chunk with the model label and
+    the number of rows of that model deleted so far. Return a Counter with
+    the number of deleted rows of every model.
+    """
+    deletion = ChunkedDeletion(chunk_size=chunk_size, progress=progress)
+    deletion.delete_related(project.__class__, [project.id])
+    return deletion.deleted
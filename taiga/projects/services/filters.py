@@ -5,8 +5,17 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+from collections import defaultdict
 from contextlib import closing
+from operator import itemgetter
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import EmptyResultSet
 from django.db import connection
+from django.utils.translation import ugettext as _
+
+from taiga.users.gravatar import get_gravatar_id
+from taiga.users.services import get_photo_url, get_big_photo_url
 
 
 def _get_project_tags(project):
@@ -54,3 +63,189 @@ def get_all_tags(project):
     result.update(_get_stories_tags(project))
     result.update(_get_tasks_tags(project))
     return sorted(result)
+
+
+#####################################################
+# Filters data (facets counts)
+#####################################################
+
+def _get_where(queryset):
+    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
+    try:
+        where, params = queryset.query.where.as_sql(compiler, connection)
+    except EmptyResultSet:
+        return "FALSE", []
+    return where or "TRUE", list(params)
+
+
+def get_facets_counts(querysets, joins, columns, facets):
+    """
+    Count the elements of every facet in a single scan of the table.
+
+    `querysets` is a dict with the (already filtered) queryset of every
+    facet, `joins` the SQL joins their where clauses need, `columns` a dict
+    with the SQL expressions (aggregated by element) to keep of every
+    element and `facets` a dict with the SQL expression returning the
+    value (or values, for set-returning expressions) of a facet from those
+    columns.
+
+    The elements matching any facet are scanned once into a candidate set
+    (materialized by PostgreSQL, as it is used by every facet) with a flag
+    per facet, and every facet is counted over its own candidates, so an
+    element is counted once per value. The values are returned as json to
+    share the column in all the facets.
+
+    Return a dict with a dict of counts by value for every facet.
+    """
+    model = next(iter(querysets.values())).model
+    table = model._meta.db_table
+
+    wheres = {name: _get_where(queryset) for name, queryset in querysets.items()}
+
+    flags_sql = []
+    flags_params = []
+    for name, (where, params) in wheres.items():
+        flags_sql.append('bool_or({where}) "in_{name}"'.format(where=where, name=name))
+        flags_params += params
+
+    any_where_params = []
+    for where, params in wheres.values():
+        any_where_params += params
+
+    counters_sql = []
+    counters_params = []
+    for name, value in facets.items():
+        counters_sql.append("""
+              SELECT %s::text "facet",
+                     to_json("value") "value",
+                     COUNT(DISTINCT "id") "count"
+                FROM (SELECT "id", {value} "value"
+                        FROM "candidates"
+                       WHERE "in_{name}") "values"
+            GROUP BY "value"
+        """.format(value=value, name=name))
+        counters_params.append(name)
+
+    sql = """
+        WITH "candidates" AS (
+                SELECT "{table}"."id" "id",
+                       {columns},
+                       {flags}
+                  FROM "{table}"
+                {joins}
+                 WHERE {any_where}
+              GROUP BY "{table}"."id"
+        )
+        {counters}
+    """.format(table=table,
+               columns=",\n                       ".join('{} "{}"'.format(expression, name)
+                                                        for name, expression in columns.items()),
+               flags=",\n                       ".join(flags_sql),
+               joins=joins,
+               any_where=" OR ".join("({})".format(where) for where, params in wheres.values()),
+               counters="UNION ALL".join(counters_sql))
+
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(sql, flags_params + any_where_params + counters_params)
+        rows = cursor.fetchall()
+
+    result = {name: defaultdict(int) for name in facets}
+    for facet, value, count in rows:
+        result[facet][value] = count
+    return result
+
+
+def get_choices_filters_data(choices, counts):
+    """
+    Return the filter data of a facet of project choices (statuses, types,
+    priorities, severities...) given a queryset of them.
+    """
+    result = []
+    for id, name, color, order in choices.values_list("id", "name", "color", "order"):
+        result.append({
+            "id": id,
+            "name": _(name),
+            "color": color,
+            "order": order,
+            "count": counts[id],
+        })
+    return sorted(result, key=itemgetter("order"))
+
+
+def get_roles_filters_data(project, counts):
+    result = []
+    for id, name, order in project.roles.values_list("id", "name", "order"):
+        result.append({
+            "id": id,
+            "name": _(name),
+            "color": None,
+            "order": order,
+            "count": counts[id],
+        })
+    return sorted(result, key=itemgetter("order"))
+
+
+def get_tags_filters_data(project, counts):
+    result = []
+    for name, color in project.tags_colors or []:
+        result.append({
+            "name": name,
+            "color": color,
+            "count": counts[name],
+        })
+    return sorted(result, key=itemgetter("name"))
+
+
+def _get_user_filters_data(id, full_name, username, count, photo=None, email=None, with_photos=False):
+    data = {
+        "id": id,
+        "full_name": full_name or username or "",
+        "count": count,
+    }
+    if with_photos:
+        data.update({
+            "photo": get_photo_url(photo),
+            "big_photo": get_big_photo_url(photo),
+            "gravatar_id": get_gravatar_id(email) if email else None,
+        })
+    return data
+
+
+def _get_members(project):
+    return (get_user_model().objects.filter(memberships__project_id=project.id)
+                                    .values_list("id", "full_name", "username", "photo", "email"))
+
+
+def get_assigned_filters_data(project, counts, with_photos=False):
+    """
+    Return the filter data of a facet of assigned users: the members of
+    the project and the unassigned elements.
+    """
+    result = []
+    for id, full_name, username, photo, email in _get_members(project):
+        result.append(_get_user_filters_data(id, full_name, username, counts[id],
+                                             photo, email, with_photos))
+
+    result.append(_get_user_filters_data(None, None, None, counts[None], with_photos=with_photos))
+    return sorted(result, key=itemgetter("full_name"))
+
+
+def get_owners_filters_data(project, counts, with_photos=False):
+    """
+    Return the filter data of a facet of owners: the members of the project
+    and the system users owning any element.
+    """
+    result = []
+    members_ids = set()
+    for id, full_name, username, photo, email in _get_members(project):
+        members_ids.add(id)
+        if counts[id] > 0:
+            result.append(_get_user_filters_data(id, full_name, username, counts[id],
+                                                 photo, email, with_photos))
+
+    system_users = get_user_model().objects.filter(is_system=True).exclude(id__in=members_ids)
+    for id, full_name, username in system_users.values_list("id", "full_name", "username"):
+        if counts[id] > 0:
+            result.append(_get_user_filters_data(id, full_name, username, counts[id],
+                                                 with_photos=with_photos))
+    return sorted(result, key=itemgetter("full_name"))
@@ -5,6 +5,8 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import logging
+
 from django.apps import apps
 from django.db.models import Q
 from django.utils.translation import ugettext as _
@@ -17,6 +19,9 @@ from .. import choices
 from ..apps import connect_projects_signals, disconnect_projects_signals
 
 
+logger = logging.getLogger(__name__)
+
+
 ERROR_MAX_PUBLIC_PROJECTS_MEMBERSHIPS = 'max_public_projects_memberships'
 ERROR_MAX_PRIVATE_PROJECTS_MEMBERSHIPS = 'max_private_projects_memberships'
 ERROR_MAX_PUBLIC_PROJECTS = 'max_public_projects'
@@ -278,8 +283,12 @@ def delete_project(project_id):
     except Project.DoesNotExist:
         return
 
-    project.delete_related_content()
+    def log_progress(label, count):
+        logger.info("Deleting project %s: %s %s rows deleted", project_id, count, label)
+
+    deleted = project.delete_related_content(progress=log_progress)
     project.delete()
+    logger.info("Project %s deleted (%s rows)", project_id, sum(deleted.values()))
 
 
 @app.task
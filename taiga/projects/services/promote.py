@@ -14,6 +14,7 @@ from django.utils.translation import ugettext_lazy as _
 from taiga.projects.attachments.models import Attachment
 from taiga.projects.history.models import HistoryEntry
 from taiga.projects.history.services import (get_history_queryset_by_model_instance,
+                                             invalidate_snapshot_state,
                                              make_key_from_model_object)
 from taiga.projects.issues.models import Issue
 from taiga.projects.notifications.models import Watched
@@ -102,6 +103,8 @@ def _import_comments(source_obj, target_obj):
             created_at=entry.created_at
         )
 
+    invalidate_snapshot_state(us_key)
+
     signals.pre_save.receivers = pre_save
     signals.post_save.receivers = post_save
 
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+"""
+Project fans and activity counters.
+
+Every like and every entry in the project timeline increments a daily
+bucket (`ProjectTotalsBucket`) of the project, so no range COUNT over likes
+or the timeline is needed. The `total_*` fields of the project are computed
+from these buckets:
+
+- If PROJECT_TOTALS_REFRESH_INTERVAL is 0 (or celery is disabled) they are
+  refreshed right after every change.
+- Otherwise the project row is not touched on every change; the periodic
+  task `refresh_projects_totals` updates all the
+  changed projects in batch and rolls the week/month/year windows forward.
+
+Windows have day granularity (an event counts in "last week" while its
+day is not older than seven days).
+"""
+
+from datetime import datetime, time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from dateutil.relativedelta import relativedelta
+
+from taiga.celery import app
+from taiga.timeline.service import build_project_namespace
+
+
+ACTIVITY = "activity"
+FANS = "fans"
+
+
+def _get_bucket_date(created_datetime):
+    if created_datetime is None:
+        created_datetime = timezone.now()
+    if timezone.is_aware(created_datetime):
+        created_datetime = timezone.localtime(created_datetime, timezone.utc)
+    return created_datetime.date()
+
+
+def _get_windows_dates(now):
+    return {
+        "week": _get_bucket_date(now - relativedelta(weeks=1)),
+        "month": _get_bucket_date(now - relativedelta(months=1)),
+        "year": _get_bucket_date(now - relativedelta(years=1)),
+    }
+
+
+def is_refresh_deferred():
+    return settings.CELERY_ENABLED and getattr(settings, "PROJECT_TOTALS_REFRESH_INTERVAL", 0) > 0
+
+
+def add_to_project_totals(project_id, counter, created_datetime=None, amount=1):
+    """
+    Add `amount` (that can be negative) to the bucket of `counter` for the
+    day of `created_datetime`.
+    """
+    sql = """
+        INSERT INTO projects_projecttotalsbucket (project_id, counter, date, count, modified_date)
+             VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (project_id, counter, date)
+          DO UPDATE SET count = projects_projecttotalsbucket.count + EXCLUDED.count,
+                        modified_date = EXCLUDED.modified_date
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [project_id, counter, _get_bucket_date(created_datetime), amount, timezone.now()])
+
+    if not is_refresh_deferred():
+        refresh_projects_totals_from_buckets([project_id])
+
+
+def get_project_totals_from_buckets(project_id, now=None):
+    now = now or timezone.now()
+    windows = _get_windows_dates(now)
+
+    sql = """
+        SELECT counter,
+               COALESCE(SUM(count), 0),
+               COALESCE(SUM(count) FILTER (WHERE date >= %(week)s), 0),
+               COALESCE(SUM(count) FILTER (WHERE date >= %(month)s), 0),
+               COALESCE(SUM(count) FILTER (WHERE date >= %(year)s), 0)
+          FROM projects_projecttotalsbucket
+         WHERE project_id = %(project_id)s
+      GROUP BY counter
+    """
+    totals = {}
+    for counter in (FANS, ACTIVITY):
+        totals["total_{}".format(counter)] = 0
+        for window in ("week", "month", "year"):
+            totals["total_{}_last_{}".format(counter, window)] = 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, dict(windows, project_id=project_id))
+        for counter, total, week, month, year in cursor.fetchall():
+            totals["total_{}".format(counter)] = total
+            totals["total_{}_last_week".format(counter)] = week
+            totals["total_{}_last_month".format(counter)] = month
+            totals["total_{}_last_year".format(counter)] = year
+
+    return totals
+
+
+def refresh_projects_totals_from_buckets(project_ids=None, now=None):
+    """
+    Update the totals of the projects from their buckets with a single
+    UPDATE. If `project_ids` is None every project with buckets changed
+    since its last refresh, or whose totals were not refreshed today (so
+    the windows must roll forward), is updated.
+    """
+    now = now or timezone.now()
+    today = _get_bucket_date(now)
+    params = dict(_get_windows_dates(now), now=now,
+                  today_start=timezone.make_aware(datetime.combine(today, time.min), timezone.utc))
+
+    if project_ids is not None:
+        if not project_ids:
+            return 0
+        targets_sql = "SELECT id FROM projects_project WHERE id = ANY(%(project_ids)s)"
+        params["project_ids"] = list(project_ids)
+    else:
+        targets_sql = """
+            SELECT p.id
+              FROM projects_project p
+             WHERE EXISTS (
+                     SELECT 1
+                       FROM projects_projecttotalsbucket b
+                      WHERE b.project_id = p.id
+                        AND (b.modified_date > p.totals_updated_datetime
+                             OR (p.totals_updated_datetime < %(today_start)s AND b.date >= %(year)s - 1))
+                   )
+        """
+
+    sql = """
+        WITH targets AS ({targets_sql}),
+             totals AS (
+                SELECT project_id,
+                       SUM(count) FILTER (WHERE counter = 'fans') AS fans,
+                       SUM(count) FILTER (WHERE counter = 'fans' AND date >= %(week)s) AS fans_week,
+                       SUM(count) FILTER (WHERE counter = 'fans' AND date >= %(month)s) AS fans_month,
+                       SUM(count) FILTER (WHERE counter = 'fans' AND date >= %(year)s) AS fans_year,
+                       SUM(count) FILTER (WHERE counter = 'activity') AS activity,
+                       SUM(count) FILTER (WHERE counter = 'activity' AND date >= %(week)s) AS activity_week,
+                       SUM(count) FILTER (WHERE counter = 'activity' AND date >= %(month)s) AS activity_month,
+                       SUM(count) FILTER (WHERE counter = 'activity' AND date >= %(year)s) AS activity_year
+                  FROM projects_projecttotalsbucket
+                 WHERE project_id IN (SELECT id FROM targets)
+              GROUP BY project_id
+             )
+        UPDATE projects_project
+           SET totals_updated_datetime = %(now)s,
+               total_fans = COALESCE(totals.fans, 0),
+               total_fans_last_week = COALESCE(totals.fans_week, 0),
+               total_fans_last_month = COALESCE(totals.fans_month, 0),
+               total_fans_last_year = COALESCE(totals.fans_year, 0),
+               total_activity = COALESCE(totals.activity, 0),
+               total_activity_last_week = COALESCE(totals.activity_week, 0),
+               total_activity_last_month = COALESCE(totals.activity_month, 0),
+               total_activity_last_year = COALESCE(totals.activity_year, 0)
+          FROM targets
+     LEFT JOIN totals ON totals.project_id = targets.id
+         WHERE projects_project.id = targets.id
+    """.format(targets_sql=targets_sql)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def rebuild_project_totals_buckets(project):
+    """
+    Recreate the buckets of a project counting its likes and its project
+    timeline entries.
+    """
+    content_type = apps.get_model("contenttypes", "ContentType").objects.get_for_model(project.__class__)
+    now = timezone.now()
+
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM projects_projecttotalsbucket WHERE project_id = %s", [project.id])
+        cursor.execute("""
+            INSERT INTO projects_projecttotalsbucket (project_id, counter, date, count, modified_date)
+                 SELECT %(project_id)s, 'fans', (created_date AT TIME ZONE 'UTC')::date, COUNT(*), %(now)s
+                   FROM likes_like
+                  WHERE content_type_id = %(content_type_id)s
+                    AND object_id = %(project_id)s
+               GROUP BY 3
+        """, {"project_id": project.id, "content_type_id": content_type.id, "now": now})
+        cursor.execute("""
+            INSERT INTO projects_projecttotalsbucket (project_id, counter, date, count, modified_date)
+                 SELECT %(project_id)s, 'activity', (created AT TIME ZONE 'UTC')::date, COUNT(*), %(now)s
+                   FROM timeline_timeline
+                  WHERE namespace = %(namespace)s
+               GROUP BY 3
+        """, {"project_id": project.id, "namespace": build_project_namespace(project), "now": now})
+
+
+@app.task
+def refresh_projects_totals():
+    refresh_projects_totals_from_buckets()
@@ -160,6 +160,32 @@ def try_to_close_or_open_user_stories_when_edit_task_status(sender, instance, cr
             services.open_userstory(user_story)
 
 
+## Project configuration document
+
+# Fields of the users included in the members of the project
+USER_CONFIG_FIELDS = {"username", "full_name", "email", "color", "photo", "is_active"}
+
+
+def invalidate_project_config_on_change(sender, instance, **kwargs):
+    from taiga.projects.services import invalidate_project_config
+    invalidate_project_config(instance.project_id)
+
+
+def invalidate_project_config_on_project_delete(sender, instance, **kwargs):
+    from taiga.projects.services import invalidate_project_config
+    invalidate_project_config(instance.id)
+
+
+def invalidate_projects_config_on_user_change(sender, instance, update_fields=None, **kwargs):
+    from taiga.projects.services import invalidate_project_config
+
+    if update_fields is not None and not USER_CONFIG_FIELDS.intersection(update_fields):
+        return
+
+    for project_id in instance.memberships.values_list("project_id", flat=True):
+        invalidate_project_config(project_id)
+
+
 ## Custom signals
 
 issue_status_post_move_on_destroy = Signal(providing_args=["deleted", "moved"])
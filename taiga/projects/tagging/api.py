@@ -8,6 +8,7 @@
 from taiga.base import response
 from taiga.base.decorators import detail_route
 from taiga.base.utils.collections import OrderedSet
+from taiga.permissions.services import user_has_perm
 
 from . import services
 from . import validators
@@ -86,6 +87,15 @@ class TagsColorsResourceMixin:
 
 
 class TaggedResourceMixin:
+    def use_project_tags_counts(self, request, project, permission, ignored_params=()):
+        """
+        The precomputed tags counts of a project can be used in `filters_data`
+        only if the elements are not filtered (more than by project) and the
+        user can see all of them.
+        """
+        params = set(request.QUERY_PARAMS.keys()) - {"project"} - set(ignored_params)
+        return not params and user_has_perm(request.user, permission, project)
+
     def pre_save(self, obj):
         if obj.tags:
             self._pre_save_new_tags_in_project_tags_colors(obj)
@@ -5,6 +5,8 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+from operator import itemgetter
+
 from django.db import connection
 
 
@@ -22,27 +24,29 @@ def create_tag(project, tag, color):
     project.save(update_fields=["tags_colors"])
 
 
-def edit_tag(project, from_tag, to_tag, color):
-    to_tag = to_tag.lower()
-    sql = """
-        UPDATE userstories_userstory
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
+TAGGED_TABLES = ("epics_epic", "userstories_userstory", "tasks_task", "issues_issue")
 
-        UPDATE tasks_task
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
 
-        UPDATE issues_issue
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
+def _replace_tags(project, from_tags, to_tag):
+    # Only the rows with any of the tags are rewritten (using the GIN index on tags)
+    sql = "".join("""
+        UPDATE {table}
+           SET tags = array_distinct(ARRAY(SELECT CASE WHEN tag = ANY(%(from_tags)s::text[])
+                                                       THEN %(to_tag)s
+                                                       ELSE tag
+                                                   END
+                                              FROM unnest(tags) tag))
+         WHERE project_id = %(project_id)s
+           AND tags && %(from_tags)s::text[];
+    """.format(table=table) for table in TAGGED_TABLES)
 
-        UPDATE epics_epic
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
-    """
-    cursor = connection.cursor()
-    cursor.execute(sql, params={"from_tag": from_tag, "to_tag": to_tag, "project_id": project.id})
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params={"from_tags": list(from_tags), "to_tag": to_tag, "project_id": project.id})
+
+
+def edit_tag(project, from_tag, to_tag, color):
+    to_tag = to_tag.lower()
+    _replace_tags(project, [from_tag], to_tag)
 
     tags_colors = dict(project.tags_colors)
     tags_colors.pop(from_tag)
@@ -59,25 +63,7 @@ def rename_tag(project, from_tag, to_tag, **kwargs):
         color = kwargs.get("color")
     else:
         color = dict(project.tags_colors)[from_tag]
-    sql = """
-        UPDATE userstories_userstory
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
-
-        UPDATE tasks_task
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
-
-        UPDATE issues_issue
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
-
-        UPDATE epics_epic
-           SET tags = array_distinct(array_replace(tags, %(from_tag)s, %(to_tag)s))
-         WHERE project_id = %(project_id)s;
-    """
-    cursor = connection.cursor()
-    cursor.execute(sql, params={"from_tag": from_tag, "to_tag": to_tag, "project_id": project.id})
+    _replace_tags(project, [from_tag], to_tag)
 
     tags_colors = dict(project.tags_colors)
     tags_colors.pop(from_tag)
@@ -87,25 +73,15 @@ def rename_tag(project, from_tag, to_tag, **kwargs):
 
 
 def delete_tag(project, tag):
-    sql = """
-        UPDATE userstories_userstory
-           SET tags = array_remove(tags, %(tag)s)
-         WHERE project_id = %(project_id)s;
-
-        UPDATE tasks_task
-           SET tags = array_remove(tags, %(tag)s)
-         WHERE project_id = %(project_id)s;
-
-        UPDATE issues_issue
+    sql = "".join("""
+        UPDATE {table}
            SET tags = array_remove(tags, %(tag)s)
-         WHERE project_id = %(project_id)s;
+         WHERE project_id = %(project_id)s
+           AND tags @> ARRAY[%(tag)s]::text[];
+    """.format(table=table) for table in TAGGED_TABLES)
 
-        UPDATE epics_epic
-           SET tags = array_remove(tags, %(tag)s)
-         WHERE project_id = %(project_id)s;
-    """
-    cursor = connection.cursor()
-    cursor.execute(sql, params={"tag": tag, "project_id": project.id})
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params={"tag": tag, "project_id": project.id})
 
     tags_colors = dict(project.tags_colors)
     del tags_colors[tag]
@@ -114,6 +90,50 @@ def delete_tag(project, tag):
 
 
 def mix_tags(project, from_tags, to_tag):
-    color = dict(project.tags_colors)[to_tag]
+    tags_colors = dict(project.tags_colors)
+    color = tags_colors[to_tag]
+
+    # All the tags are replaced at once, every element is updated only one time
+    _replace_tags(project, from_tags, to_tag)
+
     for from_tag in from_tags:
-        rename_tag(project, from_tag, to_tag, color=color)
+        tags_colors.pop(from_tag)
+        tags_colors[to_tag] = color
+    project.tags_colors = list(tags_colors.items())
+    project.save(update_fields=["tags_colors"])
+
+
+def get_project_tags_counts(project, element):
+    """
+    Return the tags of the project with the number of elements (epics,
+    userstories, tasks or issues) that have them, as the `tags` of the
+    get_*_filters_data services, from the precomputed counts.
+    """
+    sql = """
+          WITH "project_tags" AS (
+                  SELECT reduce_dim("tags_colors") "tag_color"
+                    FROM "projects_project"
+                   WHERE "id" = %(project_id)s)
+
+        SELECT "tag_color"[1] "tag",
+               "tag_color"[2] "color",
+               COALESCE("projects_projecttagscount"."count", 0) "counter"
+          FROM "project_tags"
+     LEFT JOIN "projects_projecttagscount"
+            ON "projects_projecttagscount"."project_id" = %(project_id)s
+           AND "projects_projecttagscount"."element" = %(element)s
+           AND "projects_projecttagscount"."tag" = "project_tags"."tag_color"[1]
+      ORDER BY "tag"
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {"project_id": project.id, "element": element})
+        rows = cursor.fetchall()
+
+    result = []
+    for name, color, count in rows:
+        result.append({
+            "name": name,
+            "color": color,
+            "count": count,
+        })
+    return sorted(result, key=itemgetter("name"))
@@ -5,7 +5,6 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
-from django.http import HttpResponse
 from django.utils.translation import ugettext as _
 
 from taiga.base.api.utils import get_object_or_error
@@ -15,6 +14,7 @@ from taiga.base.decorators import list_route
 from taiga.base.api import ModelCrudViewSet, ModelListViewSet
 from taiga.base.api.mixins import BlockedByProjectMixin
 from taiga.base.utils import json
+from taiga.base.utils.streaming import csv_response
 from taiga.projects.history.mixins import HistoryResourceMixin
 from taiga.projects.milestones.models import Milestone
 from taiga.projects.mixins.by_ref import ByRefMixin
@@ -226,7 +226,9 @@ class TaskViewSet(AssignedToSignalMixin, OCCResourceMixin, VotedResourceMixin,
             "tags": self.filter_queryset(queryset, filter_backends=tags_filter_backends),
             "roles": self.filter_queryset(queryset, filter_backends=roles_filter_backends),
         }
-        return response.Ok(services.get_tasks_filters_data(project, querysets))
+        use_tags_counts = self.use_project_tags_counts(request, project, "view_tasks",
+                                                       ignored_params=("tags", "exclude_tags"))
+        return response.Ok(services.get_tasks_filters_data(project, querysets, use_tags_counts=use_tags_counts))
 
     @list_route(methods=["GET"])
     def csv(self, request):
@@ -237,9 +239,7 @@ class TaskViewSet(AssignedToSignalMixin, OCCResourceMixin, VotedResourceMixin,
         project = get_object_or_error(Project, request.user, tasks_csv_uuid=uuid)
         queryset = project.tasks.all().order_by('ref')
         data = services.tasks_to_csv(project, queryset)
-        csv_response = HttpResponse(data.getvalue(), content_type='application/csv; charset=utf-8')
-        csv_response['Content-Disposition'] = 'attachment; filename="tasks.csv"'
-        return csv_response
+        return csv_response(request, data, "tasks.csv")
 
     @list_route(methods=["POST"])
     def bulk_create(self, request, **kwargs):
@@ -5,21 +5,23 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
-import csv
-import io
 import logging
 
 from collections import OrderedDict
-from operator import itemgetter
-from contextlib import closing
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import connection
-from django.utils.translation import ugettext as _
 
 from taiga.base.utils import db, text
-from taiga.projects.history.services import take_snapshot
+from taiga.base.utils.streaming import iter_csv, iter_queryset_in_chunks
+from taiga.projects.history.services import take_snapshots_in_bulk
 from taiga.projects.services import apply_order_updates
+from taiga.projects.services import get_facets_counts
+from taiga.projects.services import get_assigned_filters_data
+from taiga.projects.services import get_choices_filters_data
+from taiga.projects.services import get_owners_filters_data
+from taiga.projects.services import get_roles_filters_data
+from taiga.projects.services import get_tags_filters_data
+from taiga.projects.tagging import services as tagging_services
 from taiga.projects.tasks.apps import connect_tasks_signals
 from taiga.projects.tasks.apps import disconnect_tasks_signals
 from taiga.events import events
@@ -99,12 +101,8 @@ def update_tasks_order_in_bulk(bulk_data: list, field: str, project: object,
 
 
 def snapshot_tasks_in_bulk(bulk_data, user):
-    for task_data in bulk_data:
-        try:
-            task = models.Task.objects.get(pk=task_data['task_id'])
-            take_snapshot(task, user=user)
-        except models.Task.DoesNotExist:
-            pass
+    ids = [task_data['task_id'] for task_data in bulk_data]
+    take_snapshots_in_bulk(models.Task.objects.filter(pk__in=ids).only("id"), user=user)
 
 
 def update_tasks_milestone_in_bulk(bulk_data: list, milestone: object):
@@ -145,7 +143,6 @@ def update_tasks_milestone_in_bulk(bulk_data: list, milestone: object):
 #####################################################
 
 def tasks_to_csv(project, queryset):
-    csv_data = io.StringIO()
     fieldnames = ["id", "ref", "subject", "description", "user_story", "sprint_id",
                   "sprint", "sprint_estimated_start", "sprint_estimated_finish",
                   "owner", "owner_full_name",
@@ -175,9 +172,11 @@ def tasks_to_csv(project, queryset):
     queryset = attach_total_voters_to_queryset(queryset)
     queryset = attach_watchers_to_queryset(queryset)
 
-    writer = csv.DictWriter(csv_data, fieldnames=fieldnames)
-    writer.writeheader()
-    for task in queryset:
+    return iter_csv(fieldnames, _iter_tasks_csv_rows(queryset, custom_attrs))
+
+
+def _iter_tasks_csv_rows(queryset, custom_attrs):
+    for task in iter_queryset_in_chunks(queryset):
         task_data = {
             "id": task.id,
             "ref": task.ref,
@@ -213,271 +212,60 @@ def tasks_to_csv(project, queryset):
                 continue
             value = task.custom_attributes_values.attributes_values.get(str(custom_attr.id), None)
             task_data[custom_attr.name] = value
-        writer.writerow(task_data)
-
-    return csv_data
+        yield task_data
 
 
 #####################################################
 # Api filter data
 #####################################################
 
-def _get_tasks_statuses(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-      SELECT "projects_taskstatus"."id",
-             "projects_taskstatus"."name",
-             "projects_taskstatus"."color",
-             "projects_taskstatus"."order",
-             (SELECT count(*)
-                FROM "tasks_task"
-                     INNER JOIN "projects_project" ON
-                                ("tasks_task"."project_id" = "projects_project"."id")
-               WHERE {where} AND "tasks_task"."status_id" = "projects_taskstatus"."id")
-        FROM "projects_taskstatus"
-       WHERE "projects_taskstatus"."project_id" = %s
-    ORDER BY "projects_taskstatus"."order";
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, name, color, order, count in rows:
-        result.append({
-            "id": id,
-            "name": _(name),
-            "color": color,
-            "order": order,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("order"))
-
-
-def _get_tasks_assigned_to(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH counters AS (
-                SELECT assigned_to_id,  count(assigned_to_id) count
-                  FROM "tasks_task"
-            INNER JOIN "projects_project" ON ("tasks_task"."project_id" = "projects_project"."id")
-                 WHERE {where} AND "tasks_task"."assigned_to_id" IS NOT NULL
-              GROUP BY assigned_to_id
-        )
-
-                 SELECT "projects_membership"."user_id" user_id,
-                        "users_user"."full_name",
-                        "users_user"."username",
-                        COALESCE("counters".count, 0) count
-                   FROM projects_membership
-        LEFT OUTER JOIN counters ON ("projects_membership"."user_id" = "counters"."assigned_to_id")
-             INNER JOIN "users_user" ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- unassigned tasks
-        UNION
-
-                 SELECT NULL user_id, NULL, NULL, count(coalesce(assigned_to_id, -1)) count
-                   FROM "tasks_task"
-             INNER JOIN "projects_project" ON ("tasks_task"."project_id" = "projects_project"."id")
-                  WHERE {where} AND "tasks_task"."assigned_to_id" IS NULL
-               GROUP BY assigned_to_id
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id] + where_params)
-        rows = cursor.fetchall()
-
-    result = []
-    none_valued_added = False
-    for id, full_name, username, count in rows:
-        result.append({
-            "id": id,
-            "full_name": full_name or username or "",
-            "count": count,
-        })
-
-        if id is None:
-            none_valued_added = True
-
-    # If there was no task with null assigned_to we manually add it
-    if not none_valued_added:
-        result.append({
-            "id": None,
-            "full_name": "",
-            "count": 0,
-        })
-
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_tasks_roles(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-     WITH "task_counters" AS (
-         SELECT DISTINCT "tasks_task"."status_id" "status_id",
-                         "tasks_task"."id" "us_id",
-                         "projects_membership"."role_id" "role_id"
-                    FROM "tasks_task"
-              INNER JOIN "projects_project"
-                      ON ("tasks_task"."project_id" = "projects_project"."id")
-         LEFT OUTER JOIN "projects_membership"
-                      ON "projects_membership"."user_id" = "tasks_task"."assigned_to_id"
-                   WHERE {where}
-            ),
-             "counters" AS (
-                  SELECT "role_id" as "role_id",
-                         COUNT("role_id") "count"
-                    FROM "task_counters"
-                GROUP BY "role_id"
-            )
-
-                 SELECT "users_role"."id",
-                        "users_role"."name",
-                        "users_role"."order",
-                        COALESCE("counters"."count", 0)
-                   FROM "users_role"
-        LEFT OUTER JOIN "counters"
-                     ON "counters"."role_id" = "users_role"."id"
-                  WHERE "users_role"."project_id" = %s
-               ORDER BY "users_role"."order";
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, name, order, count in rows:
-        result.append({
-            "id": id,
-            "name": _(name),
-            "color": None,
-            "order": order,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("order"))
-
-
-def _get_tasks_owners(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH counters AS (
-                SELECT "tasks_task"."owner_id" owner_id,
-                       count(coalesce("tasks_task"."owner_id", -1)) count
-                  FROM "tasks_task"
-            INNER JOIN "projects_project" ON ("tasks_task"."project_id" = "projects_project"."id")
-                 WHERE {where}
-              GROUP BY "tasks_task"."owner_id"
-        )
-
-                 SELECT "projects_membership"."user_id" id,
-                        "users_user"."full_name",
-                        "users_user"."username",
-                        COALESCE("counters".count, 0) count
-                   FROM projects_membership
-        LEFT OUTER JOIN counters ON ("projects_membership"."user_id" = "counters"."owner_id")
-             INNER JOIN "users_user" ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- System users
-        UNION
-
-                 SELECT "users_user"."id" user_id,
-                        "users_user"."full_name" full_name,
-                        "users_user"."username" username,
-                        COALESCE("counters".count, 0) count
-                   FROM users_user
-        LEFT OUTER JOIN counters ON ("users_user"."id" = "counters"."owner_id")
-                  WHERE ("users_user"."is_system" IS TRUE)
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, full_name, username, count in rows:
-        if count > 0:
-            result.append({
-                "id": id,
-                "full_name": full_name or username or "",
-                "count": count,
-            })
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_tasks_tags(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-        WITH tasks_tags AS (
-                    SELECT tag,
-                           COUNT(tag) counter FROM (
-                                SELECT UNNEST(tasks_task.tags) tag
-                                  FROM tasks_task
-                            INNER JOIN projects_project
-                                        ON (tasks_task.project_id = projects_project.id)
-                                 WHERE {where}) tags
-                  GROUP BY tag),
-             project_tags AS (
-                    SELECT reduce_dim(tags_colors) tag_color
-                      FROM projects_project
-                     WHERE id=%s)
-
-      SELECT tag_color[1] tag,
-             tag_color[2] color,
-             COALESCE(tasks_tags.counter, 0) counter
-        FROM project_tags
-   LEFT JOIN tasks_tags ON project_tags.tag_color[1] = tasks_tags.tag
-    ORDER BY tag
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for name, color, count in rows:
-        result.append({
-            "name": name,
-            "color": color,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("name"))
-
-
-def get_tasks_filters_data(project, querysets):
+TASKS_FILTERS_JOINS = """
+    INNER JOIN "projects_project"
+            ON ("tasks_task"."project_id" = "projects_project"."id")
+"""
+
+TASKS_FILTERS_COLUMNS = {
+    "status_id": '"tasks_task"."status_id"',
+    "assigned_to_id": '"tasks_task"."assigned_to_id"',
+    "owner_id": '"tasks_task"."owner_id"',
+    "tags": '"tasks_task"."tags"',
+}
+
+TASKS_FILTERS_FACETS = {
+    "statuses": '"status_id"',
+    "assigned_to": '"assigned_to_id"',
+    "owners": '"owner_id"',
+    "tags": 'UNNEST("tags")',
+    # The roles of the assigned to user
+    "roles": """UNNEST(ARRAY(SELECT "projects_membership"."role_id"
+                               FROM "projects_membership"
+                              WHERE "projects_membership"."user_id" = "assigned_to_id"))""",
+}
+
+
+def get_tasks_filters_data(project, querysets, use_tags_counts=False):
     """
     Given a project and an tasks queryset, return a simple data structure
     of all possible filters for the tasks in the queryset.
     """
+    facets = dict(TASKS_FILTERS_FACETS)
+    if use_tags_counts:
+        del facets["tags"]
+
+    counts = get_facets_counts({name: querysets[name] for name in facets},
+                               TASKS_FILTERS_JOINS, TASKS_FILTERS_COLUMNS, facets)
+
+    if use_tags_counts:
+        tags = tagging_services.get_project_tags_counts(project, "tasks")
+    else:
+        tags = get_tags_filters_data(project, counts["tags"])
+
     data = OrderedDict([
-        ("statuses", _get_tasks_statuses(project, querysets["statuses"])),
-        ("assigned_to", _get_tasks_assigned_to(project, querysets["assigned_to"])),
-        ("owners", _get_tasks_owners(project, querysets["owners"])),
-        ("tags", _get_tasks_tags(project, querysets["tags"])),
-        ("roles", _get_tasks_roles(project, querysets["roles"])),
+        ("statuses", get_choices_filters_data(project.task_statuses.all(), counts["statuses"])),
+        ("assigned_to", get_assigned_filters_data(project, counts["assigned_to"])),
+        ("owners", get_owners_filters_data(project, counts["owners"])),
+        ("tags", tags),
+        ("roles", get_roles_filters_data(project, counts["roles"])),
     ])
 
     return data
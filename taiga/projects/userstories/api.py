@@ -10,7 +10,6 @@ from django.db import transaction
 from django.db.models import Max
 
 from django.utils.translation import ugettext as _
-from django.http import HttpResponse
 
 from taiga.base import filters as base_filters
 from taiga.base import exceptions as exc
@@ -23,6 +22,7 @@ from taiga.base.api import ModelListViewSet
 from taiga.base.api.utils import get_object_or_error
 from taiga.base.utils import json
 from taiga.base.utils.db import get_object_or_none
+from taiga.base.utils.streaming import csv_response
 
 from taiga.projects.history.mixins import HistoryResourceMixin
 from taiga.projects.history.services import take_snapshot
@@ -366,7 +366,9 @@ class UserStoryViewSet(AssignedUsersSignalMixin, OCCResourceMixin,
             "roles": self.filter_queryset(queryset, filter_backends=roles_filter_backends)
         }
 
-        return response.Ok(services.get_userstories_filters_data(project, querysets))
+        use_tags_counts = self.use_project_tags_counts(request, project, "view_us",
+                                                       ignored_params=("tags", "exclude_tags"))
+        return response.Ok(services.get_userstories_filters_data(project, querysets, use_tags_counts=use_tags_counts))
 
     @list_route(methods=["GET"])
     def csv(self, request):
@@ -377,9 +379,7 @@ class UserStoryViewSet(AssignedUsersSignalMixin, OCCResourceMixin,
         project = get_object_or_error(Project, request.user, userstories_csv_uuid=uuid)
         queryset = project.user_stories.all().order_by('ref')
         data = services.userstories_to_csv(project, queryset)
-        csv_response = HttpResponse(data.getvalue(), content_type='application/csv; charset=utf-8')
-        csv_response['Content-Disposition'] = 'attachment; filename="userstories.csv"'
-        return csv_response
+        return csv_response(request, data, "userstories.csv")
 
     @list_route(methods=["POST"])
     def bulk_create(self, request, **kwargs):
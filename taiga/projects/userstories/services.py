@@ -7,35 +7,36 @@
 
 from typing import List, Optional
 
-import csv
-import io
 from collections import OrderedDict
-from operator import itemgetter
-from contextlib import closing
 
 from django.conf import settings
 from django.db import connection
 from django.db.models import Q
 from django.utils import timezone
-from django.utils.translation import ugettext as _
 
 from psycopg2.extras import execute_values
 
 from taiga.base.utils import db, text
+from taiga.base.utils.streaming import iter_csv, iter_queryset_in_chunks
 from taiga.celery import app
 from taiga.events import events
-from taiga.projects.history.services import take_snapshot
+from taiga.projects.history.services import take_snapshot, take_snapshots_in_bulk
 from taiga.projects.models import Project, UserStoryStatus, Swimlane
 from taiga.projects.milestones.models import Milestone
 from taiga.projects.notifications.utils import attach_watchers_to_queryset
 from taiga.projects.services import apply_order_updates
+from taiga.projects.services import get_facets_counts
+from taiga.projects.services import get_assigned_filters_data
+from taiga.projects.services import get_choices_filters_data
+from taiga.projects.services import get_owners_filters_data
+from taiga.projects.services import get_roles_filters_data
+from taiga.projects.services import get_tags_filters_data
+from taiga.projects.tagging import services as tagging_services
 from taiga.projects.tasks.models import Task
 from taiga.projects.userstories.apps import connect_userstories_signals
 from taiga.projects.userstories.apps import disconnect_userstories_signals
 from taiga.projects.votes.utils import attach_total_voters_to_queryset
 from taiga.users.models import User
-from taiga.users.gravatar import get_gravatar_id
-from taiga.users.services import get_big_photo_url, get_photo_url
 
 from . import models
 
@@ -137,6 +138,115 @@ def reset_userstories_kanban_order_in_bulk(project: Project,
                               projectid=project.id)
 
 
+def _calculate_userstories_dense_orders(user_stories, order_param, bulk_userstories,
+                                        before_userstory=None, after_userstory=None):
+    # if before_userstory, get it and all elements before too:
+    if before_userstory:
+        user_stories = (user_stories.filter(**{f"{order_param}__gte": getattr(before_userstory, order_param)}))
+    # if after_userstory, exclude it and get only elements after it:
+    elif after_userstory:
+        user_stories = (user_stories.exclude(id=after_userstory.id)
+                                    .filter(**{f"{order_param}__gte": getattr(after_userstory, order_param)}))
+
+    # sort and get only ids
+    user_story_ids = (user_stories.order_by(order_param, "id")
+                                  .values_list('id', flat=True))
+
+    # append moved user stories
+    user_story_ids = bulk_userstories + list(user_story_ids)
+
+    # calculate the start order
+    if before_userstory:
+        # order start with the before_userstory order
+        start_order = getattr(before_userstory, order_param)
+    elif after_userstory:
+        # order start after the after_userstory order
+        start_order = getattr(after_userstory, order_param) + 1
+    else:
+        # move at the beggining of the column if there is no after and before
+        start_order = 1
+
+    # prepare rest of data
+    total_user_stories = len(user_story_ids)
+    user_story_orders = range(start_order, start_order + total_user_stories)
+
+    return tuple(zip(user_story_ids, user_story_orders))
+
+
+def _calculate_userstories_sparse_orders(user_stories, order_param, bulk_userstories, gap,
+                                         before_userstory=None, after_userstory=None):
+    user_stories = user_stories.order_by(order_param, "id")
+    total_moved = len(bulk_userstories)
+
+    # find the orders of the neighbours of the gap where the user stories are moved
+    if before_userstory:
+        upper = getattr(before_userstory, order_param)
+        lower = (user_stories.exclude(id=before_userstory.id)
+                             .filter(Q(**{f"{order_param}__lt": upper}) |
+                                     Q(**{order_param: upper, "id__lt": before_userstory.id}))
+                             .order_by(f"-{order_param}", "-id")
+                             .values_list(order_param, flat=True)
+                             .first())
+    elif after_userstory:
+        lower = getattr(after_userstory, order_param)
+        upper = (user_stories.exclude(id=after_userstory.id)
+                             .filter(Q(**{f"{order_param}__gt": lower}) |
+                                     Q(**{order_param: lower, "id__gt": after_userstory.id}))
+                             .values_list(order_param, flat=True)
+                             .first())
+    else:
+        lower = None
+        upper = user_stories.values_list(order_param, flat=True).first()
+
+    if lower is None and upper is None:
+        orders = [gap * (i + 1) for i in range(total_moved)]
+    elif upper is None:
+        orders = [lower + gap * (i + 1) for i in range(total_moved)]
+    elif lower is None:
+        orders = [upper - gap * (total_moved - i) for i in range(total_moved)]
+    elif upper - lower > total_moved:
+        step = min(gap, (upper - lower) // (total_moved + 1))
+        orders = [lower + step * (i + 1) for i in range(total_moved)]
+    else:
+        # There is no room left between the neighbours, rebalance the whole column
+        user_story_ids = list(user_stories.values_list("id", flat=True))
+        if before_userstory:
+            position = user_story_ids.index(before_userstory.id)
+        elif after_userstory:
+            position = user_story_ids.index(after_userstory.id) + 1
+        else:
+            position = 0
+
+        user_story_ids[position:position] = bulk_userstories
+        return tuple((id, gap * (i + 1)) for i, id in enumerate(user_story_ids))
+
+    return tuple(zip(bulk_userstories, orders))
+
+
+def _calculate_userstories_orders(user_stories, order_param, bulk_userstories,
+                                  before_userstory=None, after_userstory=None):
+    """
+    Return a tuple of (id, new order) with the orders that must be updated
+    to move `bulk_userstories` to the beginning of `user_stories` (the other
+    user stories of the column/backlog/sprint) or before or after one of them.
+
+    With settings.USERSTORIES_ORDER_GAP = 0 orders are consecutive so all
+    the user stories after the moved ones are renumbered. Otherwise orders
+    are sparse, the moved user stories take orders between their new
+    neighbours and only when there is no room left the whole column is
+    renumbered leaving USERSTORIES_ORDER_GAP between consecutive orders.
+    """
+    gap = getattr(settings, "USERSTORIES_ORDER_GAP", 0)
+    if gap > 0:
+        return _calculate_userstories_sparse_orders(user_stories, order_param, bulk_userstories, gap,
+                                                    before_userstory=before_userstory,
+                                                    after_userstory=after_userstory)
+
+    return _calculate_userstories_dense_orders(user_stories, order_param, bulk_userstories,
+                                               before_userstory=before_userstory,
+                                               after_userstory=after_userstory)
+
+
 def update_userstories_backlog_or_sprint_order_in_bulk(user: User,
                                                        project: Project,
                                                        bulk_userstories: List[int],
@@ -171,38 +281,10 @@ def update_userstories_backlog_or_sprint_order_in_bulk(user: User,
     # exclude moved user stories
     user_stories = user_stories.exclude(id__in=bulk_userstories)
 
-    # if before_userstory, get it and all elements before too:
-    if before_userstory:
-        user_stories = (user_stories.filter(**{f"{order_param}__gte": getattr(before_userstory, order_param)}))
-    # if after_userstory, exclude it and get only elements after it:
-    elif after_userstory:
-        user_stories = (user_stories.exclude(id=after_userstory.id)
-                                    .filter(**{f"{order_param}__gte": getattr(after_userstory, order_param)}))
-
-    # sort and get only ids
-    user_story_ids = (user_stories.order_by(order_param, "id")
-                                  .values_list('id', flat=True))
-
-    # append moved user stories
-    user_story_ids = bulk_userstories + list(user_story_ids)
-
-    # calculate the start order
-    if before_userstory:
-        # order start with the before_userstory order
-        start_order = getattr(before_userstory, order_param)
-    elif after_userstory:
-        # order start after the after_userstory order
-        start_order = getattr(after_userstory, order_param) + 1
-    else:
-        # move at the beggining of the column if there is no after and before
-        start_order = 1
-
-    # prepare rest of data
-    total_user_stories = len(user_story_ids)
-    user_story_orders = range(start_order, start_order + total_user_stories)
-
-    data = tuple(zip(user_story_ids,
-                     user_story_orders))
+    data = _calculate_userstories_orders(user_stories, order_param, bulk_userstories,
+                                         before_userstory=before_userstory,
+                                         after_userstory=after_userstory)
+    user_story_ids = [id for (id, order) in data]
 
     # execute query for update milestone and backlog or sprint order
     sql = f"""
@@ -289,38 +371,10 @@ def update_userstories_kanban_order_in_bulk(user: User,
     # exclude moved user stories
     user_stories = user_stories.exclude(id__in=bulk_userstories)
 
-    # if before_userstory, get it and all elements before too:
-    if before_userstory:
-        user_stories = (user_stories.filter(kanban_order__gte=before_userstory.kanban_order))
-    # if after_userstory, exclude it and get only elements after it:
-    elif after_userstory:
-        user_stories = (user_stories.exclude(id=after_userstory.id)
-                                    .filter(kanban_order__gte=after_userstory.kanban_order))
-
-    # sort and get only ids
-    user_story_ids = (user_stories.order_by("kanban_order", "id")
-                                  .values_list('id', flat=True))
-
-    # append moved user stories
-    user_story_ids = bulk_userstories + list(user_story_ids)
-
-    # calculate the start order
-    if before_userstory:
-        # order start with the before_userstory order
-        start_order = before_userstory.kanban_order
-    elif after_userstory:
-        # order start after the after_userstory order
-        start_order = after_userstory.kanban_order + 1
-    else:
-        # move at the beggining of the column if there is no after and before
-        start_order = 1
-
-    # prepare rest of data
-    total_user_stories = len(user_story_ids)
-    user_story_kanban_orders = range(start_order, start_order + total_user_stories)
-
-    data = tuple(zip(user_story_ids,
-                     user_story_kanban_orders))
+    data = _calculate_userstories_orders(user_stories, "kanban_order", bulk_userstories,
+                                         before_userstory=before_userstory,
+                                         after_userstory=after_userstory)
+    user_story_ids = [id for (id, order) in data]
 
     # execute query for update kanban_order
     sql = """
@@ -408,12 +462,8 @@ def update_userstories_milestone_in_bulk(bulk_data: list, milestone: object):
 
 
 def snapshot_userstories_in_bulk(bulk_data, user):
-    for us_data in bulk_data:
-        try:
-            us = models.UserStory.objects.get(pk=us_data['us_id'])
-            take_snapshot(us, user=user)
-        except models.UserStory.DoesNotExist:
-            pass
+    ids = [us_data['us_id'] for us_data in bulk_data]
+    take_snapshots_in_bulk(models.UserStory.objects.filter(pk__in=ids).only("id"), user=user)
 
 
 #####################################################
@@ -492,7 +542,6 @@ def _recalculate_is_closed_for_milestone(milestone):
 #####################################################
 
 def userstories_to_csv(project, queryset):
-    csv_data = io.StringIO()
     fieldnames = ["id", "ref", "subject", "description", "sprint_id", "sprint",
                   "sprint_estimated_start", "sprint_estimated_finish", "owner",
                   "owner_full_name", "assigned_to", "assigned_to_full_name",
@@ -521,10 +570,12 @@ def userstories_to_csv(project, queryset):
                                          "role_points__role",
                                          "tasks",
                                          "attachments",
+                                         "assigned_users",
                                          "custom_attributes_values")
     queryset = queryset.select_related("milestone",
                                        "project",
                                        "status",
+                                       "swimlane",
                                        "owner",
                                        "assigned_to",
                                        "generated_from_issue",
@@ -533,9 +584,11 @@ def userstories_to_csv(project, queryset):
     queryset = attach_total_voters_to_queryset(queryset)
     queryset = attach_watchers_to_queryset(queryset)
 
-    writer = csv.DictWriter(csv_data, fieldnames=fieldnames)
-    writer.writeheader()
-    for us in queryset:
+    return iter_csv(fieldnames, _iter_userstories_csv_rows(queryset, roles, custom_attrs))
+
+
+def _iter_userstories_csv_rows(queryset, roles, custom_attrs):
+    for us in iter_queryset_in_chunks(queryset):
         row = {
             "id": us.id,
             "ref": us.ref,
@@ -599,449 +652,74 @@ def userstories_to_csv(project, queryset):
                 str(custom_attr.id), None)
             row[custom_attr.name] = value
 
-        writer.writerow(row)
-
-    return csv_data
+        yield row
 
 
 #####################################################
 # Api filter data
 #####################################################
 
-def _get_userstories_statuses(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-     WITH "us_counters" AS (
-         SELECT DISTINCT "userstories_userstory"."status_id" "status_id",
-                         "userstories_userstory"."id" "us_id"
-                    FROM "userstories_userstory"
-              INNER JOIN "projects_project"
-                      ON ("userstories_userstory"."project_id" = "projects_project"."id")
-         LEFT OUTER JOIN "epics_relateduserstory"
-                      ON "userstories_userstory"."id" = "epics_relateduserstory"."user_story_id"
-         LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                      ON "userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id"
-                   WHERE {where}
-            ),
-             "counters" AS (
-                  SELECT "status_id",
-                         COUNT("status_id") "count"
-                    FROM "us_counters"
-                GROUP BY "status_id"
-            )
-
-                 SELECT "projects_userstorystatus"."id",
-                        "projects_userstorystatus"."name",
-                        "projects_userstorystatus"."color",
-                        "projects_userstorystatus"."order",
-                        COALESCE("counters"."count", 0)
-                   FROM "projects_userstorystatus"
-        LEFT OUTER JOIN "counters"
-                     ON "counters"."status_id" = "projects_userstorystatus"."id"
-                  WHERE "projects_userstorystatus"."project_id" = %s
-               ORDER BY "projects_userstorystatus"."order";
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
+USERSTORIES_FILTERS_JOINS = """
+         INNER JOIN "projects_project"
+                 ON ("userstories_userstory"."project_id" = "projects_project"."id")
+         INNER JOIN "projects_userstorystatus"
+                 ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
+    LEFT OUTER JOIN "epics_relateduserstory"
+                 ON ("userstories_userstory"."id" = "epics_relateduserstory"."user_story_id")
+    LEFT OUTER JOIN "userstories_userstory_assigned_users"
+                 ON ("userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id")
+"""
+
+USERSTORIES_FILTERS_COLUMNS = {
+    "status_id": '"userstories_userstory"."status_id"',
+    "assigned_to_id": '"userstories_userstory"."assigned_to_id"',
+    "owner_id": '"userstories_userstory"."owner_id"',
+    "tags": '"userstories_userstory"."tags"',
+    "epics_ids": 'array_remove(array_agg(DISTINCT "epics_relateduserstory"."epic_id"), NULL)',
+    "assigned_users_ids": 'array_remove(array_agg(DISTINCT "userstories_userstory_assigned_users"."user_id"), NULL)',
+}
+
+USERSTORIES_FILTERS_FACETS = {
+    "statuses": '"status_id"',
+    "assigned_to": '"assigned_to_id"',
+    # The assigned users or, if there are none, the assigned to user
+    "assigned_users": """UNNEST(CASE WHEN cardinality("assigned_users_ids") > 0
+                                     THEN "assigned_users_ids"
+                                     ELSE ARRAY["assigned_to_id"]
+                                 END)""",
+    "owners": '"owner_id"',
+    "tags": 'UNNEST("tags")',
+    # The epics or NULL for the user stories without epics
+    "epics": """UNNEST(CASE WHEN cardinality("epics_ids") > 0
+                            THEN "epics_ids"
+                            ELSE ARRAY[NULL]::integer[]
+                        END)""",
+    # The roles of the assigned to user and the assigned users
+    "roles": """UNNEST(ARRAY(SELECT "projects_membership"."role_id"
+                               FROM "projects_membership"
+                              WHERE "projects_membership"."user_id" =
+                                    ANY("assigned_users_ids" || "assigned_to_id")))""",
+}
+
+
+def _get_userstories_epics(project, counts):
     result = []
-    for id, name, color, order, count in rows:
-        result.append({
-            "id": id,
-            "name": _(name),
-            "color": color,
-            "order": order,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("order"))
-
-
-def _get_userstories_assigned_to(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-     WITH "us_counters" AS (
-         SELECT DISTINCT "userstories_userstory"."assigned_to_id" "assigned_to_id",
-                         "userstories_userstory"."id" "us_id"
-                    FROM "userstories_userstory"
-              INNER JOIN "projects_project"
-                      ON ("userstories_userstory"."project_id" = "projects_project"."id")
-                INNER JOIN "projects_userstorystatus"
-                    ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-         LEFT OUTER JOIN "epics_relateduserstory"
-                      ON "userstories_userstory"."id" = "epics_relateduserstory"."user_story_id"
-         LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                      ON "userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id"
-                   WHERE {where}
-            ),
-
-            "counters" AS (
-                 SELECT "assigned_to_id",
-                        COUNT("assigned_to_id")
-                   FROM "us_counters"
-               GROUP BY "assigned_to_id"
-            )
-
-                 SELECT "projects_membership"."user_id" "user_id",
-                        "users_user"."full_name" "full_name",
-                        "users_user"."username" "username",
-                        COALESCE("counters".count, 0) "count"
-                   FROM "projects_membership"
-        LEFT OUTER JOIN "counters"
-                     ON ("projects_membership"."user_id" = "counters"."assigned_to_id")
-             INNER JOIN "users_user"
-                     ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- unassigned userstories
-        UNION
-
-                 SELECT NULL "user_id",
-                        NULL "full_name",
-                        NULL "username",
-                        count(coalesce("assigned_to_id", -1)) "count"
-                   FROM "userstories_userstory"
-             INNER JOIN "projects_project"
-                     ON ("userstories_userstory"."project_id" = "projects_project"."id")
-             INNER JOIN "projects_userstorystatus"
-                    ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-        LEFT OUTER JOIN "epics_relateduserstory"
-                     ON ("userstories_userstory"."id" = "epics_relateduserstory"."user_story_id")
-        LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                      ON "userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id"
-                  WHERE {where} AND "userstories_userstory"."assigned_to_id" IS NULL
-               GROUP BY "assigned_to_id"
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id] + where_params)
-        rows = cursor.fetchall()
-
-    result = []
-    none_valued_added = False
-    for id, full_name, username, count in rows:
-        result.append({
-            "id": id,
-            "full_name": full_name or username or "",
-            "count": count,
-        })
-
-        if id is None:
-            none_valued_added = True
-
-    # If there was no userstory with null assigned_to we manually add it
-    if not none_valued_added:
+    if counts[None] > 0:
         result.append({
             "id": None,
-            "full_name": "",
-            "count": 0,
-        })
-
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_userstories_assigned_users(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-     WITH "us_counters" AS (
-         SELECT DISTINCT COALESCE("userstories_userstory_assigned_users"."user_id",
-            "userstories_userstory"."assigned_to_id") as "assigned_user_id",
-                "userstories_userstory"."id" "us_id"
-                    FROM "userstories_userstory"
-              LEFT JOIN "userstories_userstory_assigned_users"
-                      ON "userstories_userstory_assigned_users"."userstory_id" = "userstories_userstory"."id"
-              INNER JOIN "projects_project"
-                      ON ("userstories_userstory"."project_id" = "projects_project"."id")
-                INNER JOIN "projects_userstorystatus"
-                    ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-              LEFT OUTER JOIN "epics_relateduserstory"
-                      ON "userstories_userstory"."id" = "epics_relateduserstory"."user_story_id"
-                   WHERE {where}
-            ),
-
-            "counters" AS (
-                 SELECT "assigned_user_id",
-                        COUNT("assigned_user_id")
-                   FROM "us_counters"
-               GROUP BY "assigned_user_id"
-            )
-
-                 SELECT "projects_membership"."user_id" "user_id",
-                        "users_user"."full_name" "full_name",
-                        "users_user"."username" "username",
-                        COALESCE("counters".count, 0) "count",
-                        "users_user"."photo" "photo",
-                        "users_user"."email" "email"
-                   FROM "projects_membership"
-        LEFT OUTER JOIN "counters"
-                     ON ("projects_membership"."user_id" = "counters"."assigned_user_id")
-             INNER JOIN "users_user"
-                     ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- unassigned userstories
-        UNION
-
-                 SELECT NULL "user_id",
-                        NULL "full_name",
-                        NULL "username",
-                        count(coalesce("assigned_to_id", -1)) "count",
-                        NULL "photo",
-                        NULL "email"
-                   FROM "userstories_userstory"
-             INNER JOIN "projects_project"
-                     ON ("userstories_userstory"."project_id" = "projects_project"."id")
-            INNER JOIN "projects_userstorystatus"
-                ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-        LEFT OUTER JOIN "epics_relateduserstory"
-                     ON ("userstories_userstory"."id" = "epics_relateduserstory"."user_story_id")
-                  WHERE {where} AND "userstories_userstory"."id" NOT IN (
-                    SELECT "userstories_userstory_assigned_users"."userstory_id" FROM
-                      "userstories_userstory_assigned_users"
-                  ) AND "userstories_userstory"."assigned_to_id" IS NULL
-               GROUP BY "username";
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id] + where_params)
-        rows = cursor.fetchall()
-
-    result = []
-    none_valued_added = False
-    for id, full_name, username, count, photo, email in rows:
-        result.append({
-            "id": id,
-            "full_name": full_name or username or "",
-            "count": count,
-            "photo": get_photo_url(photo),
-            "big_photo": get_big_photo_url(photo),
-            "gravatar_id": get_gravatar_id(email) if email else None
-        })
-
-        if id is None:
-            none_valued_added = True
-
-    # If there was no userstory with null assigned_to we manually add it
-    if not none_valued_added:
-        result.append({
-            "id": None,
-            "full_name": "",
-            "count": 0,
-            "photo": None,
-            "big_photo": None,
-            "gravatar_id": None
-        })
-
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_userstories_owners(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-     WITH "us_counters" AS(
-         SELECT DISTINCT "userstories_userstory"."owner_id" "owner_id",
-                         "userstories_userstory"."id" "us_id"
-                    FROM "userstories_userstory"
-              INNER JOIN "projects_project"
-                      ON ("userstories_userstory"."project_id" = "projects_project"."id")
-                INNER JOIN "projects_userstorystatus"
-                    ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-         LEFT OUTER JOIN "epics_relateduserstory"
-                      ON ("userstories_userstory"."id" = "epics_relateduserstory"."user_story_id")
-         LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                      ON "userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id"
-                   WHERE {where}
-            ),
-
-            "counters" AS (
-                 SELECT "owner_id",
-                        COUNT("owner_id")
-                   FROM "us_counters"
-               GROUP BY "owner_id"
-            )
-
-                 SELECT "projects_membership"."user_id" "user_id",
-                        "users_user"."full_name",
-                        "users_user"."username",
-                        COALESCE("counters".count, 0) "count",
-                        "users_user"."photo" "photo",
-                        "users_user"."email" "email"
-                   FROM "projects_membership"
-        LEFT OUTER JOIN "counters"
-                     ON ("projects_membership"."user_id" = "counters"."owner_id")
-             INNER JOIN "users_user"
-                     ON ("projects_membership"."user_id" = "users_user"."id")
-                  WHERE "projects_membership"."project_id" = %s AND "projects_membership"."user_id" IS NOT NULL
-
-        -- System users
-                  UNION
-
-                 SELECT "users_user"."id" "user_id",
-                        "users_user"."full_name" "full_name",
-                        "users_user"."username" "username",
-                        COALESCE("counters"."count", 0) "count",
-                        NULL "photo",
-                        NULL "email"
-                   FROM "users_user"
-        LEFT OUTER JOIN "counters"
-                     ON ("users_user"."id" = "counters"."owner_id")
-                  WHERE ("users_user"."is_system" IS TRUE)
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, full_name, username, count, photo, email in rows:
-        if count > 0:
-            result.append({
-                "id": id,
-                "full_name": full_name or username or "",
-                "count": count,
-                "photo": get_photo_url(photo),
-                "big_photo": get_big_photo_url(photo),
-                "gravatar_id": get_gravatar_id(email) if email else None
-            })
-    return sorted(result, key=itemgetter("full_name"))
-
-
-def _get_userstories_tags(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-           WITH "userstories_tags" AS (
-                   SELECT "tag",
-                          COUNT("tag") "counter"
-                     FROM (
-                      SELECT DISTINCT "userstories_userstory"."id" "us_id",
-                                       UNNEST("userstories_userstory"."tags") "tag"
-                                 FROM "userstories_userstory"
-                        INNER JOIN "projects_project"
-                            ON ("userstories_userstory"."project_id" = "projects_project"."id")
-                        INNER JOIN "projects_userstorystatus"
-                            ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-                        LEFT OUTER JOIN "epics_relateduserstory"
-                            ON ("userstories_userstory"."id" = "epics_relateduserstory"."user_story_id")
-                        LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                            ON "userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id"
-                                WHERE {where}
-                          ) "tags"
-                    GROUP BY "tag"),
-
-                "project_tags" AS (
-                       SELECT reduce_dim("tags_colors") "tag_color"
-                         FROM "projects_project"
-                        WHERE "id"=%s)
-
-         SELECT "tag_color"[1] "tag",
-                "tag_color"[2] "color",
-                COALESCE("userstories_tags"."counter", 0) "counter"
-           FROM "project_tags"
-LEFT OUTER JOIN "userstories_tags"
-             ON "project_tags"."tag_color"[1] = "userstories_tags"."tag"
-       ORDER BY "tag"
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for name, color, count in rows:
-        result.append({
-            "name": name,
-            "color": color,
-            "count": count,
+            "ref": None,
+            "subject": None,
+            "order": 0,
+            "count": counts[None],
         })
-    return sorted(result, key=itemgetter("name"))
-
-
-def _get_userstories_epics(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-    extra_sql = """
-       WITH "counters" AS (
-               SELECT "epics_relateduserstory"."epic_id" AS "epic_id",
-                      count("epics_relateduserstory"."id") AS "counter"
-                 FROM "epics_relateduserstory"
-           INNER JOIN "userstories_userstory"
-                   ON ("userstories_userstory"."id" = "epics_relateduserstory"."user_story_id")
-           INNER JOIN "projects_project"
-                   ON ("userstories_userstory"."project_id" = "projects_project"."id")
-            INNER JOIN "projects_userstorystatus"
-                    ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-            LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                ON "userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id"
-                WHERE {where}
-             GROUP BY "epics_relateduserstory"."epic_id"
-       )
-
-         -- User stories with no epics (return results only if there are userstories)
-               SELECT NULL AS "id",
-                      NULL AS "ref",
-                      NULL AS "subject",
-                      0 AS "order",
-                      count(COALESCE("epics_relateduserstory"."epic_id", -1)) AS "counter"
-                 FROM "userstories_userstory"
-      LEFT OUTER JOIN "epics_relateduserstory"
-                   ON ("epics_relateduserstory"."user_story_id" = "userstories_userstory"."id")
-           INNER JOIN "projects_project"
-                   ON ("userstories_userstory"."project_id" = "projects_project"."id")
-            INNER JOIN "projects_userstorystatus"
-                ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-         LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                      ON "userstories_userstory"."id" = "userstories_userstory_assigned_users"."userstory_id"
-                WHERE {where} AND "epics_relateduserstory"."epic_id" IS NULL
-             GROUP BY "epics_relateduserstory"."epic_id"
-
-                UNION
-
-               SELECT "epics_epic"."id" AS "id",
-                      "epics_epic"."ref" AS "ref",
-                      "epics_epic"."subject" AS "subject",
-                      "epics_epic"."epics_order" AS "order",
-                      COALESCE("counters"."counter", 0) AS "counter"
-                 FROM "epics_epic"
-      LEFT OUTER JOIN "counters"
-                   ON ("counters"."epic_id" = "epics_epic"."id")
-                WHERE "epics_epic"."project_id" = %s
-        """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + where_params + [project.id])
-        rows = cursor.fetchall()
 
-    result = []
-    for id, ref, subject, order, count in rows:
+    for id, ref, subject, order in project.epics.values_list("id", "ref", "subject", "epics_order"):
         result.append({
             "id": id,
             "ref": ref,
             "subject": subject,
             "order": order,
-            "count": count,
+            "count": counts[id],
         })
 
     result = sorted(result, key=lambda k: (k["order"], k["id"] or 0))
@@ -1058,80 +736,31 @@ def _get_userstories_epics(project, queryset):
     return result
 
 
-def _get_userstories_roles(project, queryset):
-    compiler = connection.ops.compiler(queryset.query.compiler)(queryset.query, connection, None)
-    queryset_where_tuple = queryset.query.where.as_sql(compiler, connection)
-    where = queryset_where_tuple[0]
-    where_params = queryset_where_tuple[1]
-
-    extra_sql = """
-     WITH "us_counters" AS (
-         SELECT DISTINCT "userstories_userstory"."status_id" "status_id",
-                         "userstories_userstory"."id" "us_id",
-                         "projects_membership"."role_id" "role_id"
-                    FROM "userstories_userstory"
-              INNER JOIN "projects_project"
-                      ON ("userstories_userstory"."project_id" = "projects_project"."id")
-            INNER JOIN "projects_userstorystatus"
-                ON ("userstories_userstory"."status_id" = "projects_userstorystatus"."id")
-         LEFT OUTER JOIN "epics_relateduserstory"
-                      ON "userstories_userstory"."id" = "epics_relateduserstory"."user_story_id"
-         LEFT OUTER JOIN "userstories_userstory_assigned_users"
-                      ON "userstories_userstory_assigned_users"."userstory_id" = "userstories_userstory"."id"
-         LEFT OUTER JOIN "projects_membership"
-                      ON "projects_membership"."user_id" = "userstories_userstory"."assigned_to_id"
-                      OR "projects_membership"."user_id" = "userstories_userstory_assigned_users"."user_id"
-                   WHERE {where}
-            ),
-             "counters" AS (
-                  SELECT "role_id" as "role_id",
-                         COUNT("role_id") "count"
-                    FROM "us_counters"
-                GROUP BY "role_id"
-            )
-
-                 SELECT "users_role"."id",
-                        "users_role"."name",
-                        "users_role"."order",
-                        COALESCE("counters"."count", 0)
-                   FROM "users_role"
-        LEFT OUTER JOIN "counters"
-                     ON "counters"."role_id" = "users_role"."id"
-                  WHERE "users_role"."project_id" = %s
-               ORDER BY "users_role"."order";
-    """.format(where=where)
-
-    with closing(connection.cursor()) as cursor:
-        cursor.execute(extra_sql, where_params + [project.id])
-        rows = cursor.fetchall()
-
-    result = []
-    for id, name, order, count in rows:
-        result.append({
-            "id": id,
-            "name": _(name),
-            "color": None,
-            "order": order,
-            "count": count,
-        })
-    return sorted(result, key=itemgetter("order"))
-
-
-def get_userstories_filters_data(project, querysets):
+def get_userstories_filters_data(project, querysets, use_tags_counts=False):
     """
     Given a project and an userstories queryset, return a simple data structure
     of all possible filters for the userstories in the queryset.
     """
+    facets = dict(USERSTORIES_FILTERS_FACETS)
+    if use_tags_counts:
+        del facets["tags"]
+
+    counts = get_facets_counts({name: querysets[name] for name in facets},
+                               USERSTORIES_FILTERS_JOINS, USERSTORIES_FILTERS_COLUMNS, facets)
+
+    if use_tags_counts:
+        tags = tagging_services.get_project_tags_counts(project, "userstories")
+    else:
+        tags = get_tags_filters_data(project, counts["tags"])
+
     data = OrderedDict([
-        ("statuses", _get_userstories_statuses(project, querysets["statuses"])),
-        ("assigned_to",
-         _get_userstories_assigned_to(project, querysets["assigned_to"])),
-        ("assigned_users",
-         _get_userstories_assigned_users(project, querysets["assigned_users"])),
-        ("owners", _get_userstories_owners(project, querysets["owners"])),
-        ("tags", _get_userstories_tags(project, querysets["tags"])),
-        ("epics", _get_userstories_epics(project, querysets["epics"])),
-        ("roles", _get_userstories_roles(project, querysets["roles"])),
+        ("statuses", get_choices_filters_data(project.us_statuses.all(), counts["statuses"])),
+        ("assigned_to", get_assigned_filters_data(project, counts["assigned_to"])),
+        ("assigned_users", get_assigned_filters_data(project, counts["assigned_users"], with_photos=True)),
+        ("owners", get_owners_filters_data(project, counts["owners"], with_photos=True)),
+        ("tags", tags),
+        ("epics", _get_userstories_epics(project, counts["epics"])),
+        ("roles", get_roles_filters_data(project, counts["roles"])),
     ])
 
     return data
@@ -5,13 +5,26 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+from decimal import Decimal, InvalidOperation
+
 from django.apps import apps
 from django.conf import settings
+from django.db import connection
 from taiga.base.utils.db import to_tsquery
 from taiga.projects.userstories.utils import attach_total_points
 
 MAX_RESULTS = getattr(settings, "SEARCHES_MAX_RESULTS", 150)
 
+# The searchable types, in the order used to break ties between elements
+# with the same rank
+SEARCH_TYPES = (
+    ("epics", "epics.Epic"),
+    ("userstories", "userstories.UserStory"),
+    ("tasks", "tasks.Task"),
+    ("issues", "issues.Issue"),
+    ("wikipages", "wiki.WikiPage"),
+)
+
 
 def search_epics(project, text):
     model = apps.get_model("epics", "Epic")
@@ -44,24 +57,15 @@ def search_issues(project, text):
 def search_wiki_pages(project, text):
     model = apps.get_model("wiki", "WikiPage")
     queryset = model.objects.filter(project_id=project.pk)
-    tsquery = "to_tsquery('simple', %s)"
-    tsvector = """
-        setweight(to_tsvector('simple', coalesce(wiki_wikipage.slug)), 'A') ||
-        setweight(to_tsvector('simple', coalesce(wiki_wikipage.content)), 'B')
-    """
-
-    return _search_by_query(queryset, tsquery, tsvector, text)
+    table = "wiki_wikipage"
+    return _search_items(queryset, table, text)
 
 
 def _search_items(queryset, table, text):
+    # NOTE: The search_vector columns are maintained by triggers, see
+    #       migration projects/0070_search_vectors
     tsquery = "to_tsquery('simple', %s)"
-    tsvector = """
-        setweight(to_tsvector('simple',
-                              coalesce({table}.subject) || ' ' ||
-                              coalesce({table}.ref)), 'A') ||
-        setweight(to_tsvector('simple', coalesce(inmutable_array_to_string({table}.tags))), 'B') ||
-        setweight(to_tsvector('simple', coalesce({table}.description)), 'C')
-    """.format(table=table)
+    tsvector = "{table}.search_vector".format(table=table)
     return _search_by_query(queryset, tsquery, tsvector, text)
 
 
@@ -83,3 +87,91 @@ def _search_by_query(queryset, tsquery, tsvector, text):
 
     queryset = attach_total_points(queryset)
     return queryset[:MAX_RESULTS]
+
+
+def _parse_cursor(cursor):
+    try:
+        rank, position, obj_id = cursor.split(":")
+        return Decimal(rank), int(position), int(obj_id)
+    except (ValueError, InvalidOperation):
+        raise ValueError("Invalid search cursor: {}".format(cursor))
+
+
+def _get_search_results_queryset(search_type, ids):
+    model = apps.get_model(dict(SEARCH_TYPES)[search_type])
+    queryset = model.objects.filter(id__in=ids)
+    if search_type == "userstories":
+        queryset = attach_total_points(queryset.select_related("milestone"))
+    return queryset
+
+
+def search(project, text, types, limit=MAX_RESULTS, cursor=None):
+    """
+    Search `text` in the elements of the project of the given `types` with a
+    single query, ranking all of them together.
+
+    Return a dict with the found elements of every type, in rank order, and
+    the cursor of the next `limit` results (or None if there are no more).
+    Raise ValueError if `cursor` is not valid.
+    """
+    # NOTE: The search_vector columns are maintained by triggers, see
+    #       migration projects/0070_search_vectors
+    params = {"project_id": project.id, "limit": limit + 1}
+    if text:
+        params["tsquery"] = to_tsquery(text)
+        rank = "ROUND(ts_rank({table}.search_vector, to_tsquery('simple', %(tsquery)s))::numeric, 6)"
+        where = "AND {table}.search_vector @@ to_tsquery('simple', %(tsquery)s)"
+    else:
+        rank = "0::numeric"
+        where = ""
+
+    subqueries = []
+    for position, (search_type, label) in enumerate(SEARCH_TYPES):
+        if search_type not in types:
+            continue
+        table = apps.get_model(label)._meta.db_table
+        subqueries.append("""
+            SELECT {position} AS position, {table}.id AS id, {rank} AS rank
+              FROM {table}
+             WHERE {table}.project_id = %(project_id)s {where}
+        """.format(position=position, table=table, rank=rank.format(table=table), where=where.format(table=table)))
+
+    result = {search_type: [] for search_type in types}
+    if not subqueries:
+        return result, None
+
+    cursor_where = ""
+    if cursor:
+        params["rank"], params["position"], params["id"] = _parse_cursor(cursor)
+        cursor_where = """
+         WHERE rank < %(rank)s
+            OR (rank = %(rank)s AND (position, id) > (%(position)s, %(id)s))
+        """
+
+    sql = """
+        SELECT position, id, rank
+          FROM ({subqueries}) AS results
+        {cursor_where}
+         ORDER BY rank DESC, position, id
+         LIMIT %(limit)s
+    """.format(subqueries=" UNION ALL ".join(subqueries), cursor_where=cursor_where)
+
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        position, obj_id, rank = rows[-1]
+        next_cursor = "{}:{}:{}".format(rank, position, obj_id)
+
+    ids_by_type = {}
+    for position, obj_id, rank in rows:
+        ids_by_type.setdefault(SEARCH_TYPES[position][0], []).append(obj_id)
+
+    for search_type, ids in ids_by_type.items():
+        objs = {obj.id: obj for obj in _get_search_results_queryset(search_type, ids)}
+        result[search_type] = [objs[obj_id] for obj_id in ids if obj_id in objs]
+
+    return result, next_cursor
@@ -43,11 +43,12 @@ def build_project_namespace(project: object):
     return "{0}:{1}".format("project", project.id)
 
 
-def _add_to_object_timeline(obj: object, instance: object, event_type: str, created_datetime: object,
-                            namespace: str="default", extra_data: dict={}):
-    assert isinstance(obj, Model), "obj must be a instance of Model"
+def _prepare_timeline_event(instance: object, event_type: str, extra_data: dict={}):
+    """
+    Compute the fields shared by all the timeline entries of an event, the
+    serialized data is generated only once.
+    """
     assert isinstance(instance, Model), "instance must be a instance of Model"
-    from .models import Timeline
     event_type_key = _get_impl_key_from_model(instance.__class__, event_type)
     impl = _timeline_impl_map.get(event_type_key, None)
 
@@ -55,21 +56,50 @@ def _add_to_object_timeline(obj: object, instance: object, event_type: str, crea
     if hasattr(instance, "project"):
         project = instance.project
 
-    Timeline.objects.create(
-        content_object=obj,
-        namespace=namespace,
-        event_type=event_type_key,
-        project=project,
-        data=impl(instance, extra_data=extra_data),
-        data_content_type=ContentType.objects.get_for_model(instance.__class__),
-        created=created_datetime,
-    )
+    return {
+        "event_type": event_type_key,
+        "project": project,
+        "data": impl(instance, extra_data=extra_data),
+        "data_content_type": ContentType.objects.get_for_model(instance.__class__),
+    }
+
+
+def _build_timeline_entries(objects, event: dict, created_datetime: object, namespace: str="default"):
+    from .models import Timeline
+
+    entries = []
+    for obj in objects:
+        assert isinstance(obj, Model), "obj must be a instance of Model"
+        entries.append(Timeline(
+            # ContentType manager keeps a process cache of the content types
+            content_type=ContentType.objects.get_for_model(obj.__class__),
+            object_id=obj.pk,
+            namespace=namespace,
+            created=created_datetime,
+            **event
+        ))
+    return entries
+
+
+def _create_timeline_entries(entries):
+    from .models import Timeline
+    Timeline.objects.bulk_create(entries)
+
+
+def _add_to_object_timeline(obj: object, instance: object, event_type: str, created_datetime: object,
+                            namespace: str="default", extra_data: dict={}):
+    assert isinstance(obj, Model), "obj must be a instance of Model"
+    _add_to_objects_timeline([obj], instance, event_type, created_datetime, namespace, extra_data)
 
 
 def _add_to_objects_timeline(objects, instance: object, event_type: str, created_datetime: object,
                              namespace: str="default", extra_data: dict={}):
-    for obj in objects:
-        _add_to_object_timeline(obj, instance, event_type, created_datetime, namespace, extra_data)
+    objects = list(objects)
+    if not objects:
+        return
+
+    event = _prepare_timeline_event(instance, event_type, extra_data)
+    _create_timeline_entries(_build_timeline_entries(objects, event, created_datetime, namespace))
 
 
 def _push_to_timeline(objects, instance: object, event_type: str, created_datetime: object,
@@ -106,20 +136,23 @@ def push_to_timelines(project_id, user_id, obj_app_label, obj_model_name, obj_id
         except projectModel.DoesNotExist:
             return
 
-        # Project timeline
-        _push_to_timeline(project, obj, event_type, created_datetime,
-                          namespace=build_project_namespace(project),
-                          extra_data=extra_data)
+        event = _prepare_timeline_event(obj, event_type, extra_data)
 
-        if refresh_totals:
-            project.refresh_totals()
+        # Project timeline
+        entries = _build_timeline_entries([project], event, created_datetime,
+                                          namespace=build_project_namespace(project))
 
         if hasattr(obj, "get_related_people"):
             related_people = obj.get_related_people()
 
-            _push_to_timeline(related_people, obj, event_type, created_datetime,
-                              namespace=build_user_namespace(user),
-                              extra_data=extra_data)
+            entries += _build_timeline_entries(related_people, event, created_datetime,
+                                               namespace=build_user_namespace(user))
+
+        _create_timeline_entries(entries)
+
+        if refresh_totals:
+            from taiga.projects.services import totals as totals_services
+            totals_services.add_to_project_totals(project.id, totals_services.ACTIVITY, created_datetime)
     else:
         # Actions not related with a project
         # - Me
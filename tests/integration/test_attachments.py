@@ -5,12 +5,17 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import io
+
 import pytest
+from PIL import Image
 
+from django.core.management import call_command
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from taiga.base.utils import json
+from taiga.projects.attachments.models import Attachment
 
 from .. import factories as f
 
@@ -71,6 +76,63 @@ def test_create_attachment_with_long_file_name(client):
     assert response.data["attached_file"].endswith("/"+100*"x"+".txt")
 
 
+def _png_file(name="test.png"):
+    content = io.BytesIO()
+    Image.new("RGB", (400, 300), "red").save(content, "PNG")
+    return SimpleUploadedFile(name, content.getvalue(), content_type="image/png")
+
+
+def test_create_attachment_stores_its_thumbnails(client, settings):
+    settings.CELERY_ENABLED = False
+    issue = f.create_issue()
+    f.MembershipFactory(project=issue.project, user=issue.owner, is_admin=True)
+
+    url = reverse("issue-attachments-list")
+
+    data = {"description": "test",
+            "object_id": issue.pk,
+            "project": issue.project.id,
+            "attached_file": _png_file()}
+
+    client.login(issue.owner)
+    response = client.post(url, data)
+    assert response.status_code == 201
+
+    attachment = Attachment.objects.get(id=response.data["id"])
+    assert set(attachment.thumbnails) == {settings.THN_ATTACHMENT_CARD,
+                                          settings.THN_ATTACHMENT_PREVIEW,
+                                          settings.THN_ATTACHMENT_TIMELINE}
+    card_name = attachment.thumbnails[settings.THN_ATTACHMENT_CARD]
+    assert card_name
+    assert response.data["thumbnail_card_url"].endswith(card_name)
+
+
+def test_replace_attachment_file_regenerates_its_thumbnails(settings):
+    settings.CELERY_ENABLED = False
+    attachment = f.AttachmentFactory.create(attached_file=_png_file("first.png"))
+    first_thumbnails = attachment.thumbnails
+
+    attachment.attached_file = _png_file("second.png")
+    attachment.save()
+
+    attachment.refresh_from_db()
+    assert attachment.thumbnails[settings.THN_ATTACHMENT_CARD] != first_thumbnails[settings.THN_ATTACHMENT_CARD]
+
+
+def test_generate_attachments_thumbnails_command(settings):
+    settings.CELERY_ENABLED = False
+    image = f.AttachmentFactory.create(attached_file=_png_file())
+    text = f.AttachmentFactory.create()
+    Attachment.objects.filter(id__in=[image.id, text.id]).update(thumbnails=None)
+
+    call_command("generate_attachments_thumbnails", processes=1)
+
+    image.refresh_from_db()
+    text.refresh_from_db()
+    assert image.thumbnails[settings.THN_ATTACHMENT_CARD]
+    assert text.thumbnails == {alias: None for alias in image.thumbnails}
+
+
 ######################################
 # Sorting attachments
 ######################################
@@ -7,6 +7,7 @@
 
 import uuid
 import csv
+import io
 
 from unittest import mock
 
@@ -55,8 +56,7 @@ def test_custom_fields_csv_generation():
     attr_values.save()
     queryset = project.epics.all()
     data = services.epics_to_csv(project, queryset)
-    data.seek(0)
-    reader = csv.reader(data)
+    reader = csv.reader(io.StringIO("".join(data)))
     row = next(reader)
 
     assert row[19] == attr.name
@@ -9,6 +9,8 @@ import pytest
 
 from unittest.mock import patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
@@ -16,7 +18,7 @@ from .. import factories as f
 
 from taiga.base.utils import json
 from taiga.projects.history import services
-from taiga.projects.history.models import HistoryEntry
+from taiga.projects.history.models import HistoryEntry, HistorySnapshot
 from taiga.projects.history.choices import HistoryType
 from taiga.projects.history.services import make_key_from_model_object
 
@@ -132,6 +134,169 @@ def test_real_snapshot_frequency(settings):
     assert qs_partials.count() == 2
 
 
+def test_take_snapshot_keeps_materialized_state_updated(settings):
+    settings.MAX_PARTIAL_DIFFS = 2
+
+    issue = f.IssueFactory.create()
+    key = make_key_from_model_object(issue)
+
+    for counter in range(5):
+        issue.description = "desc{}".format(counter)
+        issue.save()
+        services.take_snapshot(issue, user=issue.owner)
+
+        state = HistorySnapshot.objects.get(key=key)
+        rebuilt_fobj, partial_diffs = services._rebuild_last_snapshot_for_key(key)
+        assert state.project_id == issue.project_id
+        assert state.snapshot == rebuilt_fobj.snapshot
+        assert state.snapshot["description"] == "desc{}".format(counter)
+        assert state.partial_diffs == partial_diffs
+
+    assert HistoryEntry.objects.filter(key=key, is_snapshot=True).count() == 2
+
+
+def test_take_snapshot_reads_only_materialized_state(django_assert_num_queries):
+    issue = f.IssueFactory.create()
+    services.take_snapshot(issue, user=issue.owner)
+    for counter in range(10):
+        issue.description = "desc{}".format(counter)
+        issue.save()
+        services.take_snapshot(issue, user=issue.owner)
+
+    key = make_key_from_model_object(issue)
+    with django_assert_num_queries(1):
+        old_fobj, need_real_snapshot = services.get_last_snapshot_for_key(key)
+
+    assert old_fobj.snapshot["description"] == "desc9"
+    assert need_real_snapshot is False
+
+
+def test_invalidate_and_rebuild_snapshot_state():
+    issue = f.IssueFactory.create()
+    services.take_snapshot(issue, user=issue.owner)
+    issue.description = "new description"
+    issue.save()
+    services.take_snapshot(issue, user=issue.owner)
+
+    key = make_key_from_model_object(issue)
+    services.invalidate_snapshot_state(key)
+    assert not HistorySnapshot.objects.filter(key=key).exists()
+
+    old_fobj, _ = services.get_last_snapshot_for_key(key)
+    assert old_fobj.snapshot["description"] == "new description"
+
+    assert services.rebuild_snapshot_state_for_key(key, issue.project_id)
+    state = HistorySnapshot.objects.get(key=key)
+    assert state.snapshot == old_fobj.snapshot
+    assert state.partial_diffs == 1
+
+
+def test_rebuild_history_snapshots_command():
+    from django.core.management import call_command
+
+    issue = f.IssueFactory.create()
+    services.take_snapshot(issue, user=issue.owner)
+    key = make_key_from_model_object(issue)
+    HistorySnapshot.objects.all().delete()
+
+    call_command("rebuild_history_snapshots", issue.project.slug)
+
+    assert HistorySnapshot.objects.filter(key=key).exists()
+
+
+def test_take_snapshots_in_bulk():
+    project = f.ProjectFactory.create()
+    user_stories = [f.UserStoryFactory.create(project=project) for x in range(3)]
+    for us in user_stories:
+        services.take_snapshot(us, user=us.owner)
+
+    user_stories[0].subject = "new subject 0"
+    user_stories[0].save()
+    user_stories[2].subject = "new subject 2"
+    user_stories[2].save()
+    new_us = f.UserStoryFactory.create(project=project)
+
+    with patch("taiga.projects.history.services.signals.post_save.send") as post_save_mock:
+        entries = services.take_snapshots_in_bulk(user_stories + [new_us], user=project.owner)
+
+    keys = [make_key_from_model_object(us) for us in (user_stories[0], user_stories[2], new_us)]
+    assert sorted(entry.key for entry in entries) == sorted(keys)
+    assert post_save_mock.call_count == 3
+
+    by_key = {entry.key: entry for entry in HistoryEntry.objects.filter(id__in=[e.id for e in entries])}
+    assert by_key[keys[0]].type == HistoryType.change
+    assert by_key[keys[0]].diff["subject"][1] == "new subject 0"
+    assert by_key[keys[2]].type == HistoryType.create
+    assert by_key[keys[2]].is_snapshot
+
+    for us in user_stories + [new_us]:
+        key = make_key_from_model_object(us)
+        state = HistorySnapshot.objects.get(key=key)
+        rebuilt_fobj, partial_diffs = services._rebuild_last_snapshot_for_key(key)
+        assert state.snapshot == rebuilt_fobj.snapshot
+        assert state.partial_diffs == partial_diffs
+
+
+def test_take_snapshots_in_bulk_same_result_as_take_snapshot():
+    project = f.ProjectFactory.create()
+    us = f.UserStoryFactory.create(project=project)
+    f.UserStoryAttachmentFactory.create(project=project, content_object=us)
+
+    bulk_entry = services.take_snapshots_in_bulk([us], user=project.owner)[0]
+    HistoryEntry.objects.all().delete()
+    HistorySnapshot.objects.all().delete()
+    entry = services.take_snapshot(us, user=project.owner)
+
+    assert bulk_entry.snapshot == entry.snapshot
+    assert bulk_entry.type == entry.type
+    assert bulk_entry.is_snapshot == entry.is_snapshot
+
+
+def _count_take_snapshots_in_bulk_queries(project, n):
+    user_stories = [f.UserStoryFactory.create(project=project) for x in range(n)]
+    services.take_snapshots_in_bulk(user_stories, user=project.owner)
+    for us in user_stories:
+        us.subject = "{} changed".format(us.subject)
+        us.save()
+
+    with patch("taiga.projects.history.services.signals.post_save.send"):
+        with CaptureQueriesContext(connection) as queries:
+            services.take_snapshots_in_bulk(user_stories, user=project.owner)
+
+    # Every key is locked and unlocked
+    lock_queries = [query for query in queries if "pg_advisory" in query["sql"]]
+    assert len(lock_queries) == 2 * n
+    return len(queries) - len(lock_queries)
+
+
+def test_take_snapshots_in_bulk_queries_do_not_grow_with_objects():
+    project = f.ProjectFactory.create()
+
+    assert _count_take_snapshots_in_bulk_queries(project, 10) == _count_take_snapshots_in_bulk_queries(project, 20)
+
+
+@pytest.mark.parametrize("n_partial_diffs", [0, 15, 59])
+def test_get_last_snapshot_for_key_reads_the_materialized_state(settings, django_assert_num_queries,
+                                                                 n_partial_diffs):
+    settings.MAX_PARTIAL_DIFFS = 60
+    issue = f.IssueFactory.create()
+    services.take_snapshot(issue, user=issue.owner)
+    for counter in range(n_partial_diffs):
+        issue.description = "desc{}".format(counter)
+        issue.save()
+        services.take_snapshot(issue, user=issue.owner)
+
+    key = make_key_from_model_object(issue)
+    rebuilt_fobj, partial_diffs = services._rebuild_last_snapshot_for_key(key)
+
+    with django_assert_num_queries(1):
+        fobj, need_real_snapshot = services.get_last_snapshot_for_key(key)
+
+    assert partial_diffs == n_partial_diffs
+    assert fobj.snapshot == rebuilt_fobj.snapshot
+    assert need_real_snapshot is False
+
+
 def test_issue_resource_history_test(client):
     user = f.UserFactory.create()
     project = f.ProjectFactory.create(owner=user)
@@ -489,6 +489,35 @@ def test_valid_us_import_with_extra_data(client):
     assert response.data["watchers"] == [user_watching.email]
 
 
+def test_us_import_ignores_the_attachments_thumbnails(client):
+    user = f.UserFactory.create()
+    project = f.ProjectFactory.create(owner=user)
+    f.MembershipFactory(project=project, user=user, is_admin=True)
+    project.default_us_status = f.UserStoryStatusFactory.create(project=project)
+    project.save()
+    client.login(user)
+
+    url = reverse("importer-us", args=[project.pk])
+    data = {
+        "subject": "Imported us",
+        "description": "Imported us",
+        "attachments": [{
+            "owner": user.email,
+            "attached_file": {
+                "name": "imported attachment.bmp",
+                "data": base64.b64encode(DUMMY_BMP_DATA).decode("utf-8")
+            },
+            "thumbnails": {"card": "../../evil.png", "preview": "../../evil.png"}
+        }],
+    }
+
+    response = client.json.post(url, json.dumps(data))
+    assert response.status_code == 201
+
+    attachment = apps.get_model("attachments", "Attachment").objects.get(project=project)
+    assert "../../evil.png" not in (attachment.thumbnails or {}).values()
+
+
 def test_invalid_us_import_with_extra_data(client):
     user = f.UserFactory.create()
     project = f.ProjectFactory.create(owner=user)
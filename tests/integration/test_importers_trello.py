@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .. import factories as f
+
+from taiga.importers.trello.importer import TrelloImporter
+from taiga.projects.history.models import HistoryEntry
+from taiga.projects.notifications.services import get_watchers
+from taiga.projects.references.models import Reference
+from taiga.projects.services.bulk_load import BulkLoader
+from taiga.projects.tasks.models import Task
+
+
+pytestmark = pytest.mark.django_db
+
+
+def _make_board(num_cards):
+    lists = [
+        {"id": "list-1", "name": "Todo", "closed": False},
+        {"id": "list-2", "name": "Done", "closed": False},
+    ]
+    checklists = [{
+        "id": "checklist-1",
+        "checkItems": [
+            {"name": "First", "state": "complete"},
+            {"name": "Second", "state": "complete"},
+        ],
+    }]
+    cards = []
+    for i in range(num_cards):
+        cards.append({
+            "id": "card-{}".format(i),
+            "closed": False,
+            "labels": [{"name": "Tag", "color": "red"}],
+            "idList": "list-1",
+            "desc": "Description {}".format(i),
+            "due": "2021-06-01T10:00:00.000Z" if i % 2 else None,
+            "name": "Card {}".format(i),
+            "pos": i,
+            "dateLastActivity": "2021-05-01T10:00:00.000Z",
+            "idChecklists": ["checklist-1"] if i % 3 == 0 else [],
+            "idMembers": ["member-1", "member-2"],
+            "url": "https://trello.com/c/{}".format(i),
+            "attachments": [],
+        })
+    return {"lists": lists, "checklists": checklists, "cards": cards}
+
+
+def _fetch_card_data(card):
+    return {
+        "attachments": [],
+        "actions": [{
+            "type": "createCard",
+            "date": "2021-04-01T10:00:00.000Z",
+            "idMemberCreator": "member-2",
+            "memberCreator": {"id": "member-2", "fullName": "Member 2"},
+            "data": {},
+        }, {
+            "type": "updateCard",
+            "date": "2021-04-02T10:00:00.000Z",
+            "idMemberCreator": "member-1",
+            "memberCreator": {"id": "member-1", "fullName": "Member 1"},
+            "data": {"old": {"name": "Old name"}, "card": {"name": card["name"]}},
+        }],
+    }
+
+
+def _import_board(settings, num_cards):
+    settings.IMPORTERS_HTTP_WORKERS = 1
+    user = f.UserFactory.create()
+    member1 = f.UserFactory.create()
+    member2 = f.UserFactory.create()
+    project = f.ProjectFactory.create(owner=user)
+    f.RoleFactory.create(project=project, computable=True)
+    project.default_points = f.PointsFactory.create(project=project)
+    project.save()
+    f.UserStoryStatusFactory.create(project=project, name="Todo")
+    f.UserStoryStatusFactory.create(project=project, name="Done", is_closed=True)
+    f.TaskStatusFactory.create(project=project, slug="incomplete", is_closed=False)
+    f.TaskStatusFactory.create(project=project, slug="complete", is_closed=True)
+    due_date_field = f.UserStoryCustomAttributeFactory.create(project=project, name="Due")
+
+    importer = TrelloImporter(user, "token")
+    importer._fetch_card_data = _fetch_card_data
+    options = {"users_bindings": {"member-1": member1, "member-2": member2}}
+
+    with CaptureQueriesContext(connection) as queries:
+        importer._import_user_stories_data(_make_board(num_cards), project, options)
+
+    return project, due_date_field, (member1, member2), len(queries)
+
+
+def test_import_trello_cards_in_bulk(settings):
+    project, due_date_field, (member1, member2), _ = _import_board(settings, 7)
+
+    user_stories = list(project.user_stories.order_by("ref"))
+    assert [us.subject for us in user_stories] == ["Card {}".format(i) for i in range(7)]
+    assert [us.ref for us in user_stories] == list(range(1, 8))
+    assert Reference.objects.filter(project=project).count() == 7 + 6
+
+    us = user_stories[1]
+    assert us.assigned_to == member1
+    assert us.owner == member2
+    assert us.created_date.isoformat() == "2021-04-01T10:00:00+00:00"
+    assert us.tags == ["tag"]
+    assert us.status.name == "Todo"
+    assert us.custom_attributes_values.attributes_values == {str(due_date_field.id): "2021-06-01T10:00:00.000Z"}
+    assert us.role_points.count() == 1
+    assert set(get_watchers(us)) == {member2}
+    assert not us.is_closed
+
+    # All the tasks of the user story are complete
+    us = user_stories[0]
+    assert us.tasks.count() == 2
+    assert us.is_closed
+    assert us.custom_attributes_values.attributes_values == {}
+
+    entries = HistoryEntry.objects.filter(key="userstories.userstory:{}".format(us.id)).order_by("created_at")
+    assert [(e.type, e.created_at.isoformat()) for e in entries] == [
+        (2, "2021-04-01T10:00:00+00:00"),
+        (1, "2021-04-02T10:00:00+00:00"),
+    ]
+
+
+def test_bulk_loader_closes_user_stories_with_tasks_in_several_chunks():
+    project = f.ProjectFactory.create()
+    us_status = f.UserStoryStatusFactory.create(project=project)
+    open_status = f.TaskStatusFactory.create(project=project, is_closed=False)
+    closed_status = f.TaskStatusFactory.create(project=project, is_closed=True)
+    closed_us = f.UserStoryFactory.create(project=project, status=us_status)
+    open_us = f.UserStoryFactory.create(project=project, status=us_status)
+
+    loader = BulkLoader(project, chunk_size=2)
+    loader.create(Task, [
+        Task(subject="Task 1", user_story=closed_us, status=closed_status, owner=project.owner),
+        Task(subject="Task 2", user_story=open_us, status=open_status, owner=project.owner),
+        # The last tasks of the user stories are closed, in another chunk
+        Task(subject="Task 3", user_story=closed_us, status=closed_status, owner=project.owner),
+        Task(subject="Task 4", user_story=open_us, status=closed_status, owner=project.owner),
+    ])
+    loader.flush()
+
+    closed_us.refresh_from_db()
+    open_us.refresh_from_db()
+    assert closed_us.is_closed
+    assert not open_us.is_closed
+
+
+def test_import_trello_cards_with_a_constant_number_of_queries(settings):
+    # Warm up the caches (content types...)
+    _import_board(settings, 1)
+
+    *_, few_queries = _import_board(settings, 5)
+    *_, many_queries = _import_board(settings, 50)
+
+    assert many_queries == few_queries
@@ -7,6 +7,7 @@
 
 import uuid
 import csv
+import io
 import pytz
 
 from datetime import datetime, timedelta
@@ -642,8 +643,7 @@ def test_custom_fields_csv_generation():
     attr_values.save()
     queryset = project.issues.all()
     data = services.issues_to_csv(project, queryset)
-    data.seek(0)
-    reader = csv.reader(data)
+    reader = csv.reader(io.StringIO("".join(data)))
     row = next(reader)
 
     assert row[27] == attr.name
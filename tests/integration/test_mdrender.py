@@ -5,9 +5,17 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import os
+import re
+
 import pytest
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from taiga.mdrender.service import render, render_and_extract
+from taiga.mdrender.service import _clean, _make_markdown, local_cache
+from taiga.projects.references.models import Reference
 
 from unittest.mock import MagicMock
 
@@ -57,6 +65,72 @@ def test_render_and_extract_mentions_with_capitalized_username():
     assert extracted['mentions'] == [user]
 
 
+def _render_and_extract_with_queries(project, text):
+    with CaptureQueriesContext(connection) as queries:
+        result = render_and_extract(project, text)
+    return result, len(queries)
+
+
+def test_render_and_extract_resolves_references_and_mentions_in_bulk():
+    project = factories.ProjectFactory(slug="test")
+    users = [factories.UserFactory(username="user{}".format(i)) for i in range(10)]
+    for user in users:
+        factories.MembershipFactory(user=user, project=project)
+    user_stories = [factories.UserStoryFactory(project=project) for i in range(10)]
+    issues = [factories.IssueFactory(project=project) for i in range(10)]
+
+    # Warm up the content types cache
+    _render_and_extract_with_queries(project, "See #{} #{}".format(user_stories[0].ref, issues[0].ref))
+
+    _, few_queries = _render_and_extract_with_queries(
+        project, "See #{} #{} @user0".format(user_stories[0].ref, issues[0].ref))
+
+    text = "\n\n".join("See #{} **#{}** @{} #9999 @unknown".format(us.ref, issue.ref, user.username)
+                        for us, issue, user in zip(user_stories, issues, users))
+    (result, extracted), many_queries = _render_and_extract_with_queries(project, text)
+
+    assert many_queries == few_queries
+    assert extracted["references"] == [obj for pair in zip(user_stories, issues) for obj in pair]
+    assert extracted["mentions"] == users
+    assert result.count('class="reference user-story"') == 10
+    assert result.count('class="reference issue"') == 10
+    assert "#9999" in result
+    assert "@unknown" in result
+
+
+def test_render_cache_is_invalidated_by_the_members_and_references():
+    user = factories.UserFactory(username="user1", full_name="test name")
+    project = factories.ProjectFactory(slug="test")
+    us = factories.UserStoryFactory(project=project)
+    Reference.objects.filter(project=project).delete()
+    text = "Text long enough to be cached with @user1 and #{}".format(us.ref)
+
+    assert 'class="mention"' not in render(project, text)
+
+    factories.MembershipFactory(user=user, project=project)
+    assert 'class="mention"' in render(project, text)
+    assert 'class="reference' not in render(project, text)
+
+    Reference.objects.create(content_object=us, ref=us.ref, project=project)
+    assert 'class="reference user-story"' in render(project, text)
+
+
+def test_render_with_the_pool_and_the_cache_matches_a_new_engine(settings):
+    changelog_path = os.path.join(os.path.dirname(__file__), "..", "..", "CHANGELOG.md")
+    with open(changelog_path) as changelog:
+        corpus = [text.strip() for text in re.split(r"^## .*$", changelog.read(), flags=re.M) if text.strip()]
+    project = factories.ProjectFactory()
+    new_engine_results = [_clean(_make_markdown(project).convert(text)) for text in corpus]
+
+    settings.MDRENDER_CACHE_ENABLE = False
+    assert [render(project, text) for text in corpus] == new_engine_results
+
+    settings.MDRENDER_CACHE_ENABLE = True
+    local_cache.clear()
+    assert [render(project, text) for text in corpus] == new_engine_results
+    assert [render(project, text) for text in corpus] == new_engine_results
+
+
 def test_proccessor_valid_email():
     result = render(dummy_project, "**beta.tester@taiga.io**")
     expected_result = "<p><strong><a href=\"mailto:beta.tester@taiga.io\" target=\"_blank\">beta.tester@taiga.io</a></strong></p>"
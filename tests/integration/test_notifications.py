@@ -14,6 +14,8 @@ import binascii
 import struct
 import pytz
 import smtplib
+import socketserver
+import threading
 
 from unittest.mock import Mock, MagicMock, patch
 
@@ -24,6 +26,7 @@ from django.apps import apps
 from .. import factories as f
 
 from taiga.base.api.settings import api_settings
+from taiga.base.mails import InlineCSSTemplateMail
 from taiga.base.utils import json
 from taiga.projects.notifications import services
 from taiga.projects.notifications import models
@@ -352,6 +355,41 @@ def test_watching_users_to_notify_on_issue_modification_6():
     assert users == {issue.owner}
 
 
+@pytest.mark.django_db(transaction=True)
+def test_send_notifications_outside_a_transaction(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 0
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues', 'view_us', 'view_tasks', 'view_wiki_pages'])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+
+    us = f.UserStoryFactory.create(project=project, owner=member2.user)
+    history_change = f.HistoryEntryFactory.create(
+        project=project,
+        user={"pk": member1.user.id},
+        comment="test:change",
+        type=HistoryType.change,
+        key="userstories.userstory:{}".format(us.id),
+        is_hidden=False,
+        diff=[]
+    )
+
+    take_snapshot(us, user=us.owner)
+    services.send_notifications(us, history=history_change)
+
+    assert models.HistoryChangeNotification.objects.count() == 0
+    assert len(mail.outbox) == 1
+
+    # The pending notifications are also sent outside a transaction
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+    services.send_notifications(us, history=history_change)
+    services.process_sync_notifications()
+
+    assert models.HistoryChangeNotification.objects.count() == 0
+    assert len(mail.outbox) == 2
+
+
 def test_send_notifications_using_services_method_for_user_stories(settings, mail):
     settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
 
@@ -1499,11 +1537,9 @@ def test_smtp_error_sending_notifications(settings, mail):
                                 history=history_delete)
 
 
-    with patch("taiga.projects.notifications.services._make_template_mail") as make_template_email_mock, \
+    with patch("django.core.mail.backends.locmem.EmailBackend.send_messages") as send_messages_mock, \
          patch("taiga.projects.notifications.services.logger") as logger_mock:
-        email_mock = Mock()
-        email_mock.send.side_effect = smtplib.SMTPDataError(msg="error smtp", code=123)
-        make_template_email_mock.return_value = email_mock
+        send_messages_mock.side_effect = smtplib.SMTPDataError(msg="error smtp", code=123)
 
         assert models.HistoryChangeNotification.objects.count() == 3
         assert len(mail.outbox) == 0
@@ -1512,3 +1548,179 @@ def test_smtp_error_sending_notifications(settings, mail):
         assert len(mail.outbox) == 0
 
         assert logger_mock.exception.call_count == 3
+
+
+def _create_user_story_change_notification(project, changer, owner, watchers=[]):
+    us = f.UserStoryFactory.create(project=project, owner=owner)
+    for watcher in watchers:
+        us.add_watcher(watcher)
+
+    history_change = f.HistoryEntryFactory.create(
+        project=project,
+        user={"pk": changer.id},
+        comment="test:change",
+        type=HistoryType.change,
+        key="userstories.userstory:{}".format(us.id),
+        is_hidden=False,
+        diff=[]
+    )
+    take_snapshot(us, user=us.owner)
+    services.send_notifications(us, history=history_change)
+    return us
+
+
+def test_send_notifications_renders_once_per_language(settings, mail):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues', 'view_us', 'view_tasks', 'view_wiki_pages'])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role, user__lang="en", user__full_name="Ann <One>")
+    member3 = f.MembershipFactory.create(project=project, role=role, user__lang="es", user__full_name="Bob Two")
+    member4 = f.MembershipFactory.create(project=project, role=role, user__lang="en", user__full_name="Carl Three")
+
+    _create_user_story_change_notification(project, member1.user, member2.user, [member3.user, member4.user])
+    models.HistoryChangeNotification.objects.update(updated_datetime=timezone.now() - datetime.timedelta(minutes=1))
+
+    with patch.object(InlineCSSTemplateMail, "_render_message_body_as_html", autospec=True,
+                      side_effect=InlineCSSTemplateMail._render_message_body_as_html) as render_mock:
+        services.process_sync_notifications()
+
+    assert render_mock.call_count == 2
+    assert len(mail.outbox) == 3
+
+    messages = {msg.to[0]: msg for msg in mail.outbox}
+    assert set(messages.keys()) == {member2.user.email, member3.user.email, member4.user.email}
+    for member in (member2, member3, member4):
+        msg = messages[member.user.email]
+        assert member.user.get_full_name() in msg.body
+        assert services._RecipientPlaceholder.full_name not in msg.body
+        assert services._RecipientPlaceholder.full_name not in msg.alternatives[0][0]
+    assert "Ann &lt;One&gt;" in messages[member2.user.email].alternatives[0][0]
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP server: accepts every message and counts connections
+    and messages. Once "drop_after" messages are received, the next
+    command closes the connection (only once).
+    """
+    def handle(self):
+        stats = self.server.stats
+        stats["connections"] += 1
+        self.wfile.write(b"220 localhost\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if stats["drop_after"] is not None and stats["messages"] >= stats["drop_after"]:
+                stats["drop_after"] = None
+                return
+            command = line.decode().strip().upper()
+            if command.startswith("EHLO") or command.startswith("HELO"):
+                self.wfile.write(b"250 localhost\r\n")
+            elif command == "DATA":
+                self.wfile.write(b"354 go ahead\r\n")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                stats["messages"] += 1
+                self.wfile.write(b"250 OK\r\n")
+            elif command == "QUIT":
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SMTPHandler)
+    server.daemon_threads = True
+    server.stats = {"connections": 0, "messages": 0, "drop_after": None}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+    settings.EMAIL_HOST = "127.0.0.1"
+    settings.EMAIL_PORT = server.server_address[1]
+    settings.EMAIL_USE_TLS = False
+    settings.EMAIL_USE_SSL = False
+    yield server.stats
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_send_bulk_email_reuses_smtp_connection(settings, smtp_server):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+    settings.NOTIFICATIONS_SEND_WORKERS = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues', 'view_us', 'view_tasks', 'view_wiki_pages'])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+    member3 = f.MembershipFactory.create(project=project, role=role)
+
+    for x in range(5):
+        _create_user_story_change_notification(project, member1.user, member2.user, [member3.user])
+    models.HistoryChangeNotification.objects.update(updated_datetime=timezone.now() - datetime.timedelta(minutes=1))
+
+    stats = services.send_bulk_email(batch_size=3)
+
+    assert stats["pending"] == 5
+    assert stats["sent"] == 5
+    assert models.HistoryChangeNotification.objects.count() == 0
+    assert smtp_server["messages"] == 10
+    # One connection per batch
+    assert smtp_server["connections"] == 2
+
+
+def test_send_bulk_email_reconnects_when_the_smtp_server_disconnects(settings, smtp_server):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+    settings.NOTIFICATIONS_SEND_WORKERS = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues', 'view_us', 'view_tasks', 'view_wiki_pages'])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+    member3 = f.MembershipFactory.create(project=project, role=role)
+
+    for x in range(5):
+        _create_user_story_change_notification(project, member1.user, member2.user, [member3.user])
+    models.HistoryChangeNotification.objects.update(updated_datetime=timezone.now() - datetime.timedelta(minutes=1))
+
+    # The connection is dropped in the middle of the first batch
+    smtp_server["drop_after"] = 3
+    stats = services.send_bulk_email(batch_size=5)
+
+    assert stats["sent"] == 5
+    assert models.HistoryChangeNotification.objects.count() == 0
+    assert smtp_server["messages"] == 10
+    assert smtp_server["connections"] == 2
+
+
+def test_send_bulk_email_keeps_the_notifications_not_sent(settings, smtp_server):
+    settings.CHANGE_NOTIFICATIONS_MIN_INTERVAL = 1
+    settings.NOTIFICATIONS_SEND_WORKERS = 1
+
+    project = f.ProjectFactory.create()
+    role = f.RoleFactory.create(project=project, permissions=['view_issues', 'view_us', 'view_tasks', 'view_wiki_pages'])
+    member1 = f.MembershipFactory.create(project=project, role=role)
+    member2 = f.MembershipFactory.create(project=project, role=role)
+
+    for x in range(3):
+        _create_user_story_change_notification(project, member1.user, member2.user, [])
+    models.HistoryChangeNotification.objects.update(updated_datetime=timezone.now() - datetime.timedelta(minutes=1))
+
+    with patch("django.core.mail.backends.smtp.EmailBackend.send_messages",
+               side_effect=smtplib.SMTPServerDisconnected("Connection unexpectedly closed")):
+        stats = services.send_bulk_email(batch_size=5)
+
+    assert stats["sent"] == 0
+    assert models.HistoryChangeNotification.objects.count() == 3
+
+    stats = services.send_bulk_email(batch_size=5)
+
+    assert stats["sent"] == 3
+    assert models.HistoryChangeNotification.objects.count() == 0
+    assert smtp_server["messages"] == 3
@@ -120,3 +120,69 @@ def test_authenticated_user_has_perm_on_project_related_object():
 def test_authenticated_user_has_perm_on_invalid_object():
     user1 = factories.UserFactory()
     assert services.user_has_perm(user1, "test", user1) is False
+
+
+def test_user_project_permissions_are_cached_by_user():
+    user1 = factories.UserFactory()
+    project = factories.ProjectFactory()
+    role = factories.RoleFactory(permissions=["test1"])
+    factories.MembershipFactory(user=user1, project=project, role=role)
+
+    assert services.user_has_perm(user1, "test1", project) is True
+    permissions = services.get_user_project_permissions(user1, project)
+    assert isinstance(permissions, frozenset)
+    assert services.get_user_project_permissions(user1, project) is permissions
+
+
+def test_user_project_permissions_cache_is_invalidated_on_changes():
+    user1 = factories.UserFactory()
+    project = factories.ProjectFactory(anon_permissions=[], public_permissions=[])
+    role = factories.RoleFactory(permissions=["test1"])
+    membership = factories.MembershipFactory(user=user1, project=project, role=role)
+
+    assert services.user_has_perm(user1, "test2", project) is False
+
+    role.permissions = ["test1", "test2"]
+    role.save()
+    assert services.user_has_perm(user1, "test2", project) is True
+
+    membership.is_admin = True
+    membership.save()
+    assert services.user_has_perm(user1, "admin_project_values", project) is True
+
+    project.public_permissions = ["test3"]
+    project.save()
+    assert services.user_has_perm(user1, "test3", project) is True
+
+
+def test_calculate_permissions_with_precomputed_sets():
+    admin_permissions = services.calculate_permissions(is_authenticated=True, is_member=True, is_admin=True,
+                                                       role_permissions=["test1"])
+    assert admin_permissions == services.ADMINS_PERMISSIONS_SET | services.MEMBERS_PERMISSIONS_SET | {"test1"}
+
+    superuser_permissions = services.calculate_permissions(is_superuser=True, public_permissions=["test1"])
+    assert "test1" not in superuser_permissions
+    assert services.ANON_PERMISSIONS_SET <= superuser_permissions
+
+    # The returned set is a copy
+    admin_permissions.add("test2")
+    assert "test2" not in services.calculate_permissions(is_authenticated=True, is_member=True, is_admin=True,
+                                                         role_permissions=["test1"])
+
+
+def test_user_has_perm_with_the_cache_matches_resolving_the_permissions(django_assert_num_queries):
+    user1 = factories.UserFactory()
+    project = factories.ProjectFactory(anon_permissions=list(services.ANON_PERMISSIONS_SET),
+                                       public_permissions=list(services.ANON_PERMISSIONS_SET))
+    role = factories.RoleFactory(permissions=list(services.MEMBERS_PERMISSIONS_SET))
+    factories.MembershipFactory(user=user1, project=project, role=role)
+    perms = sorted(services.ADMINS_PERMISSIONS_SET | services.MEMBERS_PERMISSIONS_SET) + ["test"]
+
+    resolved = []
+    for perm in perms:
+        user1._cached_project_permissions = None
+        resolved.append(services.user_has_perm(user1, perm, project))
+
+    with django_assert_num_queries(0):
+        cached = [services.user_has_perm(user1, perm, project) for perm in perms]
+    assert cached == resolved
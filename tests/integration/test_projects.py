@@ -10,11 +10,16 @@ from django.conf import settings
 from django.core.files import File
 from django.core import mail
 from django.core import signing
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from taiga.base import exceptions as exc
 from taiga.base.utils import json
 from taiga.projects.services import stats as stats_services
-from taiga.projects.history.services import take_snapshot
+from taiga.projects.services.deletion import delete_project_content
+from taiga.projects.tagging import services as tagging_services
+from taiga.projects.history.models import HistoryEntry
+from taiga.projects.history.services import make_key_from_model_object, take_snapshot
 from taiga.permissions.choices import ANON_PERMISSIONS
 from taiga.projects.models import Project, Swimlane
 from taiga.projects.userstories.models import UserStory
@@ -92,6 +97,60 @@ def test_get_private_project_by_slug(client):
     assert response.status_code == 200
 
 
+def test_get_project_detail_uses_the_cached_config(client):
+    project = f.create_project()
+    f.MembershipFactory(user=project.owner, project=project, is_admin=True)
+    f.UserStoryStatusFactory.create(project=project, name="New")
+    url = reverse("projects-detail", kwargs={"pk": project.id})
+
+    client.login(project.owner)
+    with CaptureQueriesContext(connection) as first_queries:
+        first_response = client.json.get(url)
+    with CaptureQueriesContext(connection) as cached_queries:
+        cached_response = client.json.get(url)
+
+    assert first_response.status_code == 200
+    assert cached_response.status_code == 200
+    assert cached_response.data == first_response.data
+    assert "New" in [s["name"] for s in cached_response.data["us_statuses"]]
+    assert len(cached_queries) < len(first_queries)
+
+
+def test_get_project_detail_after_changing_its_config(client):
+    project = f.create_project()
+    f.MembershipFactory(user=project.owner, project=project, is_admin=True)
+    status1 = f.UserStoryStatusFactory.create(project=project, name="New", order=101)
+    status2 = f.UserStoryStatusFactory.create(project=project, name="Done", order=102)
+    url = reverse("projects-detail", kwargs={"pk": project.id})
+
+    def get_statuses(data):
+        return [s["name"] for s in data["us_statuses"] if s["id"] in (status1.id, status2.id)]
+
+    client.login(project.owner)
+    response = client.json.get(url)
+    assert get_statuses(response.data) == ["New", "Done"]
+
+    status1.name = "Ready"
+    status1.save()
+    f.IssueTypeFactory.create(project=project, name="Bug")
+    project.owner.full_name = "Project owner"
+    project.owner.save()
+
+    response = client.json.get(url)
+    assert get_statuses(response.data) == ["Ready", "Done"]
+    assert "Bug" in [t["name"] for t in response.data["issue_types"]]
+    assert "Project owner" in [m["full_name"] for m in response.data["members"]]
+
+    # The orders are updated in bulk without signals
+    bulk_url = reverse("userstory-statuses-bulk-update-order")
+    data = {"project": project.id, "bulk_userstory_statuses": [[status1.id, 103]]}
+    response = client.json.post(bulk_url, json.dumps(data))
+    assert response.status_code == 204
+
+    response = client.json.get(url)
+    assert get_statuses(response.data) == ["Done", "Ready"]
+
+
 def test_create_project(client):
     user = f.create_user()
     url = reverse("projects-list")
@@ -1913,6 +1972,39 @@ def test_delete_project_with_celery_disabled(client, settings):
     assert Project.objects.filter(id=project.id).count() == 0
 
 
+def test_delete_project_content_in_chunks():
+    project = f.ProjectFactory.create()
+    f.MembershipFactory.create(project=project, user=project.owner, is_admin=True)
+    user_stories = [f.UserStoryFactory.create(project=project) for i in range(5)]
+    f.TaskFactory.create(project=project, user_story=user_stories[0])
+    f.IssueFactory.create(project=project)
+    epic = f.EpicFactory.create(project=project)
+    f.RelatedUserStory.create(epic=epic, user_story=user_stories[1])
+    attachment = f.UserStoryAttachmentFactory.create(project=project, content_object=user_stories[2])
+    for user_story in user_stories:
+        f.HistoryEntryFactory.create(project=project, key=make_key_from_model_object(user_story))
+
+    progress = []
+    with mock.patch("taiga.projects.services.deletion.remove_files_on_delete") as remove_files_mock:
+        deleted = delete_project_content(project, chunk_size=2,
+                                         progress=lambda label, count: progress.append((label, count)))
+
+    assert deleted["userstories.UserStory"] == 5
+    assert deleted["history.HistoryEntry"] == 5
+    assert ("userstories.UserStory", 2) in progress
+    assert ("userstories.UserStory", 5) in progress
+    assert remove_files_mock.call_count == 1
+    assert remove_files_mock.call_args[0][1].id == attachment.id
+
+    assert Project.objects.filter(id=project.id).exists()
+    for related in ("user_stories", "tasks", "issues", "epics", "memberships", "roles", "attachments"):
+        assert not getattr(project, related).exists(), related
+    assert not HistoryEntry.objects.filter(project=project).exists()
+
+    project.delete()
+    assert not Project.objects.filter(id=project.id).exists()
+
+
 ####################################################################################
 # test project tags
 ####################################################################################
@@ -2115,6 +2207,64 @@ def test_mix_tags(client, settings):
     assert set(epic.tags) == set(["tag2", "tag3"])
 
 
+def _get_tags_counts(project, element):
+    return dict(project.tags_counts.filter(element=element, count__gt=0).values_list("tag", "count"))
+
+
+def test_tags_counts_are_updated_with_the_elements():
+    project = f.ProjectFactory.create()
+    user_story1 = f.UserStoryFactory.create(project=project, tags=["tag1", "tag2"])
+    user_story2 = f.UserStoryFactory.create(project=project, tags=["tag1"])
+    f.TaskFactory.create(project=project, tags=["tag1"])
+    assert _get_tags_counts(project, "userstories") == {"tag1": 2, "tag2": 1}
+    assert _get_tags_counts(project, "tasks") == {"tag1": 1}
+
+    user_story1.tags = ["tag2", "tag3"]
+    user_story1.save()
+    user_story2.delete()
+    assert _get_tags_counts(project, "userstories") == {"tag2": 1, "tag3": 1}
+
+
+def test_tags_counts_are_updated_on_mix_tags():
+    project = f.ProjectFactory.create(tags_colors=[("tag1", "#123123"), ("tag2", "#123123"), ("tag3", "#123123")])
+    f.UserStoryFactory.create(project=project, tags=["tag1", "tag2", "tag3"])
+    f.UserStoryFactory.create(project=project, tags=["tag1"])
+    f.UserStoryFactory.create(project=project, tags=["tag3"])
+
+    tagging_services.mix_tags(project, ["tag1", "tag2"], "tag3")
+
+    assert _get_tags_counts(project, "userstories") == {"tag3": 3}
+    assert tagging_services.get_project_tags_counts(project, "userstories") == [
+        {"name": "tag3", "color": "#123123", "count": 3},
+    ]
+
+
+def test_filters_data_tags_from_tags_counts(client):
+    user = f.UserFactory.create()
+    project = f.ProjectFactory.create(owner=user, tags_colors=[("tag1", None), ("tag2", "#123123"), ("tag3", None)])
+    f.MembershipFactory.create(project=project, user=user, is_admin=True)
+    f.UserStoryFactory.create(project=project, tags=["tag1", "tag2"])
+    f.UserStoryFactory.create(project=project, tags=["tag1"])
+
+    client.login(user)
+    url = reverse("userstories-filters-data")
+
+    with mock.patch("taiga.projects.userstories.services.get_tags_filters_data") as get_tags_mock:
+        response = client.get(url + "?project={}".format(project.id))
+    assert response.status_code == 200
+    assert get_tags_mock.call_count == 0
+    assert response.data["tags"] == [
+        {"name": "tag1", "color": None, "count": 2},
+        {"name": "tag2", "color": "#123123", "count": 1},
+        {"name": "tag3", "color": None, "count": 0},
+    ]
+
+    # Filtered requests can not use them
+    response = client.get(url + "?project={}&q=unknown".format(project.id))
+    assert response.status_code == 200
+    assert [tag["count"] for tag in response.data["tags"]] == [0, 0, 0]
+
+
 def test_color_tags_project_fired_on_element_create():
     user_story = f.UserStoryFactory.create(tags=["tag"])
     project = Project.objects.get(id=user_story.project.id)
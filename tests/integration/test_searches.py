@@ -5,13 +5,18 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import random
+
 import pytest
 
 from django.urls import reverse
 
 from .. import factories as f
 
+from taiga.base.utils.db import to_tsquery
 from taiga.permissions.choices import MEMBERS_PERMISSIONS
+from taiga.projects.userstories.models import UserStory
+from taiga.searches import services
 from tests.utils import disconnect_signals, reconnect_signals
 
 
@@ -140,3 +145,103 @@ def test_search_text_query_with_an_invalid_project_id(client, searches_initial_d
 
     response = client.get(reverse("search-list"), {"project": "new", "text": "future"})
     assert response.status_code == 404
+
+
+def test_search_with_an_invalid_cursor(client, searches_initial_data):
+    data = searches_initial_data
+
+    client.login(data.member1.user)
+
+    response = client.get(reverse("search-list"), {"project": data.project1.id, "text": "future", "cursor": "x"})
+    assert response.status_code == 400
+
+
+def test_search_ranks_all_types_together(searches_initial_data):
+    data = searches_initial_data
+    types = ["epics", "userstories", "tasks", "issues", "wikipages"]
+
+    results, cursor = services.search(data.project1, "future", types)
+
+    assert cursor is None
+    # Matches in the subject rank before matches in the tags and these before
+    # matches in the description
+    assert results["epics"] == [data.epic11, data.epic12, data.epic14]
+    assert results["userstories"] == [data.us11, data.us13, data.us12]
+    assert results["wikipages"] == []
+
+
+def test_search_paginates_with_a_cursor(searches_initial_data, django_assert_max_num_queries):
+    data = searches_initial_data
+    types = ["epics", "userstories", "tasks"]
+
+    pages = []
+    cursor = None
+    while True:
+        # The ranked query and one query for every type of the page
+        with django_assert_max_num_queries(1 + len(types)):
+            results, cursor = services.search(data.project1, "back", types, limit=4, cursor=cursor)
+        pages.append(results)
+        if cursor is None:
+            break
+
+    assert [sum(len(objs) for objs in page.values()) for page in pages] == [4, 4, 1]
+    found = [obj for page in pages for search_type in types for obj in page[search_type]]
+    assert len(found) == len(set(found)) == 9
+
+
+def test_search_only_the_given_types(searches_initial_data):
+    data = searches_initial_data
+
+    results, cursor = services.search(data.project1, "", ["issues"])
+
+    assert set(results) == {"issues"}
+    assert set(results["issues"]) == {data.issue11, data.issue12, data.issue13, data.issue14}
+
+
+def test_search_vector_follows_the_changes(searches_initial_data):
+    data = searches_initial_data
+
+    data.us14.subject = "Flux capacitor"
+    data.us14.save()
+    UserStory.objects.filter(id=data.us11.id).update(subject="Delorean")
+
+    assert list(services.search_user_stories(data.project1, "flux")) == [data.us14]
+    assert list(services.search_user_stories(data.project1, "delorean")) == [data.us11]
+    assert set(services.search_user_stories(data.project1, "future")) == {data.us12, data.us13}
+
+    data.wikipage11.content = "Flux capacitor"
+    data.wikipage11.save()
+
+    assert list(services.search_wiki_pages(data.project1, "flux")) == [data.wikipage11]
+
+
+INLINE_SEARCH_VECTOR = """
+    setweight(to_tsvector('simple',
+                          coalesce(userstories_userstory.subject) || ' ' ||
+                          coalesce(userstories_userstory.ref)), 'A') ||
+    setweight(to_tsvector('simple', coalesce(inmutable_array_to_string(userstories_userstory.tags))), 'B') ||
+    setweight(to_tsvector('simple', coalesce(userstories_userstory.description)), 'C')
+"""
+
+
+def test_search_vector_matches_as_the_inline_vector():
+    words = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliet"]
+    rand = random.Random(300)
+    project = f.ProjectFactory.create()
+    status = f.UserStoryStatusFactory.create(project=project)
+    UserStory.objects.bulk_create([
+        UserStory(project=project, status=status, ref=i, subject=" ".join(rand.sample(words, 2)),
+                  description=" ".join(rand.choice(words) for j in range(2)), modified_date=project.created_date)
+        for i in range(300)
+    ])
+
+    for text in ["juliet alpha", "bravo", "charlie delta echo"]:
+        inline = UserStory.objects.filter(project=project).extra(
+            where=["{} @@ to_tsquery('simple', %s)".format(INLINE_SEARCH_VECTOR)],
+            params=[to_tsquery(text)]
+        )
+        inline_ids = set(inline.values_list("id", flat=True))
+        stored_ids = {us.id for us in services.search_user_stories(project, text)}
+
+        assert len(inline_ids) <= services.MAX_RESULTS
+        assert stored_ids == inline_ids
@@ -7,6 +7,7 @@
 
 import uuid
 import csv
+import io
 import pytz
 
 from datetime import datetime, timedelta
@@ -679,8 +680,7 @@ def test_custom_fields_csv_generation():
     attr_values.save()
     queryset = project.tasks.all()
     data = services.tasks_to_csv(project, queryset)
-    data.seek(0)
-    reader = csv.reader(data)
+    reader = csv.reader(io.StringIO("".join(data)))
     row = next(reader)
     assert row[28] == attr.name
     row = next(reader)
@@ -10,6 +10,8 @@ import pytz
 from datetime import datetime, timedelta
 import pytest
 
+from unittest.mock import patch
+
 from .. import factories
 from django.contrib.auth.models import AnonymousUser
 from taiga.timeline.service import build_project_namespace, build_user_namespace, get_timeline
@@ -263,6 +265,28 @@ def test_update_milestone_timeline():
     assert user_watcher_timeline[0].data["values_diff"]["name"][1] == "test milestone timeline updated"
 
 
+def test_push_to_timelines_creates_watchers_entries_in_bulk():
+    user_story = factories.UserStoryFactory.create(subject="test us timeline")
+    watchers = [factories.UserFactory() for x in range(10)]
+    for watcher in watchers:
+        user_story.add_watcher(watcher)
+
+    Timeline.objects.all().delete()
+    with patch.object(Timeline.objects, "bulk_create", wraps=Timeline.objects.bulk_create) as bulk_create_mock, \
+            patch.object(Timeline.objects, "create") as create_mock:
+        service.push_to_timelines(user_story.project.id, user_story.owner.id, "userstories", "userstory",
+                                  user_story.id, "create", user_story.created_date,
+                                  extra_data={"values_diff": {}}, refresh_totals=False)
+
+    assert bulk_create_mock.call_count == 1
+    assert create_mock.call_count == 0
+    for watcher in watchers:
+        timeline = service.get_profile_timeline(watcher)
+        assert timeline.count() == 1
+        assert timeline[0].data["userstory"]["subject"] == "test us timeline"
+    assert service.get_project_timeline(user_story.project).count() == 1
+
+
 def test_update_user_story_timeline():
     user_watcher= factories.UserFactory()
     user_story = factories.UserStoryFactory.create(subject="test us timeline")
@@ -148,3 +148,77 @@ def test_project_totals_updated_on_like(client):
     assert project.total_fans_last_month == 2
     assert project.total_fans_last_year == 3
     assert project.totals_updated_datetime > totals_updated_datetime
+
+
+def test_project_totals_refresh_is_deferred(settings):
+    from taiga.projects.services import totals
+
+    settings.CELERY_ENABLED = True
+    settings.PROJECT_TOTALS_REFRESH_INTERVAL = 60
+
+    project = f.create_project()
+    other_project = f.create_project()
+    now = timezone.now()
+
+    totals.add_to_project_totals(project.id, totals.ACTIVITY, now)
+    totals.add_to_project_totals(project.id, totals.ACTIVITY, now - datetime.timedelta(days=10))
+    totals.add_to_project_totals(project.id, totals.FANS, now)
+
+    # The project row is not touched until the periodic task runs
+    project = Project.objects.get(id=project.id)
+    assert project.total_activity == 0
+    assert project.total_fans == 0
+
+    assert totals.refresh_projects_totals_from_buckets() == 1
+
+    project = Project.objects.get(id=project.id)
+    assert project.total_activity == 2
+    assert project.total_activity_last_week == 1
+    assert project.total_activity_last_month == 2
+    assert project.total_fans == 1
+    assert project.total_fans_last_week == 1
+
+    # Nothing changed, nothing to refresh
+    assert totals.refresh_projects_totals_from_buckets() == 0
+    other_project = Project.objects.get(id=other_project.id)
+    assert other_project.total_activity == 0
+
+
+def test_project_totals_windows_roll_forward(settings):
+    from taiga.projects.services import totals
+
+    settings.CELERY_ENABLED = True
+    settings.PROJECT_TOTALS_REFRESH_INTERVAL = 60
+
+    project = f.create_project()
+    now = timezone.now()
+    totals.add_to_project_totals(project.id, totals.ACTIVITY, now)
+    totals.refresh_projects_totals_from_buckets(now=now)
+
+    project = Project.objects.get(id=project.id)
+    assert project.total_activity_last_week == 1
+
+    # Ten days later the activity is not in the last week window anymore
+    later = now + datetime.timedelta(days=10)
+    assert totals.refresh_projects_totals_from_buckets(now=later) == 1
+
+    project = Project.objects.get(id=project.id)
+    assert project.total_activity == 1
+    assert project.total_activity_last_week == 0
+    assert project.total_activity_last_month == 1
+
+
+def test_project_totals_updated_on_unlike(client):
+    project = f.create_project()
+    f.MembershipFactory.create(project=project, user=project.owner, is_admin=True)
+
+    client.login(project.owner)
+    client.post(reverse("projects-like", args=(project.id,)))
+    project = Project.objects.get(id=project.id)
+    assert project.total_fans == 1
+    assert project.total_fans_last_week == 1
+
+    client.post(reverse("projects-unlike", args=(project.id,)))
+    project = Project.objects.get(id=project.id)
+    assert project.total_fans == 0
+    assert project.total_fans_last_week == 0
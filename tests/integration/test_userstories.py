@@ -7,17 +7,24 @@
 
 import uuid
 import csv
+import io
 import pytz
+import gzip
+import random
 
 from datetime import datetime, timedelta
 from urllib.parse import quote
 
 from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from taiga.base.utils import json
 from taiga.permissions.choices import MEMBERS_PERMISSIONS, ANON_PERMISSIONS
+from taiga.projects.epics.models import RelatedUserStory
 from taiga.projects.occ import OCCResourceMixin
+from taiga.projects.services import get_facets_counts
 from taiga.projects.userstories import services, models
 
 from .. import factories as f
@@ -1199,6 +1206,63 @@ def test_api_filters_data_roles_with_assigned_users(client):
                        response.data["roles"]))["count"] == 1
 
 
+def test_api_filters_data_scans_the_user_stories_once(client):
+    data = create_uss_fixtures()
+    project = data["project"]
+    (user1, user2, user3, ) = data["users"]
+
+    url = reverse("userstories-filters-data") + "?project={}&status={}".format(project.id, data["statuses"][0].id)
+    client.login(user1)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert list(response.data.keys()) == ["statuses", "assigned_to", "assigned_users", "owners",
+                                          "tags", "epics", "roles"]
+    scans = [query for query in queries if 'FROM "userstories_userstory"' in query["sql"]]
+    assert len(scans) == 1
+
+
+def test_get_facets_counts_scanning_once_matches_the_counts_by_facet():
+    rand = random.Random(200)
+    project = f.ProjectFactory.create()
+    statuses = [f.UserStoryStatusFactory.create(project=project) for i in range(3)]
+    members = [f.MembershipFactory.create(project=project).user for i in range(4)]
+    epics = [f.EpicFactory.create(project=project) for i in range(3)]
+    tags = ["tag{}".format(i) for i in range(5)]
+    project.tags_colors = [[tag, None] for tag in tags]
+    project.save()
+
+    uss = models.UserStory.objects.bulk_create([
+        models.UserStory(project=project, status=rand.choice(statuses), ref=i, subject="US {}".format(i),
+                         owner=rand.choice(members), assigned_to=rand.choice(members + [None]),
+                         tags=rand.sample(tags, 2), modified_date=project.created_date)
+        for i in range(200)
+    ])
+    RelatedUserStory.objects.bulk_create([
+        RelatedUserStory(user_story=us, epic=rand.choice(epics)) for us in uss if rand.random() < 0.5
+    ])
+    models.UserStory.assigned_users.through.objects.bulk_create([
+        models.UserStory.assigned_users.through(userstory=us, user=user)
+        for us in uss for user in rand.sample(members, rand.randint(0, 2))
+    ])
+
+    queryset = models.UserStory.objects.filter(project=project)
+    querysets = {name: queryset.exclude(status=statuses[0]) if name != "statuses" else queryset
+                 for name in services.USERSTORIES_FILTERS_FACETS}
+
+    by_facet = {name: get_facets_counts({name: querysets[name]}, services.USERSTORIES_FILTERS_JOINS,
+                                        services.USERSTORIES_FILTERS_COLUMNS, {name: facet})[name]
+                for name, facet in services.USERSTORIES_FILTERS_FACETS.items()}
+    all_facets = get_facets_counts(querysets, services.USERSTORIES_FILTERS_JOINS,
+                                   services.USERSTORIES_FILTERS_COLUMNS, services.USERSTORIES_FILTERS_FACETS)
+    filters_data = services.get_userstories_filters_data(project, querysets)
+
+    assert all_facets == by_facet
+    assert sum(status["count"] for status in filters_data["statuses"]) == 200
+
+
 def test_get_invalid_csv(client):
     url = reverse("userstories-csv")
     project = f.ProjectFactory.create()
@@ -1231,8 +1295,7 @@ def test_custom_fields_csv_generation():
     attr_values.save()
     queryset = project.user_stories.all()
     data = services.userstories_to_csv(project, queryset)
-    data.seek(0)
-    reader = csv.reader(data)
+    reader = csv.reader(io.StringIO("".join(data)))
     row = next(reader)
 
     assert row.pop() == attr.name
@@ -1240,6 +1303,51 @@ def test_custom_fields_csv_generation():
     assert row.pop() == "val1"
 
 
+def test_get_valid_csv_streamed_with_gzip(client):
+    url = reverse("userstories-csv")
+    project = f.ProjectFactory.create(userstories_csv_uuid=uuid.uuid4().hex)
+    us = f.UserStoryFactory.create(project=project, subject="Ñandú")
+
+    response = client.get("{}?uuid={}".format(url, project.userstories_csv_uuid),
+                          HTTP_ACCEPT_ENCODING="gzip, deflate")
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Encoding"] == "gzip"
+    assert response["Content-Disposition"] == 'attachment; filename="userstories.csv"'
+
+    content = gzip.decompress(b"".join(response.streaming_content)).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert [(row["ref"], row["subject"]) for row in rows] == [(str(us.ref), "Ñandú")]
+
+
+def test_csv_generation_loads_the_user_stories_in_chunks(settings):
+    settings.CSV_EXPORT_CHUNK_SIZE = 2
+    project = f.ProjectFactory.create()
+    f.RoleFactory.create(project=project, computable=True)
+    user = f.UserFactory.create()
+    uss = [f.UserStoryFactory.create(project=project) for i in range(6)]
+    for us in uss:
+        us.assigned_users.add(user)
+        f.TaskFactory.create(project=project, user_story=us)
+        f.UserStoryAttachmentFactory.create(project=project, content_object=us)
+
+    def export(total):
+        queryset = project.user_stories.filter(id__in=[us.id for us in uss[:total]]).order_by("ref")
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(csv.DictReader(io.StringIO("".join(services.userstories_to_csv(project, queryset)))))
+        return rows, len(queries)
+
+    rows, two_queries = export(2)
+    rows, four_queries = export(4)
+    rows, six_queries = export(6)
+
+    assert [row["ref"] for row in rows] == [str(us.ref) for us in sorted(uss, key=lambda us: us.ref)]
+    assert {row["assigned_users"] for row in rows} == {user.username}
+    assert {row["attachments"] for row in rows} == {"1"}
+    # The same queries are done for every chunk
+    assert six_queries - four_queries == four_queries - two_queries
+
+
 def test_update_userstory_respecting_watchers(client):
     watching_user = f.create_user()
     project = f.ProjectFactory.create()
@@ -1027,3 +1027,86 @@ def test_userstories_are_opened_after_moving_in_bulk_to_a_opened_status(send_req
     assert not us2.is_closed and us2.status == status_opened
     assert HistoryEntry.objects.all().count() == 2
     assert send_request_mock.call_count == 2
+
+
+def _create_kanban_column(project, status, total, gap):
+    return [f.create_userstory(project=project, status=status, kanban_order=gap * (i + 1), swimlane=None)
+            for i in range(total)]
+
+
+def test_update_kanban_order_with_gap_only_updates_the_moved_userstories(settings):
+    settings.USERSTORIES_ORDER_GAP = 1000
+    project = f.create_project()
+    status = f.UserStoryStatusFactory.create(project=project)
+    us1, us2, us3, us4 = _create_kanban_column(project, status, 4, 1000)
+
+    with mock.patch("taiga.projects.userstories.services.events.emit_event_for_ids") as emit_mock:
+        res = list(services.update_userstories_kanban_order_in_bulk(project.owner, project, status,
+                                                                    [us4.id, us3.id],
+                                                                    after_userstory=us1))
+
+    assert [r["id"] for r in res] == [us4.id, us3.id]
+    assert list(emit_mock.call_args[1]["ids"]) == [us4.id, us3.id]
+    assert (list(project.user_stories.order_by("kanban_order", "id").values_list("id", "kanban_order")) ==
+            [(us1.id, 1000), (us4.id, 1333), (us3.id, 1666), (us2.id, 2000)])
+
+
+def test_update_kanban_order_with_gap_before_and_at_the_beginning(settings):
+    settings.USERSTORIES_ORDER_GAP = 1000
+    project = f.create_project()
+    status = f.UserStoryStatusFactory.create(project=project)
+    us1, us2, us3 = _create_kanban_column(project, status, 3, 1000)
+
+    res = list(services.update_userstories_kanban_order_in_bulk(project.owner, project, status,
+                                                                [us3.id], before_userstory=us2))
+    assert res[0]["kanban_order"] == 1500
+
+    res = list(services.update_userstories_kanban_order_in_bulk(project.owner, project, status, [us2.id]))
+    assert res[0]["kanban_order"] == 0
+
+    assert (list(project.user_stories.order_by("kanban_order", "id").values_list("id", flat=True)) ==
+            [us2.id, us1.id, us3.id])
+
+
+def test_update_kanban_order_with_gap_rebalances_the_column_when_there_is_no_room(settings):
+    settings.USERSTORIES_ORDER_GAP = 10
+    project = f.create_project()
+    status = f.UserStoryStatusFactory.create(project=project)
+    us1 = f.create_userstory(project=project, status=status, kanban_order=1, swimlane=None)
+    us2 = f.create_userstory(project=project, status=status, kanban_order=2, swimlane=None)
+    us3 = f.create_userstory(project=project, status=status, kanban_order=3, swimlane=None)
+
+    res = list(services.update_userstories_kanban_order_in_bulk(project.owner, project, status,
+                                                                [us3.id], after_userstory=us1))
+
+    assert [(r["id"], r["kanban_order"]) for r in res] == [(us1.id, 10), (us3.id, 20), (us2.id, 30)]
+    assert (list(project.user_stories.order_by("kanban_order").values_list("id", "kanban_order")) ==
+            [(us1.id, 10), (us3.id, 20), (us2.id, 30)])
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("gap", [0, 1000])
+def test_update_kanban_order_rows_written_and_events_per_move(settings, gap):
+    settings.USERSTORIES_ORDER_GAP = gap
+    total = 500
+    moves = 50
+    project = f.create_project()
+    status = f.UserStoryStatusFactory.create(project=project)
+    user_stories = _create_kanban_column(project, status, total, gap or 1)
+
+    rows = 0
+    events = 0
+    with mock.patch("taiga.projects.userstories.services.events.emit_event_for_ids") as emit_mock:
+        for i in range(moves):
+            # Move a user story from the end of the column to the middle
+            moved = user_stories[-1 - i]
+            after = user_stories[total // 2 - moves + i]
+            after.refresh_from_db()
+            rows += len(list(services.update_userstories_kanban_order_in_bulk(project.owner, project, status,
+                                                                              [moved.id],
+                                                                              after_userstory=after)))
+            events += len(list(emit_mock.call_args[1]["ids"]))
+
+    if gap:
+        assert rows == moves
+    assert events == rows
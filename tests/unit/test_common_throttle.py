@@ -5,10 +5,15 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import pickle
+import pytest
+from unittest import mock
+
 from django.test import RequestFactory
 from django.core.cache import cache
 from django.contrib.auth.models import AnonymousUser
 
+from taiga.base import throttling_backends
 from taiga.base.throttling import CommonThrottle
 from taiga.users.models import User
 
@@ -282,3 +287,121 @@ def test_not_whitelisted_subnet_anon_throttling(settings, rf):
     cache.clear()
     settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['anon-read'] = None
     settings.REST_FRAMEWORK['DEFAULT_THROTTLE_WHITELIST'] = []
+
+
+def test_zero_rate_blocks_scope(settings, rf):
+    settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['user-write'] = "0/min"
+    request = rf.post("/test")
+    request.user = User(id=1)
+    throttling = CommonThrottle()
+    assert throttling.allow_request(request, None) is False
+    assert throttling.wait() == 60
+    cache.clear()
+    settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['user-write'] = None
+
+
+def test_throttle_wait_and_recovery(settings, rf):
+    settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['user-write'] = ["2/min", "3/hour"]
+    request = rf.post("/test")
+    request.user = User(id=1)
+    throttling = CommonThrottle()
+
+    with mock.patch.object(CommonThrottle, "timer", return_value=1000.0):
+        assert throttling.allow_request(request, None)
+        assert throttling.allow_request(request, None)
+        assert throttling.allow_request(request, None) is False
+        assert throttling.wait() == pytest.approx(30)
+
+    # One request every 30 seconds for the minute rate
+    with mock.patch.object(CommonThrottle, "timer", return_value=1030.0):
+        assert throttling.allow_request(request, None)
+        # ...but the hour rate is exhausted now
+        assert throttling.allow_request(request, None) is False
+        assert throttling.wait() == pytest.approx(1170)
+
+    cache.clear()
+    settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']['user-write'] = None
+
+
+def test_gcra_throttled_requests_are_not_counted():
+    rates = [("1/min", 1, 60)]
+    wait, tats, ttl = throttling_backends.gcra({}, rates, 0)
+    assert (wait, tats, ttl) == (0, {"1/min": 60}, 60)
+
+    for now in range(1, 60, 10):
+        wait, new_tats, ttl = throttling_backends.gcra(tats, rates, now)
+        assert wait == 60 - now
+        assert new_tats is None
+
+    wait, tats, ttl = throttling_backends.gcra(tats, rates, 60)
+    assert wait == 0
+
+
+def test_cache_backend_uses_one_key_per_scope(settings):
+    backend = throttling_backends.CacheThrottleBackend()
+    rates = [("10/min", 10, 60), ("1000/hour", 1000, 3600)]
+    for x in range(10):
+        assert backend.hit("throttle_test_1", rates, 1000.0) == 0
+    assert backend.hit("throttle_test_1", rates, 1000.0) > 0
+
+    assert set(cache.get("throttle_test_1").keys()) == {"10/min", "1000/hour"}
+    cache.clear()
+
+
+def _redis_backend():
+    redis = pytest.importorskip("redis")
+    backend = throttling_backends.RedisThrottleBackend(key_prefix="taiga-tests:")
+    try:
+        backend.client.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip("Redis server not available")
+    return backend
+
+
+def test_redis_backend_matches_cache_backend():
+    redis_backend = _redis_backend()
+    cache_backend = throttling_backends.CacheThrottleBackend()
+    rates = [("3/min", 3, 60), ("5/hour", 5, 3600)]
+    redis_backend.client.delete("taiga-tests:throttle_test_redis")
+
+    for now in [0, 1, 2, 3, 20, 21, 40, 61, 500, 1000]:
+        assert (redis_backend.hit("throttle_test_redis", rates, 1000.0 + now) ==
+                pytest.approx(cache_backend.hit("throttle_test_redis", rates, 1000.0 + now)))
+
+    redis_backend.client.delete("taiga-tests:throttle_test_redis")
+    cache.clear()
+
+
+def _legacy_allow_request(key, rates, now):
+    # Previous implementation: a list of timestamps per rate
+    histories = []
+    for rate_name, num_requests, duration in rates:
+        history = cache.get(key + rate_name, [])
+        while history and history[-1] <= now - duration:
+            history.pop()
+        if len(history) >= num_requests:
+            return False
+        histories.append((key + rate_name, history, duration))
+
+    for rate_key, history, duration in histories:
+        history.insert(0, now)
+        cache.set(rate_key, history, duration)
+    return True
+
+
+def test_cache_backend_state_does_not_grow_with_the_requests():
+    rates = [("1000/hour", 1000, 3600), ("100/min", 100, 60)]
+    backend = throttling_backends.CacheThrottleBackend()
+    cache.clear()
+
+    gcra_sizes = []
+    for x in range(500):
+        # Under both rates, the previous implementation and GCRA allow all the requests
+        assert _legacy_allow_request("legacy", rates, 1000.0 + x * 4)
+        assert backend.hit("gcra", rates, 1000.0 + x * 4) == 0
+        gcra_sizes.append(len(pickle.dumps(cache.get("gcra"))))
+    legacy_size = sum(len(pickle.dumps(cache.get("legacy" + rate[0]))) for rate in rates)
+
+    assert max(gcra_sizes) == min(gcra_sizes)
+    assert gcra_sizes[-1] < legacy_size
+    cache.clear()
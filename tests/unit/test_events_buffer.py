@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+from unittest import mock
+
+import pytest
+
+from django.db import transaction
+
+from taiga.base.utils import json
+from taiga.events.buffer import EventsBuffer
+from taiga.events.events import emit_event
+
+
+def _model_event(pk, type="change", session_id="sid", matches="userstories.userstory"):
+    return {"session_id": session_id, "data": {"type": type, "matches": matches, "pk": pk}}
+
+
+def _messages(buffer):
+    return [(channel, routing_key, json.loads(message)) for channel, routing_key, message in buffer.messages()]
+
+
+def test_single_model_event_keeps_wire_format():
+    buffer = EventsBuffer()
+    buffer.add(_model_event(1), routing_key="changes.project.1.userstories", channel="events")
+
+    assert _messages(buffer) == [
+        ("events", "changes.project.1.userstories", _model_event(1)),
+    ]
+
+
+def test_model_events_are_deduplicated_and_merged():
+    buffer = EventsBuffer()
+    for pk in [1, 2, 1, 3, 2]:
+        buffer.add(_model_event(pk), routing_key="changes.project.1.userstories", channel="events")
+    buffer.add(_model_event([3, 4]), routing_key="changes.project.1.userstories", channel="events")
+
+    assert _messages(buffer) == [
+        ("events", "changes.project.1.userstories", _model_event([1, 2, 3, 4])),
+    ]
+
+
+def test_model_events_are_grouped_by_routing_key_and_type():
+    buffer = EventsBuffer()
+    buffer.add(_model_event(1), routing_key="changes.project.1.userstories", channel="events")
+    buffer.add(_model_event(2, type="delete"), routing_key="changes.project.1.userstories", channel="events")
+    buffer.add(_model_event(3, matches="tasks.task"), routing_key="changes.project.1.tasks", channel="events")
+    buffer.add(_model_event(4), routing_key="changes.project.1.userstories", channel="events")
+
+    assert _messages(buffer) == [
+        ("events", "changes.project.1.userstories", _model_event([1, 4])),
+        ("events", "changes.project.1.userstories", _model_event(2, type="delete")),
+        ("events", "changes.project.1.tasks", _model_event(3, matches="tasks.task")),
+    ]
+
+
+def test_big_pk_lists_are_split_in_several_messages():
+    buffer = EventsBuffer()
+    pks = list(range(100000, 103000))
+    buffer.add(_model_event(pks), routing_key="changes.project.1.userstories", channel="events")
+
+    messages = list(buffer.messages())
+
+    assert len(messages) > 1
+    assert all(len(message.encode("utf-8")) < 8000 for channel, routing_key, message in messages)
+    assert [pk for channel, routing_key, message in messages for pk in json.loads(message)["data"]["pk"]] == pks
+    assert all(json.loads(message) == _model_event(json.loads(message)["data"]["pk"])
+               for channel, routing_key, message in messages)
+
+
+def test_other_events_are_deduplicated_by_content():
+    buffer = EventsBuffer()
+    data = {"session_id": "sid", "data": {"title": "title", "id": 1}}
+    buffer.add(data, routing_key="live_notifications.1", channel="events")
+    buffer.add(data, routing_key="live_notifications.1", channel="events")
+    buffer.add(data, routing_key="live_notifications.2", channel="events")
+
+    assert _messages(buffer) == [
+        ("events", "live_notifications.1", data),
+        ("events", "live_notifications.2", data),
+    ]
+
+
+def test_flush_sends_one_batch_to_the_backend():
+    buffer = EventsBuffer()
+    for pk in range(200):
+        buffer.add(_model_event(pk), routing_key="changes.project.1.userstories", channel="events")
+
+    with mock.patch("taiga.events.buffer.backends.get_events_backend") as get_backend:
+        buffer.flush()
+
+    emit_events = get_backend.return_value.emit_events
+    assert emit_events.call_count == 1
+    events = emit_events.call_args[0][0]
+    assert len(events) == 1
+    assert json.loads(events[0][2])["data"]["pk"] == list(range(200))
+    assert len(buffer) == 0
+
+
+def _emitted_pks(get_backend):
+    return [json.loads(message)["data"]["pk"]
+            for call in get_backend.return_value.emit_events.call_args_list
+            for channel, routing_key, message in call[0][0]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_events_of_rolled_back_savepoints_are_not_sent():
+    routing_key = "changes.project.1.userstories"
+
+    with mock.patch("taiga.events.buffer.backends.get_events_backend") as get_backend:
+        with transaction.atomic():
+            emit_event(_model_event(1)["data"], routing_key=routing_key, sessionid="sid")
+
+            with pytest.raises(ValueError):
+                with transaction.atomic():
+                    emit_event(_model_event(2)["data"], routing_key=routing_key, sessionid="sid")
+                    raise ValueError()
+
+            with transaction.atomic():
+                emit_event(_model_event(3)["data"], routing_key=routing_key, sessionid="sid")
+
+            emit_event(_model_event(4)["data"], routing_key=routing_key, sessionid="sid")
+
+            assert _emitted_pks(get_backend) == []
+
+    assert _emitted_pks(get_backend) == [[1, 4], 3]
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+import pytest
+from unittest import mock
+
+from amqp.exceptions import NotFound
+
+from taiga.events.backends import rabbitmq
+
+
+class FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def exchange_declare(self, **kwargs):
+        self.connection.stats["declares"] += 1
+        self.connection.stats["exchanges"].add(kwargs["exchange"])
+
+    def basic_publish(self, message, routing_key, exchange):
+        if exchange not in self.connection.stats["exchanges"]:
+            self.connection.connected = False
+            raise NotFound("no exchange '{}'".format(exchange))
+        if self.connection.fail_next_publish:
+            self.connection.fail_next_publish = False
+            self.connection.connected = False
+            raise OSError("connection reset")
+        self.connection.stats["published"].append((exchange, routing_key, message.body))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Local AMQP stand-in.
+    """
+
+    def __init__(self, stats, **kwargs):
+        self.stats = stats
+        self.kwargs = kwargs
+        self.connected = False
+        self.fail_next_publish = False
+
+    def connect(self):
+        self.stats["connects"] += 1
+        self.connected = True
+
+    def channel(self):
+        return FakeChannel(self)
+
+    def close(self):
+        self.connected = False
+
+
+@pytest.fixture
+def amqp_stats():
+    stats = {"connects": 0, "declares": 0, "exchanges": set(), "published": []}
+    connections = []
+
+    def factory(url, **kwargs):
+        connection = FakeConnection(stats, **kwargs)
+        connections.append(connection)
+        return connection
+
+    rabbitmq._publishers.clear()
+    with mock.patch("taiga.events.backends.rabbitmq._make_rabbitmq_connection", side_effect=factory):
+        stats["connections"] = connections
+        yield stats
+    rabbitmq._publishers.clear()
+
+
+def test_publisher_reuses_connection_and_declares_once(amqp_stats):
+    backend = rabbitmq.EventsPushBackend(url="//guest:guest@127.0.0.1/")
+    for x in range(10):
+        backend.emit_event("msg-{}".format(x), routing_key="changes.project.1.userstories")
+
+    assert amqp_stats["connects"] == 1
+    assert amqp_stats["declares"] == 1
+    assert len(amqp_stats["published"]) == 10
+    assert amqp_stats["connections"][0].kwargs == {"confirm_publish": True}
+
+
+def test_publisher_declares_each_exchange_once(amqp_stats):
+    backend = rabbitmq.EventsPushBackend(url="//guest:guest@127.0.0.1/")
+    backend.emit_event("a", routing_key="rk", channel="events")
+    backend.emit_event("b", routing_key="rk", channel="other")
+    backend.emit_event("c", routing_key="rk", channel="events")
+
+    assert amqp_stats["connects"] == 1
+    assert amqp_stats["declares"] == 2
+
+
+def test_publisher_reconnects_after_failure(amqp_stats):
+    backend = rabbitmq.EventsPushBackend(url="//guest:guest@127.0.0.1/")
+    backend.emit_event("a", routing_key="rk")
+    amqp_stats["connections"][0].fail_next_publish = True
+    with mock.patch.object(rabbitmq.log, "error") as log_error:
+        backend.emit_event("b", routing_key="rk")
+    backend.emit_event("c", routing_key="rk")
+
+    # A failed publish could have been delivered, so it is not retried
+    assert log_error.called
+    assert amqp_stats["connects"] == 2
+    assert [m[2] for m in amqp_stats["published"]] == ["a", "c"]
+
+
+def test_publisher_declares_again_the_deleted_exchanges(amqp_stats):
+    backend = rabbitmq.EventsPushBackend(url="//guest:guest@127.0.0.1/")
+    backend.emit_event("a", routing_key="rk")
+    # The broker deletes the auto_delete exchange
+    amqp_stats["exchanges"].clear()
+    backend.emit_event("b", routing_key="rk")
+
+    assert amqp_stats["declares"] == 2
+    assert [m[2] for m in amqp_stats["published"]] == ["a", "b"]
+
+
+def test_publisher_retries_connection_errors(amqp_stats):
+    backend = rabbitmq.EventsPushBackend(url="//guest:guest@127.0.0.1/")
+    connect = FakeConnection.connect
+
+    def fail_once(self):
+        if not amqp_stats["connections"][1:]:
+            raise OSError("connection reset")
+        connect(self)
+
+    with mock.patch.object(FakeConnection, "connect", fail_once):
+        backend.emit_event("a", routing_key="rk")
+
+    assert len(amqp_stats["connections"]) == 2
+    assert [m[2] for m in amqp_stats["published"]] == ["a"]
+
+
+def test_publisher_does_not_retry_other_errors(amqp_stats):
+    publisher = rabbitmq.RabbitMQPublisher("//guest:guest@127.0.0.1/")
+    with mock.patch.object(FakeChannel, "exchange_declare", side_effect=ValueError):
+        with pytest.raises(ValueError):
+            publisher.publish("a", routing_key="rk", exchange="events")
+
+    assert amqp_stats["connects"] == 1
+    assert amqp_stats["published"] == []
+
+
+def test_publisher_is_reset_after_fork(amqp_stats):
+    backend = rabbitmq.EventsPushBackend(url="//guest:guest@127.0.0.1/")
+    backend.emit_event("a", routing_key="rk")
+
+    with mock.patch("os.getpid", return_value=-1):
+        backend.emit_event("b", routing_key="rk")
+
+    assert amqp_stats["connects"] == 2
+
+
+def test_connection_refused_is_logged(amqp_stats):
+    backend = rabbitmq.EventsPushBackend(url="//guest:guest@127.0.0.1/")
+    with mock.patch.object(FakeConnection, "connect", side_effect=ConnectionRefusedError):
+        with mock.patch.object(rabbitmq.log, "error") as log_error:
+            backend.emit_event("a", routing_key="rk")
+    assert log_error.called
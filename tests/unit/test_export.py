@@ -9,7 +9,9 @@ import pytest
 import io
 
 from taiga.base.utils import json
+from taiga.export_import import serializers
 from taiga.export_import.services import render_project
+from taiga.projects.history.choices import HistoryType
 
 from tests.utils import disconnect_signals, reconnect_signals
 
@@ -57,3 +59,24 @@ def test_export_epic_with_user_stories(client):
 
     assert project_data["epics"][0]["related_user_stories"][0]["user_story"] == user_story.ref
     assert len(project_data["epics"][0]["related_user_stories"]) == 1
+
+
+def test_export_user_stories_in_chunks(client):
+    project = f.ProjectFactory.create()
+    user_stories = f.UserStoryFactory.create_batch(5, project=project)
+    for user_story in user_stories:
+        f.UserStoryAttachmentFactory.create(project=project, content_object=user_story)
+        f.HistoryEntryFactory.create(project=project, key="userstories.userstory:{}".format(user_story.id),
+                                     type=HistoryType.change, is_hidden=False, diff={})
+    f.UserStoryAttachmentFactory.create(project=project, content_object=user_stories[0])
+
+    expected = [serializers.UserStoryExportSerializer(user_story).data
+                for user_story in project.user_stories.all()]
+
+    output = io.BytesIO()
+    render_project(project, output, chunk_size=2)
+    project_data = json.loads(output.getvalue())
+
+    assert json.loads(json.dumps(expected)) == project_data["user_stories"]
+    assert len(project_data["user_stories"][0]["attachments"]) == 2
+    assert len(project_data["user_stories"][0]["history"]) == 1
@@ -5,12 +5,20 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import base64
+import gzip
 import pytest
 import io
+import os
+import tempfile
+import tracemalloc
+from unittest import mock
+
 from .. import factories as f
 
 from taiga.base.utils import json
-from taiga.export_import.services import render_project, store_project_from_dict
+from taiga.export_import.services import render_project, store_project_from_dict, store_project_from_dump
+from taiga.export_import.services import stream
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -44,3 +52,120 @@ def test_import_epic_with_user_stories(client):
     assert related_userstory.user_story.ref == user_story.ref
     assert related_userstory.order == 55
     assert related_userstory.epic.ref == epic.ref
+
+
+def _make_project_for_dump():
+    project = f.ProjectFactory()
+    project.default_points = f.PointsFactory.create(project=project)
+    project.default_issue_type = f.IssueTypeFactory.create(project=project)
+    project.default_issue_status = f.IssueStatusFactory.create(project=project)
+    project.default_epic_status = f.EpicStatusFactory.create(project=project)
+    project.default_us_status = f.UserStoryStatusFactory.create(project=project)
+    project.default_task_status = f.TaskStatusFactory.create(project=project)
+    project.default_priority = f.PriorityFactory.create(project=project)
+    project.default_severity = f.SeverityFactory.create(project=project)
+    project.save()
+    return project
+
+
+def test_import_project_from_streamed_dump(client):
+    project = _make_project_for_dump()
+    user_story = f.UserStoryFactory.create(project=project, status=project.default_us_status, milestone=None)
+    attachment = f.UserStoryAttachmentFactory.create(project=project, content_object=user_story)
+    attachment.attached_file.open("rb")
+    attachment_content = attachment.attached_file.read()
+    attachment.attached_file.close()
+
+    output = io.BytesIO()
+    with gzip.GzipFile(fileobj=output, mode="wb") as outfile:
+        render_project(project, outfile)
+    project.delete()
+    output.seek(0)
+
+    with mock.patch.object(stream, "READ_CHUNK_SIZE", 16):
+        project = store_project_from_dump(gzip.GzipFile(fileobj=output), discard_slug=True)
+
+    assert project.user_stories.count() == 1
+    imported_user_story = project.user_stories.first()
+    assert imported_user_story.ref == user_story.ref
+    assert imported_user_story.attachments.count() == 1
+    imported_attachment = imported_user_story.attachments.first()
+    imported_attachment.attached_file.open("rb")
+    assert imported_attachment.attached_file.read() == attachment_content
+    imported_attachment.attached_file.close()
+
+
+def test_dump_stream_reader_matches_json_load():
+    data = {
+        "name": "Project ñ",
+        "total_story_points": 12.5,
+        "memberships": [{"email": "test@test.com"}],
+        "user_stories": [{"ref": x, "subject": "Ü" * x, "tags": []} for x in range(50)],
+        "tasks": [],
+        "timeline": [1, None, "x"],
+        "is_private": True,
+    }
+    dump = json.dumps(data).encode("utf-8")
+
+    with mock.patch.object(stream, "READ_CHUNK_SIZE", 7):
+        read_data = {}
+        for key, value in stream.DumpStreamReader(io.BytesIO(dump)).items():
+            read_data[key] = list(value) if key in stream.STREAMED_SECTIONS else value
+        assert read_data == data
+
+        header = stream.read_dump_header(io.BytesIO(dump))
+        assert header == {"name": "Project ñ", "total_story_points": 12.5,
+                          "memberships": [{"email": "test@test.com"}], "is_private": True}
+
+
+@pytest.mark.parametrize("dump", [b"test", b'{"name": "test"', b'{"user_stories": [1, 2', b'[]'])
+def test_dump_stream_reader_invalid_dumps(dump):
+    with pytest.raises(stream.DumpFormatError):
+        stream.read_dump_header(io.BytesIO(dump))
+
+
+def test_spooled_dump_attachments():
+    dump = json.dumps({
+        "user_stories": [{
+            "ref": 1,
+            "attachments": [
+                {"attached_file": {"name": "a.txt", "data": base64.b64encode(b"content").decode("utf-8")}},
+                # Paths or spooled files can not be injected from the dump
+                {"attached_file": {"name": "b.txt", "path": "/etc/passwd", "spooled": 0}},
+            ]
+        }]
+    }).encode("utf-8")
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        data = stream.spool_dump(io.BytesIO(dump), spool_dir)
+        for x in range(2):  # Sections can be iterated many times
+            attachments = list(data["user_stories"])[0]["attachments"]
+            assert attachments[0]["attached_file"].name == "a.txt"
+            assert attachments[0]["attached_file"].read() == b"content"
+            assert attachments[1]["attached_file"] is None
+
+
+@pytest.mark.slow
+def test_spool_dump_uses_less_memory_than_loading_the_dump():
+    dump = json.dumps({
+        "name": "Big project",
+        "user_stories": [{
+            "ref": x,
+            "attachments": [{"attached_file": {"name": "file", "data": base64.b64encode(os.urandom(100000)).decode()}}]
+        } for x in range(200)]
+    }).encode("utf-8")
+
+    tracemalloc.start()
+    json.loads(dump)
+    json_load_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as spool_dir:
+        data = stream.spool_dump(io.BytesIO(dump), spool_dir)
+        for item in data["user_stories"]:
+            item["attachments"][0]["attached_file"].close()
+    spool_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert spool_peak < json_load_peak / 10
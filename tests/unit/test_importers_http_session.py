@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+#
+# Copyright (c) 2021-present Kaleidos Ventures SL
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+import requests
+
+from taiga.importers.http_session import ImporterSession, prefetch
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            server.client_ports.add(self.client_address[1])
+            responses = server.responses.get(self.path, [])
+            status, headers = responses.pop(0) if responses else (200, {})
+
+        body = self.path.encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = _ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.lock = threading.Lock()
+    httpd.hits = {}
+    httpd.client_ports = set()
+    httpd.responses = {}
+    httpd.url = "http://127.0.0.1:{}".format(httpd.server_address[1])
+
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_retry_rate_limited_requests(server):
+    server.responses["/limited"] = [(429, {"Retry-After": "0"}), (503, {})]
+    session = ImporterSession(backoff_factor=0.01)
+
+    response = session.get(server.url + "/limited")
+
+    assert response.status_code == 200
+    assert server.hits["/limited"] == 3
+
+
+def test_retry_github_rate_limit(server):
+    reset = str(int(time.time()))
+    server.responses["/github"] = [(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset})]
+    session = ImporterSession(backoff_factor=0.01)
+
+    response = session.get(server.url + "/github")
+
+    assert response.status_code == 200
+    assert server.hits["/github"] == 2
+
+
+def test_do_not_retry_other_errors(server):
+    server.responses["/forbidden"] = [(403, {}), (403, {})]
+    server.responses["/not-found"] = [(404, {})]
+    session = ImporterSession(backoff_factor=0.01)
+
+    assert session.get(server.url + "/forbidden").status_code == 403
+    assert session.get(server.url + "/not-found").status_code == 404
+    assert server.hits == {"/forbidden": 1, "/not-found": 1}
+
+
+def test_return_last_response_when_retries_are_exhausted(server):
+    server.responses["/down"] = [(503, {})] * 5
+    session = ImporterSession(max_retries=2, backoff_factor=0.01)
+
+    response = session.get(server.url + "/down")
+
+    assert response.status_code == 503
+    assert server.hits["/down"] == 3
+
+
+def test_retry_connection_errors():
+    session = ImporterSession(max_retries=1, backoff_factor=0.01, timeout=1)
+
+    with pytest.raises(requests.ConnectionError):
+        session.get("http://127.0.0.1:1/")
+
+
+def test_reuse_connections(server):
+    session = ImporterSession()
+
+    for i in range(10):
+        assert session.get(server.url + "/page/{}".format(i)).status_code == 200
+
+    assert len(server.client_ports) == 1
+
+
+def test_prefetch_keeps_order_and_bounds_concurrency(server):
+    session = ImporterSession()
+    lock = threading.Lock()
+    running = []
+    max_running = []
+
+    def fetch(item):
+        with lock:
+            running.append(item)
+            max_running.append(len(running))
+        try:
+            time.sleep(0.01)
+            return session.get(server.url + "/item/{}".format(item)).text
+        finally:
+            with lock:
+                running.remove(item)
+
+    result = list(prefetch(fetch, range(30), workers=4))
+
+    assert result == [(i, "/item/{}".format(i)) for i in range(30)]
+    assert max(max_running) <= 4
+    assert len(server.client_ports) <= 4
+
+
+def test_prefetch_raises_errors_in_order():
+    def fetch(item):
+        if item == 3:
+            raise ValueError(item)
+        return item
+
+    fetched = []
+    with pytest.raises(ValueError):
+        for item, result in prefetch(fetch, range(10), workers=2):
+            fetched.append(result)
+
+    assert fetched == [0, 1, 2]
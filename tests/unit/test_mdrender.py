@@ -10,6 +10,7 @@ from unittest.mock import patch, MagicMock
 from taiga.mdrender.extensions import emojify
 from taiga.mdrender.extensions import refresh_attachment
 from taiga.mdrender.service import render, cache_by_sha, get_diff_of_htmls, render_and_extract
+from taiga.mdrender.service import invalidate_project_cache, local_cache, markdown_pool
 from taiga.projects.attachments.services import REFRESH_PARAM
 
 import time
@@ -38,13 +39,14 @@ def test_mentions_valid_username():
     with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock:
         dummy_uuser = MagicMock()
         dummy_uuser.get_full_name.return_value = "Hermione Granger"
-        get_user_model_mock.return_value.objects.get = MagicMock(return_value=dummy_uuser)
+        dummy_uuser.username = "hermione"
+        get_user_model_mock.return_value.objects.filter = MagicMock(return_value=[dummy_uuser])
 
         result = render(dummy_project, "text @hermione text")
 
-        get_user_model_mock.return_value.objects.get.assert_called_with(
+        get_user_model_mock.return_value.objects.filter.assert_called_with(
             memberships__project_id=1,
-            username="hermione",
+            username__in=["hermione"],
         )
         assert result == ('<p>text <a class="mention" href="http://localhost:9001/profile/hermione" '
                           'title="Hermione Granger">@hermione</a> text</p>')
@@ -54,13 +56,14 @@ def test_mentions_valid_username_with_points():
     with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock:
         dummy_uuser = MagicMock()
         dummy_uuser.get_full_name.return_value = "Luna Lovegood"
-        get_user_model_mock.return_value.objects.get = MagicMock(return_value=dummy_uuser)
+        dummy_uuser.username = "luna.lovegood"
+        get_user_model_mock.return_value.objects.filter = MagicMock(return_value=[dummy_uuser])
 
         result = render(dummy_project, "text @luna.lovegood text")
 
-        get_user_model_mock.return_value.objects.get.assert_called_with(
+        get_user_model_mock.return_value.objects.filter.assert_called_with(
             memberships__project_id=1,
-            username="luna.lovegood",
+            username__in=["luna.lovegood"],
         )
         assert result == ('<p>text <a class="mention" href="http://localhost:9001/profile/luna.lovegood" '
                           'title="Luna Lovegood">@luna.lovegood</a> text</p>')
@@ -70,21 +73,23 @@ def test_mentions_valid_username_with_dash():
     with patch("taiga.mdrender.extensions.mentions.get_user_model") as get_user_model_mock:
         dummy_uuser = MagicMock()
         dummy_uuser.get_full_name.return_value = "Ginny Weasley"
-        get_user_model_mock.return_value.objects.get = MagicMock(return_value=dummy_uuser)
+        dummy_uuser.username = "super-ginny"
+        get_user_model_mock.return_value.objects.filter = MagicMock(return_value=[dummy_uuser])
 
         result = render(dummy_project, "text @super-ginny text")
 
-        get_user_model_mock.return_value.objects.get.assert_called_with(
+        get_user_model_mock.return_value.objects.filter.assert_called_with(
             memberships__project_id=1,
-            username="super-ginny",
+            username__in=["super-ginny"],
         )
         assert result == ('<p>text <a class="mention" href="http://localhost:9001/profile/super-ginny" '
                           'title="Ginny Weasley">@super-ginny</a> text</p>')
 
 
 def test_proccessor_valid_us_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_ref") as mock:
+        instance = MagicMock()
+        mock.return_value = {1: instance}
         instance.content_type.model = "userstory"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#1**")
@@ -93,8 +98,9 @@ def test_proccessor_valid_us_reference():
 
 
 def test_proccessor_valid_issue_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_ref") as mock:
+        instance = MagicMock()
+        mock.return_value = {2: instance}
         instance.content_type.model = "issue"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#2**")
@@ -103,8 +109,9 @@ def test_proccessor_valid_issue_reference():
 
 
 def test_proccessor_valid_task_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_ref") as mock:
+        instance = MagicMock()
+        mock.return_value = {3: instance}
         instance.content_type.model = "task"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#3**")
@@ -113,8 +120,9 @@ def test_proccessor_valid_task_reference():
 
 
 def test_proccessor_invalid_type_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_ref") as mock:
+        instance = MagicMock()
+        mock.return_value = {4: instance}
         instance.content_type.model = "other"
         instance.content_object.subject = "test"
         result = render(dummy_project, "**#4**")
@@ -122,8 +130,8 @@ def test_proccessor_invalid_type_reference():
 
 
 def test_proccessor_invalid_reference():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        mock.return_value = None
+    with patch("taiga.mdrender.extensions.references.get_instances_by_ref") as mock:
+        mock.return_value = {}
         result = render(dummy_project, "**#5**")
         assert result == "<p><strong>#5</strong></p>"
 
@@ -239,15 +247,72 @@ def test_cache_by_sha():
 
     padding = "X" * 40  # Needed as cache is disabled for text under 40 chars
 
+    local_cache.clear()
     result_a_1 = test_cache(dummy_project, "A" + padding)
     result_b_1 = test_cache(dummy_project, "B")
     result_a_2 = test_cache(dummy_project, "A" + padding)
     result_b_2 = test_cache(dummy_project, "B")
 
     assert result_a_1 != result_b_1  # Evidently
-    assert result_b_1 != result_b_2  # No cached!
+    assert result_b_1 == result_b_2  # Cached in the process
     assert result_a_1 == result_a_2  # Cached!
 
+    local_cache.clear()
+    assert test_cache(dummy_project, "A" + padding) == result_a_1  # From the shared cache
+    assert test_cache(dummy_project, "B") != result_b_1  # No cached in the shared cache!
+
+
+def test_cache_by_sha_shares_texts_without_project_links():
+    @cache_by_sha
+    def test_cache(project, text):
+        return (project.id, time.time())
+
+    other_project = MagicMock()
+    other_project.id = 2
+
+    local_cache.clear()
+    assert test_cache(dummy_project, "Plain text") == test_cache(other_project, "Plain text")
+    assert test_cache(dummy_project, "Text with #1") != test_cache(other_project, "Text with #1")
+
+
+def test_cache_by_sha_does_not_cache_short_texts_with_project_links():
+    @cache_by_sha
+    def test_cache(project, text):
+        return time.time()
+
+    local_cache.clear()
+    result_1 = test_cache(dummy_project, "See #12")
+    assert test_cache(dummy_project, "See #12") != result_1
+
+
+def test_cache_by_sha_is_invalidated_by_project():
+    @cache_by_sha
+    def test_cache(project, text):
+        return time.time()
+
+    text = "Mention to @someone in a text long enough to be cached"
+    result_1 = test_cache(dummy_project, text)
+    assert test_cache(dummy_project, text) == result_1
+
+    invalidate_project_cache(dummy_project.id)
+    assert test_cache(dummy_project, text) != result_1
+
+
+def test_markdown_pool_reuses_the_engines_of_the_project():
+    other_project = MagicMock()
+    other_project.id = 2
+    other_project.slug = "other"
+
+    md = markdown_pool.acquire(dummy_project)
+    md.extracted_data["mentions"].append("someone")
+    markdown_pool.release(dummy_project, md)
+
+    assert markdown_pool.acquire(other_project) is not md
+    reused_md = markdown_pool.acquire(dummy_project)
+    assert reused_md is md
+    assert reused_md.extracted_data == {"mentions": [], "references": []}
+    markdown_pool.release(dummy_project, reused_md)
+
 
 def test_get_diff_of_htmls_insertions():
     result = get_diff_of_htmls("", "<p>test</p>")
@@ -265,8 +330,9 @@ def test_get_diff_of_htmls_modifications():
 
 
 def test_render_and_extract_references():
-    with patch("taiga.mdrender.extensions.references.get_instance_by_ref") as mock:
-        instance = mock.return_value
+    with patch("taiga.mdrender.extensions.references.get_instances_by_ref") as mock:
+        instance = MagicMock()
+        mock.return_value = {1: instance}
         instance.content_type.model = "issue"
         instance.content_object.subject = "test"
         (_, extracted) = render_and_extract(dummy_project, "**#1**")
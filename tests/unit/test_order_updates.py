@@ -5,9 +5,46 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import random
+
+import pytest
+
 from taiga.projects.services import apply_order_updates
 
 
+def _quadratic_apply_order_updates(base_orders, new_orders, *, remove_equal_original=False):
+    # The original O(n·m) implementation, kept as reference for apply_order_updates
+    updated_order_ids = set()
+    original_orders = {k: v for k, v in base_orders.items()}
+
+    invalid_keys = new_orders.keys() - base_orders.keys()
+    [new_orders.pop(id, None) for id in invalid_keys]
+
+    sorted_new_orders = sorted(new_orders.items(), key=lambda e: e[1])
+
+    for new_order in sorted_new_orders:
+        old_order = base_orders[new_order[0]]
+        new_order = new_order[1]
+        for id, order in base_orders.items():
+            moving_backward = new_order <= old_order and order >= new_order and order < old_order
+            moving_forward = new_order >= old_order and order >= new_order
+            if moving_backward or moving_forward:
+                base_orders[id] += 1
+                updated_order_ids.add(id)
+
+    for id, order in new_orders.items():
+        if base_orders[id] != order:
+            base_orders[id] = order
+            updated_order_ids.add(id)
+
+    removing_keys = [id for id in base_orders if id not in updated_order_ids]
+    [base_orders.pop(id, None) for id in removing_keys]
+
+    if remove_equal_original:
+        common_keys = base_orders.keys() & original_orders.keys()
+        [base_orders.pop(id, None) for id in common_keys if original_orders[id] == base_orders[id]]
+
+
 def test_apply_order_updates_one_element_backward():
     orders = {
         "a": 1,
@@ -267,3 +304,31 @@ def test_apply_order_maintain_new_values():
     expected = {"g": 8}
     apply_order_updates(orders, new_orders, remove_equal_original=True)
     assert expected == orders
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_apply_order_updates_is_equal_to_the_quadratic_implementation(seed):
+    rnd = random.Random(seed)
+    for i in range(500):
+        total = rnd.randint(0, 15)
+        if rnd.random() < 0.5:
+            # Consecutive orders
+            orders = {"k{}".format(i): i + 1 for i in range(total)}
+        else:
+            # Repeated and missing orders
+            orders = {"k{}".format(i): rnd.randint(0, total + 2) for i in range(total)}
+
+        keys = list(orders.keys()) + ["unknown"]
+        new_orders = {key: rnd.randint(-1, total + 3)
+                      for key in rnd.sample(keys, rnd.randint(0, min(len(keys), 5)))}
+        remove_equal_original = rnd.random() < 0.5
+
+        expected_orders, expected_new_orders = dict(orders), dict(new_orders)
+        _quadratic_apply_order_updates(expected_orders, expected_new_orders,
+                                       remove_equal_original=remove_equal_original)
+
+        result_orders, result_new_orders = dict(orders), dict(new_orders)
+        apply_order_updates(result_orders, result_new_orders, remove_equal_original=remove_equal_original)
+
+        assert list(result_orders.items()) == list(expected_orders.items()), (orders, new_orders)
+        assert result_new_orders == expected_new_orders
@@ -18,32 +18,34 @@ import pytest
 pytestmark = pytest.mark.django_db(transaction=True)
 
 def test_push_to_timeline_many_objects():
-    with patch("taiga.timeline.service._add_to_object_timeline") as mock:
+    with patch("taiga.timeline.service._add_to_objects_timeline") as mock:
         users = [get_user_model(), get_user_model(), get_user_model()]
         owner = get_user_model()
         project = Project()
         service._push_to_timeline(users, project, "test", project.created_date)
-        assert mock.call_count == 3
+        assert mock.call_count == 1
         assert mock.mock_calls == [
-            call(users[0], project, "test", project.created_date, "default", {}),
-            call(users[1], project, "test", project.created_date, "default", {}),
-            call(users[2], project, "test", project.created_date, "default", {}),
+            call(users, project, "test", project.created_date, "default", {}),
         ]
         with pytest.raises(Exception):
             service._push_to_timeline(None, project, "test")
 
 
 def test_add_to_objects_timeline():
-    with patch("taiga.timeline.service._add_to_object_timeline") as mock:
-        users = [get_user_model(), get_user_model(), get_user_model()]
+    with patch("taiga.timeline.service._create_timeline_entries") as create_mock, \
+            patch("taiga.timeline.service._prepare_timeline_event") as prepare_mock:
+        prepare_mock.return_value = {"event_type": "projects.project.test", "project": None,
+                                     "data": {}, "data_content_type": None}
+        users = [get_user_model()(id=1), get_user_model()(id=2), get_user_model()(id=3)]
         project = Project()
         service._add_to_objects_timeline(users, project, "test", project.created_date)
-        assert mock.call_count == 3
-        assert mock.mock_calls == [
-            call(users[0], project, "test", project.created_date, "default", {}),
-            call(users[1], project, "test", project.created_date, "default", {}),
-            call(users[2], project, "test", project.created_date, "default", {}),
-        ]
+
+        # The event data is computed once and all the entries created at once
+        assert prepare_mock.call_count == 1
+        assert create_mock.call_count == 1
+        entries = create_mock.call_args[0][0]
+        assert [entry.object_id for entry in entries] == [1, 2, 3]
+        assert all(entry.data is entries[0].data for entry in entries)
         with pytest.raises(Exception):
             service._push_to_timeline(None, project, "test")
 
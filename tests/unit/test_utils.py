@@ -5,9 +5,13 @@
 #
 # Copyright (c) 2021-present Kaleidos Ventures SL
 
+import csv
+import gzip
+import io
 import pytest
 
 from unittest import mock
+from django.test import RequestFactory
 
 import django_sites as sites
 import re
@@ -15,6 +19,7 @@ import re
 from taiga.base.utils.urls import get_absolute_url, is_absolute_url, build_url, \
     validate_private_url, IpAddresValueError, HostnameException
 from taiga.base.utils.db import save_in_bulk, update_in_bulk, to_tsquery
+from taiga.base.utils.streaming import iter_csv, csv_response
 
 pytestmark = pytest.mark.django_db(transaction=True)
 
@@ -140,3 +145,38 @@ def test_validate_invalid_destination_address(url):
 ])
 def test_validate_good_destination_address(url):
     assert validate_private_url(url) is None
+
+
+def test_iter_csv_yields_the_header_first_and_buffers_the_rows():
+    rows = ({"id": i, "subject": "Subject\n{}".format(i)} for i in range(100))
+
+    pieces = list(iter_csv(["id", "subject"], rows, buffer_size=200))
+
+    assert pieces[0] == "id,subject\r\n"
+    assert 2 < len(pieces) < 100
+    assert all(len(piece) < 250 for piece in pieces)
+    assert list(csv.reader(io.StringIO("".join(pieces))))[1:] == [
+        [str(i), "Subject\n{}".format(i)] for i in range(100)
+    ]
+
+
+def test_csv_response(settings):
+    settings.CSV_EXPORT_GZIP = True
+    content = ["id,subject\r\n", "1,ñandú\r\n"]
+
+    response = csv_response(RequestFactory().get("/"), iter(content), "export.csv")
+    assert response.streaming
+    assert response["Content-Type"] == "application/csv; charset=utf-8"
+    assert response["Content-Disposition"] == 'attachment; filename="export.csv"'
+    assert response["Vary"] == "Accept-Encoding"
+    assert not response.has_header("Content-Encoding")
+    assert b"".join(response.streaming_content).decode("utf-8") == "".join(content)
+
+    response = csv_response(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, deflate"),
+                            iter(content), "export.csv")
+    assert response["Content-Encoding"] == "gzip"
+    assert gzip.decompress(b"".join(response.streaming_content)).decode("utf-8") == "".join(content)
+
+    settings.CSV_EXPORT_GZIP = False
+    response = csv_response(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip"), iter(content), "export.csv")
+    assert not response.has_header("Content-Encoding")